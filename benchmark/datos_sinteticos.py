@@ -0,0 +1,96 @@
+import datetime
+import io
+import os
+import random
+import uuid
+import zipfile
+
+from openpyxl import Workbook
+
+# Encabezados del registro de chats sintético: las columnas que usa el procesador y un par de relleno
+ENCABEZADOS = ['DATE', 'TIME', 'SESSION GUID', 'AGENT NAME', 'CUSTOMER ID', 'ACCOUNT NAME',
+               'MEDIA TYPE', 'DISPOSITION']
+
+NOMBRE_REGISTRO = 'registro_sintetico.xlsx'
+NOMBRE_ZIP = 'entrega_sintetica.zip'
+
+_PALABRAS = ('hola', 'pedido', 'factura', 'entrega', 'cliente', 'gracias', 'cuenta', 'agua',
+             'botellón', 'dirección', 'pago', 'fecha', 'cancelar', 'confirmar', 'ayuda')
+
+
+# Chats del registro: (fecha, hora, guid, agente, cliente, cuenta), reproducibles a partir de la semilla
+def generar_chats(filas, semilla=0, fecha_inicio=datetime.date(2024, 10, 10), dias=7):
+    azar = random.Random(semilla)
+    agentes = [f'agente{i:03d}@example.com' for i in range(max(filas // 200, 5))]
+    cuentas = [f'Cuenta {i:04d}' for i in range(max(filas // 20, 10))]
+    chats = []
+    for _ in range(filas):
+        fecha = fecha_inicio + datetime.timedelta(days=azar.randrange(dias))
+        segundos = azar.randrange(24 * 60 * 60)
+        hora = f'{segundos // 3600:02d}:{segundos // 60 % 60:02d}:{segundos % 60:02d}'
+        guid = str(uuid.UUID(int=azar.getrandbits(128), version=4))
+        chats.append((fecha, hora, guid, azar.choice(agentes), azar.randrange(10 ** 9), azar.choice(cuentas)))
+    return chats
+
+
+# Escribe el registro de chats como lo exporta la plataforma: fechas como celdas de fecha y horas como texto
+def escribir_registro(chats, ruta):
+    book = Workbook(write_only=True)
+    sheet = book.create_sheet()
+    sheet.append(ENCABEZADOS)
+    for fecha, hora, guid, agente, cliente, cuenta in chats:
+        sheet.append([datetime.datetime.combine(fecha, datetime.time()), hora, guid, agente, cliente, cuenta,
+                      'Chat', 'Chat - Billing'])
+    book.save(ruta)
+    return ruta
+
+
+# Transcripción HTML de aproximadamente tam_html bytes: mensajes "[hora] autor: texto" que alternan
+# entre cliente y agente, con texto variado para que no comprima de más
+def _html_transcripcion(azar, tam_html):
+    partes = ['<html><body>']
+    tam = len(partes[0])
+    segundos = azar.randrange(8 * 60 * 60, 20 * 60 * 60)
+    autores = ('Cliente', 'Agente')
+    turno = 0
+    while tam < tam_html:
+        hora = f'{segundos // 3600:02d}:{segundos // 60 % 60:02d}:{segundos % 60:02d}'
+        texto = ' '.join(azar.choice(_PALABRAS) for _ in range(12))
+        linea = f'<p>[{hora}] {autores[turno % 2]}: {texto} {azar.getrandbits(32):08x}</p>\n'
+        partes.append(linea)
+        tam += len(linea)
+        segundos += azar.randrange(5, 90)
+        if azar.random() < 0.7:
+            turno += 1
+    partes.append('</body></html>')
+    return ''.join(partes).encode('utf-8')
+
+
+# Escribe un ZIP de entrega con zips_internos ZIP internos (uno por chat), cada uno con su HTML.
+# proporcion_coincidencias es la fracción de ZIP internos que corresponden a un chat del registro;
+# el resto son chats que el registro no tiene
+def escribir_zip_entrega(chats, ruta, zips_internos, tam_html=20 * 1024, proporcion_coincidencias=0.8, semilla=0):
+    azar = random.Random(semilla + 1)
+    con_pareja = min(int(zips_internos * proporcion_coincidencias), len(chats))
+    elegidos = azar.sample(chats, con_pareja)
+    extra = generar_chats(zips_internos - con_pareja, semilla=semilla + 2)
+
+    with zipfile.ZipFile(ruta, 'w', zipfile.ZIP_STORED) as entrega:
+        for fecha, hora, guid, *_ in elegidos + extra:
+            nombre = f"chat_{fecha.isoformat()}_{hora.replace(':', '')}_{guid}"
+            interno = io.BytesIO()
+            with zipfile.ZipFile(interno, 'w', zipfile.ZIP_DEFLATED) as zip_interno:
+                zip_interno.writestr('transcript.html', _html_transcripcion(azar, tam_html))
+            entrega.writestr(f'{nombre}.zip', interno.getvalue())
+    return ruta
+
+
+# Genera en carpeta un registro de filas chats y un ZIP de entrega; devuelve (ruta_registro, ruta_zip)
+def generar_conjunto(carpeta, filas, zips_internos, tam_html=20 * 1024, proporcion_coincidencias=0.8, semilla=0):
+    os.makedirs(carpeta, exist_ok=True)
+    chats = generar_chats(filas, semilla=semilla)
+    ruta_registro = escribir_registro(chats, os.path.join(carpeta, NOMBRE_REGISTRO))
+    ruta_zip = escribir_zip_entrega(chats, os.path.join(carpeta, NOMBRE_ZIP), zips_internos,
+                                    tam_html=tam_html, proporcion_coincidencias=proporcion_coincidencias,
+                                    semilla=semilla)
+    return ruta_registro, ruta_zip
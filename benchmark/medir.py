@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmark.datos_sinteticos import generar_conjunto
+from procesador.indice import construir_indice
+from procesador.lectura_excel import cargar_registro_chat
+from procesador.pipeline import procesar_zip
+
+# Margen sobre la referencia a partir del cual una etapa se considera más lenta o más pesada
+TOLERANCIA = 0.20
+
+# Diferencias menores que esto se consideran ruido aunque superen la tolerancia
+MINIMO_SEGUNDOS = 0.05
+MINIMO_MEMORIA_MB = 1.0
+
+
+# Etapas medidas, en orden. Cada una recibe el contexto del banco y devuelve cuántas unidades procesó
+def _etapa_lectura(contexto):
+    contexto['df'] = cargar_registro_chat(contexto['registro'], usar_cache=False)
+    return len(contexto['df'])
+
+
+def _etapa_cache(contexto):
+    return len(cargar_registro_chat(contexto['registro']))
+
+
+def _etapa_indice(contexto):
+    contexto['indice'] = construir_indice(contexto['df'])
+    return len(contexto['df'])
+
+
+def _salida_limpia(contexto, nombre):
+    carpeta = os.path.join(contexto['trabajo'], nombre)
+    shutil.rmtree(carpeta, ignore_errors=True)
+    os.makedirs(carpeta)
+    return carpeta
+
+
+def _etapa_extraccion(contexto):
+    resultado = procesar_zip(contexto['zip'], contexto['indice'], _salida_limpia(contexto, 'extraccion'),
+                             trabajadores=contexto['trabajadores'], reanudar=False)
+    return resultado['htmls']
+
+
+def _etapa_extraccion_analizada(contexto):
+    resultado = procesar_zip(contexto['zip'], contexto['indice'], _salida_limpia(contexto, 'analizada'),
+                             trabajadores=contexto['trabajadores'], reanudar=False, analizar=True)
+    return resultado['htmls']
+
+
+def _etapa_coincidencias_libro(contexto):
+    resultado = procesar_zip(contexto['zip'], contexto['indice'], _salida_limpia(contexto, 'libro'),
+                             solo_coincidencias=True, modo_excel='libro',
+                             trabajadores=contexto['trabajadores'], reanudar=False)
+    return len(resultado['coincidencias'])
+
+
+def _etapa_excel_por_coincidencia(contexto):
+    resultado = procesar_zip(contexto['zip'], contexto['indice'], _salida_limpia(contexto, 'por_coincidencia'),
+                             solo_coincidencias=True, modo_excel='por_coincidencia',
+                             trabajadores=contexto['trabajadores'], reanudar=False)
+    return len(resultado['coincidencias'])
+
+
+ETAPAS = [
+    ('lectura_excel', 'filas', _etapa_lectura),
+    ('lectura_cache', 'filas', _etapa_cache),
+    ('indice', 'filas', _etapa_indice),
+    ('extraccion', 'zips_internos', _etapa_extraccion),
+    ('extraccion_analizada', 'zips_internos', _etapa_extraccion_analizada),
+    ('coincidencias_libro', 'coincidencias', _etapa_coincidencias_libro),
+    ('excel_por_coincidencia', 'coincidencias', _etapa_excel_por_coincidencia),
+]
+
+
+# Mide una etapa: el mejor tiempo de varias repeticiones sin trazar memoria,
+# y el pico de memoria de Python en una ejecución aparte con tracemalloc (que la hace más lenta)
+def medir_etapa(funcion, contexto, repeticiones):
+    tiempos = []
+    for _ in range(max(repeticiones, 1)):
+        inicio = time.perf_counter()
+        unidades = funcion(contexto)
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcion(contexto)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    segundos = min(tiempos)
+    return {
+        'segundos': round(segundos, 4),
+        'unidades': unidades,
+        'por_segundo': round(unidades / segundos, 1) if segundos else None,
+        'pico_memoria_mb': round(pico / 2 ** 20, 2),
+    }
+
+
+def ejecutar_banco(parametros, carpeta_datos=None, repeticiones=3, etapas=None):
+    trabajo = tempfile.mkdtemp(prefix='banco_procesador_')
+    try:
+        carpeta_datos = carpeta_datos or os.path.join(trabajo, 'datos')
+        inicio = time.perf_counter()
+        registro, ruta_zip = generar_conjunto(carpeta_datos, parametros['filas'], parametros['zips_internos'],
+                                              tam_html=parametros['tam_html_kb'] * 1024,
+                                              proporcion_coincidencias=parametros['proporcion_coincidencias'],
+                                              semilla=parametros['semilla'])
+        generacion = time.perf_counter() - inicio
+
+        contexto = {
+            'registro': registro,
+            'zip': ruta_zip,
+            'trabajo': trabajo,
+            'trabajadores': parametros['trabajadores'],
+        }
+        # La caché del registro se escribe antes de medir, para que lectura_cache mida solo la lectura
+        cargar_registro_chat(registro)
+        resultados = {}
+        for nombre, unidad, funcion in ETAPAS:
+            # lectura_excel e indice dejan en el contexto lo que usan las etapas siguientes
+            if etapas and nombre not in etapas and nombre not in ('lectura_excel', 'indice'):
+                continue
+            resultados[nombre] = dict(medir_etapa(funcion, contexto, repeticiones), unidad=unidad)
+        return {
+            'parametros': parametros,
+            'python': sys.version.split()[0],
+            'generacion_segundos': round(generacion, 2),
+            'tam_zip_mb': round(os.path.getsize(ruta_zip) / 2 ** 20, 2),
+            'etapas': resultados,
+        }
+    finally:
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+
+# Compara cada etapa con la referencia; devuelve la lista de regresiones encontradas
+def comparar(actual, referencia, tolerancia=TOLERANCIA):
+    regresiones = []
+    for nombre, medida in actual['etapas'].items():
+        anterior = referencia['etapas'].get(nombre)
+        if anterior is None:
+            continue
+        for clave, minimo in (('segundos', MINIMO_SEGUNDOS), ('pico_memoria_mb', MINIMO_MEMORIA_MB)):
+            limite = max(anterior[clave] * (1 + tolerancia), anterior[clave] + minimo)
+            if medida[clave] > limite:
+                regresiones.append(f"{nombre}: {clave} {anterior[clave]} -> {medida[clave]}")
+    return regresiones
+
+
+def formatear(actual, referencia=None):
+    lineas = [f"{'etapa':<24}{'segundos':>10}{'por segundo':>14}{'pico MB':>10}{'vs ref':>10}"]
+    for nombre, medida in actual['etapas'].items():
+        cambio = ''
+        anterior = (referencia or {}).get('etapas', {}).get(nombre)
+        if anterior and anterior['segundos']:
+            cambio = f"{(medida['segundos'] / anterior['segundos'] - 1) * 100:+.0f}%"
+        lineas.append(f"{nombre:<24}{medida['segundos']:>10.3f}"
+                      f"{medida['por_segundo'] or 0:>10.0f} {medida['unidad'][:3]}"
+                      f"{medida['pico_memoria_mb']:>10.1f}{cambio:>10}")
+    return '\n'.join(lineas)
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmark.medir',
+        description="Mide cada etapa del procesamiento (Excel, índice, ZIP, coincidencias) con datos sintéticos.")
+    parser.add_argument('--filas', type=int, default=20000, help="Filas del registro de chats sintético")
+    parser.add_argument('--zips', type=int, default=2000, help="ZIP internos en la entrega sintética")
+    parser.add_argument('--tam-html', type=int, default=20, help="Tamaño aproximado de cada HTML, en KB")
+    parser.add_argument('--proporcion', type=float, default=0.8,
+                        help="Fracción de ZIP internos que tienen su fila en el registro")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--trabajadores', type=int, default=1, help="Hilos de extracción")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Repeticiones por etapa; se toma la mejor")
+    parser.add_argument('--etapas', nargs='+', choices=[nombre for nombre, _, _ in ETAPAS],
+                        help="Medir solo estas etapas")
+    parser.add_argument('--datos', help="Carpeta donde dejar los datos sintéticos (por defecto, una temporal)")
+    parser.add_argument('--salida', help="Guardar las mediciones en este JSON")
+    parser.add_argument('--referencia', help="JSON de una medición anterior con el que comparar")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help=f"Margen sobre la referencia antes de marcar una regresión (por defecto {TOLERANCIA})")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    parametros = {
+        'filas': args.filas,
+        'zips_internos': args.zips,
+        'tam_html_kb': args.tam_html,
+        'proporcion_coincidencias': args.proporcion,
+        'semilla': args.semilla,
+        'trabajadores': args.trabajadores,
+    }
+    referencia = None
+    if args.referencia:
+        with open(args.referencia, encoding='utf-8') as f:
+            referencia = json.load(f)
+        if referencia['parametros'] != parametros:
+            print("Aviso: la referencia se midió con otros parámetros: "
+                  f"{json.dumps(referencia['parametros'])}", file=sys.stderr)
+
+    actual = ejecutar_banco(parametros, carpeta_datos=args.datos, repeticiones=args.repeticiones,
+                            etapas=args.etapas)
+    print(formatear(actual, referencia))
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(actual, f, indent=2, ensure_ascii=False)
+
+    if referencia is None:
+        return 0
+    regresiones = comparar(actual, referencia, args.tolerancia)
+    for regresion in regresiones:
+        print(f"Regresión: {regresion}", file=sys.stderr)
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
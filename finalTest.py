@@ -1,12 +1,12 @@
 from ast import match_case
-import os
-import pandas as pd
-import zipfile
-from tkinter import Tk, filedialog, Label, Button, StringVar, Frame, messagebox
+from tkinter import Tk, filedialog, Label, Button, StringVar, BooleanVar, Checkbutton, Frame, messagebox
 from tkinter.ttk import Style
 from datetime import datetime
-import tempfile
-from openpyxl import load_workbook
+from procesador.lectura_excel import ColumnasFaltantes, cargar_registro_chat, guardar_match_names, mensaje_registro
+from procesador.extraccion import ProcesoCancelado, trabajadores_por_defecto
+from procesador.indice import construir_indice
+from procesador import pipeline
+from procesador.segundo_plano import TareaEnSegundoPlano, texto_progreso
 import re
 
 # Función para formatear fechas
@@ -22,110 +22,111 @@ def parse_date(date_str):
 # Función para procesar el archivo Excel
 def procesar_excel(ruta_archivo):
     try:
-        df = pd.read_excel(ruta_archivo)
-        columnas_necesarias = ['DATE', 'TIME', 'SESSION GUID']
-        if not all(col in df.columns for col in columnas_necesarias):
-            messagebox.showerror("Error", "El archivo no contiene las columnas necesarias")
-            return None
-
-        df['DATE'] = df['DATE'].astype(str).str.replace("/", "-")
-        df['TIME'] = df['TIME'].astype(str).str.replace(":", "")
-        df['MATCH NAME'] = 'chat_' + df['DATE'] + '_' + df['TIME'] + '_' + df['SESSION GUID'] + '.html'
-
-        book = load_workbook(ruta_archivo)
-        sheet = book.active
-        col_idx = sheet.max_column + 1
-        sheet.cell(row=1, column=col_idx).value = 'MATCH NAME'
-        for i, match_name in enumerate(df['MATCH NAME'], start=2):
-            sheet.cell(row=i, column=col_idx).value = match_name
-
-        book.save(ruta_archivo)
-        messagebox.showinfo("Éxito", "Archivo procesado exitosamente y columna 'MATCH NAME' agregada.")
-        return df
+        # Leer el Excel en una sola pasada con las columnas necesarias y crear MATCH NAME,
+        # o cargarlo de la caché si el archivo no cambió desde la última vez
+        df = cargar_registro_chat(ruta_archivo)
+
+        # Guardar MATCH NAME en un archivo aparte en lugar de sobrescribir el original
+        ruta_salida = guardar_match_names(df, ruta_archivo)
+
+        # Índice MATCH NAME -> fila para que cada búsqueda posterior sea O(1)
+        indice = construir_indice(df)
+        mensaje = mensaje_registro(df, ruta_salida)
+        if indice.duplicados:
+            mensaje += f"\nSe encontraron {len(indice.duplicados)} MATCH NAME duplicados; se usa la primera fila de cada uno."
+        messagebox.showinfo("Éxito", mensaje)
+        return indice
+
+    except ColumnasFaltantes:
+        messagebox.showerror("Error", "El archivo no contiene las columnas necesarias")
+        return None
 
     except Exception as e:
         messagebox.showerror("Error", f"Ha ocurrido un error: {str(e)}")
         return None
 
-# Función para procesar los archivos ZIP y renombrar los archivos HTML
-def procesar_zip(ruta_zip, df, output_folder):
-    matches_found = 0
-    try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with zipfile.ZipFile(ruta_zip, 'r') as main_zip:
-                main_zip.extractall(temp_dir)
-
-                for root, dirs, files in os.walk(temp_dir):
-                    for file_name in files:
-                        if file_name.endswith('.zip'):
-                            zip_file_path_internal = os.path.join(root, file_name)
-                            with zipfile.ZipFile(zip_file_path_internal, 'r') as inner_zip:
-                                html_files = [f for f in inner_zip.namelist() if f.endswith('.html')]
-
-                                for html_file_name in html_files:
-                                    new_html_name = f"{os.path.splitext(file_name)[0]}.html"
-                                    html_output_path = os.path.join(output_folder, new_html_name)
-
-                                    with inner_zip.open(html_file_name) as html_file:
-                                        with open(html_output_path, 'wb') as f_out:
-                                            f_out.write(html_file.read())
-
-                                    # Verificar si el nombre del archivo HTML coincide con la columna MATCH NAME
-                                    if new_html_name in df['MATCH NAME'].values:
-                                        matches_found += 1
-                                        # Crear nuevo Excel a partir del HTML
-                                        crear_nuevo_excel(new_html_name, df, output_folder)
-
-        if matches_found > 0:
-            messagebox.showinfo("Coincidencias", f"Se encontraron {matches_found} coincidencias.")
+# Función para procesar los archivos ZIP y renombrar los archivos HTML.
+# Se ejecuta en un hilo aparte para que la ventana siga respondiendo y se informa con un solo resumen
+def procesar_zip(ruta_zip, indice, output_folder, solo_coincidencias=False, libro_unico=False,
+                 hipervinculos=True):
+    global tarea
+    if tarea is not None:
+        return
+    modo_excel = 'libro' if libro_unico else 'por_coincidencia'
+
+    def procesar(progreso, cancelar):
+        return pipeline.procesar_zip(
+            ruta_zip, indice, output_folder,
+            solo_coincidencias=solo_coincidencias,
+            modo_excel=modo_excel,
+            hipervinculos=hipervinculos,
+            trabajadores=trabajadores_por_defecto(),
+            progreso=progreso,
+            cancelar=cancelar,
+        )
+
+    tarea = TareaEnSegundoPlano(root, procesar, al_progreso=mostrar_progreso,
+                                al_terminar=zip_procesado, al_fallar=zip_fallido)
+    cancel_button.config(state='normal')
+    progress_var.set("Procesando...")
+    tarea.iniciar()
+
+def cancelar_proceso():
+    if tarea is not None:
+        tarea.cancelar.set()
+        progress_var.set("Cancelando...")
+
+def mostrar_progreso(evento):
+    progress_var.set(texto_progreso(evento))
+
+def fin_de_tarea():
+    global tarea
+    tarea = None
+    cancel_button.config(state='disabled')
+
+def zip_procesado(resultado):
+    fin_de_tarea()
+    progress_var.set("Proceso terminado.")
+    if resultado['coincidencias']:
+        if resultado['libro']:
+            excel_creado = f"Libro de coincidencias: {resultado['libro']}."
         else:
-            messagebox.showwarning("Sin coincidencias", "No se encontraron coincidencias.")
-    
-    except Exception as e:
-        messagebox.showerror("Error", f"Hubo un problema procesando los archivos ZIP: {str(e)}")
+            excel_creado = f"Archivos Excel creados: {len(resultado['coincidencias'])}."
+        messagebox.showinfo(
+            "Coincidencias",
+            f"Se encontraron {len(resultado['coincidencias'])} coincidencias.\n"
+            f"Transcripciones en el ZIP sin fila en el Excel: {len(resultado['sin_excel'])}.\n"
+            f"Filas del Excel sin transcripción: {len(resultado['sin_zip'])}.\n"
+            f"{excel_creado}"
+        )
+    else:
+        messagebox.showwarning("Sin coincidencias", "No se encontraron coincidencias.")
+
+def zip_fallido(error):
+    fin_de_tarea()
+    if isinstance(error, ProcesoCancelado):
+        progress_var.set("Proceso cancelado.")
+        return
+    progress_var.set("")
+    messagebox.showerror("Error", f"Hubo un problema procesando los archivos ZIP: {str(error)}")
 
-def crear_nuevo_excel(html_file, df, output_folder):
-    try:
-        # Buscar la fila que coincide con el nombre del HTML
-        match_row = df[df['MATCH NAME'] == html_file].iloc[0]
-
-        # Extraer los valores necesarios
-        agent_name = match_row['AGENT NAME'] 
-        customer_id = match_row['CUSTOMER ID']
-        account_name = match_row['ACCOUNT NAME']
-
-        nuevo_excel_path = os.path.join(output_folder, f"{agent_name}_{customer_id}_{account_name}.xlsx")
-
-        # Crear un nuevo DataFrame para el archivo Excel
-        new_df = pd.DataFrame({
-            "Agent": [agent_name],
-            "Customer ID": [customer_id],
-            "Account Name": [account_name]
-        })
-
-        # Guardar en un nuevo archivo Excel
-        new_df.to_excel(nuevo_excel_path, index=False)
-        messagebox.showinfo("Éxito", f"Archivo creado: {nuevo_excel_path}")
-    
-    except Exception as e:
-        print(f"Error: {e}")
-        messagebox.showerror("Error", f"Ocurrió un error: {str(e)}")
 # Funciones de selección de archivos y carpetas
 def select_excel_file():
     archivo_excel = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx *.xls")])
     if archivo_excel:
         excel_file_var.set(archivo_excel)
-        df = procesar_excel(archivo_excel)
-        if df is not None:
-            select_zip_file(df)
+        indice = procesar_excel(archivo_excel)
+        if indice is not None:
+            select_zip_file(indice)
 
-def select_zip_file(df):
+def select_zip_file(indice):
     archivo_zip = filedialog.askopenfilename(filetypes=[("ZIP files", "*.zip")])
     if archivo_zip:
         zip_file_var.set(archivo_zip)
         output_folder = filedialog.askdirectory(title="Selecciona la carpeta de salida")
         if output_folder:
-            procesar_zip(archivo_zip, df, output_folder)
+            procesar_zip(archivo_zip, indice, output_folder, solo_coincidencias_var.get(), libro_unico_var.get(),
+                         hipervinculos_var.get())
 
 def select_output_folder():
     folder = filedialog.askdirectory(title="Selecciona la carpeta de salida")
@@ -135,7 +136,7 @@ def select_output_folder():
 # Configuración de la interfaz gráfica
 root = Tk()
 root.title("Procesador de Archivos de Llamadas")
-root.geometry("500x500")
+root.geometry("500x600")
 
 style = Style()
 style.theme_use('clam')
@@ -146,6 +147,11 @@ main_frame.pack(fill='both', expand=True)
 excel_file_var = StringVar()
 zip_file_var = StringVar()
 output_folder_var = StringVar()
+solo_coincidencias_var = BooleanVar(value=False)
+libro_unico_var = BooleanVar(value=False)
+hipervinculos_var = BooleanVar(value=True)
+progress_var = StringVar()
+tarea = None
 
 # Interfaz para seleccionar el Excel
 Label(main_frame, text="Archivo Excel:").pack(anchor='w')
@@ -157,11 +163,25 @@ Label(main_frame, text="Archivo ZIP:").pack(anchor='w')
 Label(main_frame, textvariable=zip_file_var, width=50, relief="sunken", padx=5).pack(fill='x', pady=(0, 5))
 Button(main_frame, text="Seleccionar ZIP", command=lambda: select_zip_file(match_case)).pack(pady=(0, 10))
 
+# Extraer solo los HTML que coinciden con el Excel
+Checkbutton(main_frame, text="Extraer solo coincidencias", variable=solo_coincidencias_var).pack(anchor='w')
+
+# Escribir todas las coincidencias en un solo libro en lugar de un Excel por coincidencia
+Checkbutton(main_frame, text="Un solo libro de coincidencias", variable=libro_unico_var).pack(anchor='w')
+
+# Agregar al libro el enlace a cada HTML; sin él, el libro se escribe más rápido
+Checkbutton(main_frame, text="Enlazar cada coincidencia con su HTML", variable=hipervinculos_var).pack(anchor='w', pady=(0, 10))
+
 # Interfaz para seleccionar la carpeta de salida (sin funcionalidad)
 Label(main_frame, text="Carpeta de Salida:").pack(anchor='w')
 Label(main_frame, textvariable=output_folder_var, width=50, relief="sunken", padx=5).pack(fill='x', pady=(0, 5))
 Button(main_frame, text="Seleccionar Carpeta", command=select_output_folder).pack(pady=(0, 10))
 
+# Avance del procesamiento del ZIP y botón para cancelarlo
+Label(main_frame, textvariable=progress_var, anchor='w').pack(fill='x')
+cancel_button = Button(main_frame, text="Cancelar", command=cancelar_proceso, state='disabled')
+cancel_button.pack(pady=(5, 10))
+
 # Botón para procesar archivos (sin funcionalidad de momento)
 Button(main_frame, text="Procesar Archivos", command=lambda: None, bg='#4CAF50', fg='white', padx=10, pady=5).pack(pady=20)
 
@@ -1,71 +1,90 @@
 import os
-import pandas as pd
-import zipfile
+import sys
+from multiprocessing import freeze_support
 from tkinter import Tk, filedialog, Label, Button, Entry, messagebox, Frame, StringVar
-from tkinter.ttk import Style
-from datetime import datetime
-import tempfile  # Para manejar directorios temporales
-from openpyxl import load_workbook
-
-# Función para formatear fechas
-def parse_date(date_str):
-    date_formats = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y%m%d']
-    for fmt in date_formats:
-        try:
-            return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
-        except ValueError:
-            continue
-    return None
-
-# Función para procesar el archivo Excel
-def procesar_excel(ruta_archivo):
-    try:
-        # Cargar el archivo Excel
-        df = pd.read_excel(ruta_archivo)
-
-        # Validar si las columnas necesarias están presentes
-        columnas_necesarias = ['DATE', 'TIME', 'SESSION GUID']
-        if not all(col in df.columns for col in columnas_necesarias):
-            messagebox.showerror("Error", "El archivo no contiene las columnas necesarias")
-            return
-
-        # Procesar las columnas DATE y TIME
-        df['DATE'] = df['DATE'].astype(str).str.replace("/", "-")
-        df['TIME'] = df['TIME'].astype(str).str.replace(":", "")
-        
-        # Crear la columna MATCH NAME
-        df['MATCH NAME'] = 'chat_' + df['DATE'] + '' + df['TIME'] + '' + df['SESSION GUID']
-
-        # Cargar el archivo Excel con openpyxl para mantener el formato
-        book = load_workbook(ruta_archivo)
-        sheet = book.active
-
-        # Escribir la nueva columna MATCH NAME en el archivo, manteniendo el formato
-        col_idx = sheet.max_column + 1  # Ubicar la nueva columna al final
-        sheet.cell(row=1, column=col_idx).value = 'MATCH NAME'  # Agregar el encabezado
-
-        # Insertar los valores de la nueva columna
-        for i, match_name in enumerate(df['MATCH NAME'], start=2):
-            sheet.cell(row=i, column=col_idx).value = match_name
-
-        # Guardar el archivo sobrescribiendo el original
-        book.save(ruta_archivo)
-        messagebox.showinfo("Éxito", "Archivo procesado exitosamente y columna 'MATCH NAME' agregada.")
-    
-    except Exception as e:
-        messagebox.showerror("Error", f"Ha ocurrido un error: {str(e)}")
+from tkinter.ttk import Style, Progressbar
+from procesador.extraccion import ProcesoCancelado, trabajadores_por_defecto
+from procesador.medicion import Medicion
+from procesador.pipeline import cargar_indice, indexar_registros, procesar_lote
+from procesador.segundo_plano import TareaEnSegundoPlano, texto_progreso
+
+# Función para procesar los archivos Excel. Se leen en un hilo aparte para que la ventana siga
+# respondiendo, y el índice queda en indices_cargados para que process_files no vuelva a leerlos
+def procesar_excel(rutas_archivo):
+    global tarea
+    if tarea is not None:
+        return
+    rutas_archivo = list(rutas_archivo)
+
+    def leer(progreso, cancelar):
+        # pandas se carga recién aquí: la ventana abre sin esperarlo y el camino solo-ZIP nunca lo necesita
+        from procesador.lectura_excel import cargar_registro_chat, guardar_match_names, mensaje_registro
+        if len(rutas_archivo) > 1:
+            # Varios registros (Agent Chat Log y bitácoras): se leen a la vez en procesos
+            # y se reúnen en un solo índice de MATCH NAME
+            medicion = Medicion()
+            indice, resumen = cargar_indice(rutas_archivo, procesos=trabajadores_por_defecto(), medicion=medicion)
+            lineas = [
+                f"{os.path.basename(registro['excel'])}: {registro['filas']} filas, "
+                f"{registro['claves_nuevas']} MATCH NAME nuevos, {registro['duplicados']} repetidos"
+                for registro in resumen
+            ]
+            lineas.append(f"Total: {len(indice)} MATCH NAME distintos.")
+            if indice.duplicados:
+                lineas.append("De cada MATCH NAME repetido se usa la primera fila.")
+            sin_guardar = medicion.etapas.get('columna_match_name', {}).get('sin_guardar', 0)
+            if sin_guardar:
+                lineas.append(f"No se pudo guardar la columna 'MATCH NAME' de {sin_guardar} registros; se usan igual.")
+            return indice, resumen, "\n".join(lineas)
+
+        # Leer el Excel en una sola pasada con las columnas necesarias y crear MATCH NAME,
+        # o cargarlo de la caché si el archivo no cambió desde la última vez
+        df = cargar_registro_chat(rutas_archivo[0])
+
+        # Guardar MATCH NAME en un archivo aparte en lugar de sobrescribir el original
+        ruta_salida = guardar_match_names(df, rutas_archivo[0])
+        indice, resumen = indexar_registros(rutas_archivo, [df])
+        mensaje = mensaje_registro(df, ruta_salida)
+        if resumen[0]['duplicados']:
+            mensaje += (f"\n{resumen[0]['duplicados']} filas repiten un MATCH NAME; "
+                        "se usa la primera fila de cada uno.")
+        return indice, resumen, mensaje
+
+    def al_terminar(leido):
+        indice, resumen, mensaje = leido
+        fin_de_tarea()
+        progress_var.set("")
+        # La misma clave que usa procesar_lote para reconocer los registros ya leídos
+        indices_cargados.clear()
+        indices_cargados[tuple(os.path.abspath(ruta) for ruta in rutas_archivo)] = (indice, resumen)
+        messagebox.showinfo("Éxito", mensaje)
+
+    def al_fallar(error):
+        from procesador.lectura_excel import ColumnasFaltantes
+        fin_de_tarea()
+        progress_var.set("")
+        if isinstance(error, ColumnasFaltantes):
+            # El mensaje dice cuál de los registros es y qué columnas le faltan
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Ha ocurrido un error: {str(error)}")
+
+    tarea = TareaEnSegundoPlano(root, leer, al_terminar=al_terminar, al_fallar=al_fallar)
+    process_button.config(state='disabled')
+    progress_var.set("Leyendo registros de chats...")
+    tarea.iniciar()
 
 # Funciones de selección de archivos
 def select_excel_file():
-    global excel_file_path
-    excel_file_path = filedialog.askopenfilename(
-        title="Selecciona el archivo Excel",
+    global excel_file_paths
+    excel_file_paths = list(filedialog.askopenfilenames(
+        title="Selecciona uno o varios archivos Excel",
         filetypes=[("Archivos Excel", "*.xlsx *.xls")]
-    )
-    if excel_file_path:
-        excel_file_var.set(os.path.basename(excel_file_path))
-        # Procesar el archivo Excel inmediatamente después de seleccionar
-        procesar_excel(excel_file_path)
+    ))
+    if excel_file_paths:
+        excel_file_var.set(", ".join(os.path.basename(ruta) for ruta in excel_file_paths))
+        # Procesar los archivos Excel inmediatamente después de seleccionar
+        procesar_excel(excel_file_paths)
 
 def select_zip_file():
     global zip_file_path
@@ -84,87 +103,132 @@ def select_output_folder():
 
 # Función principal de procesamiento
 def process_files():
-    if not excel_file_path or not zip_file_path or not output_folder_path:
-        messagebox.showerror("Error", "Debes seleccionar el archivo Excel, el archivo ZIP y la carpeta de salida")
+    global tarea
+    if not zip_file_path or not output_folder_path:
+        messagebox.showerror("Error", "Debes seleccionar el archivo ZIP y la carpeta de salida")
+        return
+    if tarea is not None:
         return
-    
-    try:
-        if not os.path.exists(output_folder_path) or not os.path.isdir(output_folder_path):
-            messagebox.showerror("Error", "La ruta de salida no es válida")
-            return
-
-        # Parsear la fecha si es proporcionada
-        date_str = date_entry.get()
-        if date_str:
-            folder_date = parse_date(date_str)
-            if not folder_date:
-                messagebox.showerror("Error", "El formato de la fecha no es válido. Usa formatos como 'YYYY-MM-DD', 'DD/MM/YYYY', 'DD-MM-YYYY', o 'YYYYMMDD'")
-                return
-        else:
-            folder_date = datetime.now().strftime('%Y-%m-%d')
-
-        output_folder = os.path.join(output_folder_path, folder_date)
-        os.makedirs(output_folder, exist_ok=True)
-
-        # Crear un directorio temporal para extraer los archivos ZIP
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Descomprimir el archivo ZIP principal en el directorio temporal
-            with zipfile.ZipFile(zip_file_path, 'r') as main_zip:
-                main_zip.extractall(temp_dir)
-
-                # Recorrer los archivos ZIP internos
-                for root, dirs, files in os.walk(temp_dir):
-                    for file_name in files:
-                        if file_name.endswith('.zip'):
-                            zip_file_path_internal = os.path.join(root, file_name)
-                            with zipfile.ZipFile(zip_file_path_internal, 'r') as inner_zip:
-                                html_files = [f for f in inner_zip.namelist() if f.endswith('.html')]
 
-                                for html_file_name in html_files:
-                                    # Renombrar el archivo HTML usando el nombre del archivo ZIP interno
-                                    new_html_name = f"{os.path.splitext(file_name)[0]}.html"
-                                    html_output_path = os.path.join(output_folder, new_html_name)
+    # Sin Excel solo se extraen los HTML, sin cruzarlos con el registro de chats
+    rutas_excel = list(excel_file_paths)
+    rutas_zip, salida, fecha = [zip_file_path], output_folder_path, date_entry.get()
+
+    # El mismo procesamiento que la línea de comandos (python -m procesador), fuera del hilo de la ventana
+    def procesar(progreso, cancelar):
+        medicion = Medicion()
+        resultado = procesar_lote(rutas_excel, rutas_zip, salida, fecha, indices_cargados=indices_cargados,
+                                  trabajadores=trabajadores_por_defecto(), procesos_excel=trabajadores_por_defecto(),
+                                  progreso=progreso, cancelar=cancelar, medicion=medicion)
+        # Tiempos por etapa de esta ejecución, para comparar entre días
+        resultado['informe'] = medicion.guardar_informe(salida)
+        return resultado
+
+    tarea = TareaEnSegundoPlano(root, procesar, al_progreso=mostrar_progreso,
+                                al_terminar=proceso_terminado, al_fallar=proceso_fallido)
+    process_button.config(state='disabled')
+    cancel_button.config(state='normal')
+    progress_var.set("Procesando...")
+    progress_bar['value'] = 0
+    tarea.iniciar()
+
+def cancel_processing():
+    if tarea is not None:
+        tarea.cancelar.set()
+        progress_var.set("Cancelando...")
+
+def mostrar_progreso(evento):
+    progress_bar['maximum'] = max(evento['total'], 1)
+    progress_bar['value'] = evento['zips_internos']
+    progress_var.set(texto_progreso(evento))
+
+def fin_de_tarea():
+    global tarea
+    tarea = None
+    process_button.config(state='normal')
+    cancel_button.config(state='disabled')
+
+def proceso_terminado(resultado):
+    fin_de_tarea()
+    zip_resultado = resultado['zips'][0]
+    progress_var.set("Proceso terminado.")
+    mensaje = ("Archivos ZIP procesados y descomprimidos correctamente.\n"
+               f"HTML extraídos: {zip_resultado['htmls']}.\n")
+    if resultado['registros']:
+        mensaje += (f"Coincidencias con el Excel: {len(zip_resultado['coincidencias'])}.\n"
+                    f"Filas del Excel sin transcripción: {len(zip_resultado['sin_zip'])}.\n")
+    messagebox.showinfo("Éxito", mensaje + f"Tiempo: {zip_resultado['segundos']:.1f} s.")
+
+def proceso_fallido(error):
+    fin_de_tarea()
+    if isinstance(error, ProcesoCancelado):
+        progress_var.set("Proceso cancelado.")
+        messagebox.showinfo("Cancelado", "Proceso cancelado. Al volver a procesar se continúa donde quedó.")
+        return
+    progress_var.set("")
+    messagebox.showerror("Error", f"Hubo un problema procesando los archivos: {str(error)}")
 
-                                    with inner_zip.open(html_file_name) as html_file:
-                                        with open(html_output_path, 'wb') as f_out:
-                                            f_out.write(html_file.read())
+# Rutas seleccionadas en la interfaz, índice de los registros de chats ya leídos y procesamiento en curso
+excel_file_paths = []
+indices_cargados = {}
+zip_file_path = None
+output_folder_path = None
+tarea = None
 
-        messagebox.showinfo("Éxito", "Archivos ZIP procesados y descomprimidos correctamente.")
+# Con esta variable definida (la usa verificar_arranque.py) se avisa cuando la ventana queda lista,
+# indicando si se cargó pandas por el camino, y se cierra sin esperar al usuario
+MEDIR_ARRANQUE = 'PROCESADOR_MEDIR_ARRANQUE'
 
-    except Exception as e:
-        messagebox.showerror("Error", f"Hubo un problema procesando los archivos: {str(e)}")
+def informar_arranque():
+    print(f"ventana_lista pandas={'pandas' in sys.modules}", flush=True)
+    root.destroy()
 
 # Configuración de la interfaz gráfica
-root = Tk()
-root.title("Procesador de Archivos de Llamadas")
-root.geometry("500x500")
-
-style = Style()
-style.theme_use('clam')
-
-main_frame = Frame(root, padx=20, pady=20)
-main_frame.pack(fill='both', expand=True)
-
-excel_file_var = StringVar()
-zip_file_var = StringVar()
-output_folder_var = StringVar()
-
-Label(main_frame, text="Archivo Excel:").pack(anchor='w')
-Label(main_frame, textvariable=excel_file_var, width=50, relief="sunken", padx=5).pack(fill='x', pady=(0, 5))
-Button(main_frame, text="Seleccionar Excel", command=select_excel_file).pack(pady=(0, 10))
-
-Label(main_frame, text="Archivo ZIP:").pack(anchor='w')
-Label(main_frame, textvariable=zip_file_var, width=50, relief="sunken", padx=5).pack(fill='x', pady=(0, 5))
-Button(main_frame, text="Seleccionar ZIP", command=select_zip_file).pack(pady=(0, 10))
-
-Label(main_frame, text="Carpeta de Salida:").pack(anchor='w')
-Label(main_frame, textvariable=output_folder_var, width=50, relief="sunken", padx=5).pack(fill='x', pady=(0, 5))
-Button(main_frame, text="Seleccionar Carpeta", command=select_output_folder).pack(pady=(0, 10))
-
-Label(main_frame, text="Fecha (opcional, formato: YYYY-MM-DD):").pack(anchor='w')
-date_entry = Entry(main_frame)
-date_entry.pack(fill='x', pady=(0, 10))
-
-Button(main_frame, text="Procesar Archivos", command=process_files, bg='#4CAF50', fg='white', padx=10, pady=5).pack(pady=20)
-
-root.mainloop()
+if __name__ == '__main__':
+    # Necesario para los procesos que leen varios Excel a la vez desde el main.exe empaquetado
+    freeze_support()
+
+    root = Tk()
+    root.title("Procesador de Archivos de Llamadas")
+    root.geometry("500x600")
+
+    style = Style()
+    style.theme_use('clam')
+
+    main_frame = Frame(root, padx=20, pady=20)
+    main_frame.pack(fill='both', expand=True)
+
+    excel_file_var = StringVar()
+    zip_file_var = StringVar()
+    output_folder_var = StringVar()
+
+    Label(main_frame, text="Archivos Excel (uno o varios):").pack(anchor='w')
+    Label(main_frame, textvariable=excel_file_var, width=50, relief="sunken", padx=5).pack(fill='x', pady=(0, 5))
+    Button(main_frame, text="Seleccionar Excel", command=select_excel_file).pack(pady=(0, 10))
+
+    Label(main_frame, text="Archivo ZIP:").pack(anchor='w')
+    Label(main_frame, textvariable=zip_file_var, width=50, relief="sunken", padx=5).pack(fill='x', pady=(0, 5))
+    Button(main_frame, text="Seleccionar ZIP", command=select_zip_file).pack(pady=(0, 10))
+
+    Label(main_frame, text="Carpeta de Salida:").pack(anchor='w')
+    Label(main_frame, textvariable=output_folder_var, width=50, relief="sunken", padx=5).pack(fill='x', pady=(0, 5))
+    Button(main_frame, text="Seleccionar Carpeta", command=select_output_folder).pack(pady=(0, 10))
+
+    Label(main_frame, text="Fecha (opcional, formato: YYYY-MM-DD):").pack(anchor='w')
+    date_entry = Entry(main_frame)
+    date_entry.pack(fill='x', pady=(0, 10))
+
+    process_button = Button(main_frame, text="Procesar Archivos", command=process_files, bg='#4CAF50', fg='white', padx=10, pady=5)
+    process_button.pack(pady=(20, 10))
+
+    # Avance del procesamiento y botón para cancelarlo
+    progress_var = StringVar()
+    progress_bar = Progressbar(main_frame, mode='determinate')
+    progress_bar.pack(fill='x')
+    Label(main_frame, textvariable=progress_var, anchor='w').pack(fill='x', pady=(5, 5))
+    cancel_button = Button(main_frame, text="Cancelar", command=cancel_processing, state='disabled')
+    cancel_button.pack()
+
+    if os.environ.get(MEDIR_ARRANQUE):
+        root.after_idle(informar_arranque)
+    root.mainloop()
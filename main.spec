@@ -10,25 +10,29 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Paquetes que pandas u openpyxl importan solo de forma opcional: sacarlos achica el
+    # paquete. pyarrow se incluye aunque pesa: sin él no hay caché de registros de chats ni
+    # métricas en parquet
+    excludes=['IPython', 'jinja2', 'markupsafe', 'matplotlib', 'PIL', 'pytest', 'scipy'],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
+# Empaquetado en carpeta (dist/main/main.exe junto a sus bibliotecas) y no en un solo archivo:
+# un ejecutable de un solo archivo descomprime pandas, numpy y pyarrow en un temporal en cada
+# arranque, y ese costo crece con cada paquete que se incluye. En carpeta no se descomprime nada.
+# Medir con: python verificar_arranque.py --ejecutable dist/main/main.exe
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='main',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
     upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +40,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    name='main',
+)
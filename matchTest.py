@@ -1,12 +1,12 @@
 from ast import match_case
-import os
-import pandas as pd
-import zipfile
 from tkinter import Tk, filedialog, Label, Button, StringVar, Frame, messagebox
 from tkinter.ttk import Style
 from datetime import datetime
-import tempfile
-from openpyxl import load_workbook
+from procesador.lectura_excel import ColumnasFaltantes, cargar_registro_chat, guardar_match_names, mensaje_registro
+from procesador.extraccion import ProcesoCancelado, trabajadores_por_defecto
+from procesador.indice import construir_indice
+from procesador import pipeline
+from procesador.segundo_plano import TareaEnSegundoPlano, texto_progreso
 
 # Función para formatear fechas
 def parse_date(date_str):
@@ -21,65 +21,72 @@ def parse_date(date_str):
 # Función para procesar el archivo Excel
 def procesar_excel(ruta_archivo):
     try:
-        df = pd.read_excel(ruta_archivo)
-        columnas_necesarias = ['DATE', 'TIME', 'SESSION GUID']
-        if not all(col in df.columns for col in columnas_necesarias):
-            messagebox.showerror("Error", "El archivo no contiene las columnas necesarias")
-            return None
-
-        df['DATE'] = df['DATE'].astype(str).str.replace("/", "-")
-        df['TIME'] = df['TIME'].astype(str).str.replace(":", "")
-        df['MATCH NAME'] = 'chat_' + df['DATE'] + '_' + df['TIME'] + '_' + df['SESSION GUID'] + '.html'
-
-        book = load_workbook(ruta_archivo)
-        sheet = book.active
-        col_idx = sheet.max_column + 1
-        sheet.cell(row=1, column=col_idx).value = 'MATCH NAME'
-        for i, match_name in enumerate(df['MATCH NAME'], start=2):
-            sheet.cell(row=i, column=col_idx).value = match_name
-
-        book.save(ruta_archivo)
-        messagebox.showinfo("Éxito", "Archivo procesado exitosamente y columna 'MATCH NAME' agregada.")
-        return df['MATCH NAME'].tolist()
+        # Leer el Excel en una sola pasada con las columnas necesarias y crear MATCH NAME,
+        # o cargarlo de la caché si el archivo no cambió desde la última vez
+        df = cargar_registro_chat(ruta_archivo)
+
+        # Guardar MATCH NAME en un archivo aparte en lugar de sobrescribir el original
+        ruta_salida = guardar_match_names(df, ruta_archivo)
+        messagebox.showinfo("Éxito", mensaje_registro(df, ruta_salida))
+        # Índice para que cada verificación de coincidencia sea O(1)
+        return construir_indice(df)
+
+    except ColumnasFaltantes:
+        messagebox.showerror("Error", "El archivo no contiene las columnas necesarias")
+        return None
 
     except Exception as e:
         messagebox.showerror("Error", f"Ha ocurrido un error: {str(e)}")
         return None
 
-# Función para procesar los archivos ZIP y renombrar los archivos HTML
+# Función para procesar los archivos ZIP y renombrar los archivos HTML.
+# Se ejecuta en un hilo aparte para que la ventana siga respondiendo
 def procesar_zip(ruta_zip, match_names, output_folder):
-    matches_found = 0
-    try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with zipfile.ZipFile(ruta_zip, 'r') as main_zip:
-                main_zip.extractall(temp_dir)
-
-                for root, dirs, files in os.walk(temp_dir):
-                    for file_name in files:
-                        if file_name.endswith('.zip'):
-                            zip_file_path_internal = os.path.join(root, file_name)
-                            with zipfile.ZipFile(zip_file_path_internal, 'r') as inner_zip:
-                                html_files = [f for f in inner_zip.namelist() if f.endswith('.html')]
-
-                                for html_file_name in html_files:
-                                    new_html_name = f"{os.path.splitext(file_name)[0]}.html"
-                                    html_output_path = os.path.join(output_folder, new_html_name)
-
-                                    with inner_zip.open(html_file_name) as html_file:
-                                        with open(html_output_path, 'wb') as f_out:
-                                            f_out.write(html_file.read())
-
-                                    # Verificar si el nombre del archivo HTML coincide con la columna MATCH NAME
-                                    if new_html_name in match_names:
-                                        matches_found += 1
-
-        if matches_found > 0:
-            messagebox.showinfo("Coincidencias", f"Se encontraron {matches_found} coincidencias.")
-        else:
-            messagebox.showwarning("Sin coincidencias", "No se encontraron coincidencias.")
-    
-    except Exception as e:
-        messagebox.showerror("Error", f"Hubo un problema procesando los archivos ZIP: {str(e)}")
+    global tarea
+    if tarea is not None:
+        return
+
+    def procesar(progreso, cancelar):
+        return pipeline.procesar_zip(ruta_zip, match_names, output_folder,
+                                     trabajadores=trabajadores_por_defecto(),
+                                     progreso=progreso, cancelar=cancelar)
+
+    tarea = TareaEnSegundoPlano(root, procesar, al_progreso=mostrar_progreso,
+                                al_terminar=zip_procesado, al_fallar=zip_fallido)
+    cancel_button.config(state='normal')
+    progress_var.set("Procesando...")
+    tarea.iniciar()
+
+def cancelar_proceso():
+    if tarea is not None:
+        tarea.cancelar.set()
+        progress_var.set("Cancelando...")
+
+def mostrar_progreso(evento):
+    progress_var.set(texto_progreso(evento))
+
+def fin_de_tarea():
+    global tarea
+    tarea = None
+    cancel_button.config(state='disabled')
+
+def zip_procesado(resultado):
+    fin_de_tarea()
+    progress_var.set("Proceso terminado.")
+    matches_found = len(resultado['coincidencias'])
+
+    if matches_found > 0:
+        messagebox.showinfo("Coincidencias", f"Se encontraron {matches_found} coincidencias.")
+    else:
+        messagebox.showwarning("Sin coincidencias", "No se encontraron coincidencias.")
+
+def zip_fallido(error):
+    fin_de_tarea()
+    if isinstance(error, ProcesoCancelado):
+        progress_var.set("Proceso cancelado.")
+        return
+    progress_var.set("")
+    messagebox.showerror("Error", f"Hubo un problema procesando los archivos ZIP: {str(error)}")
 
 # Funciones de selección de archivos y carpetas
 def select_excel_file():
@@ -106,7 +113,7 @@ def select_output_folder():
 # Configuración de la interfaz gráfica
 root = Tk()
 root.title("Procesador de Archivos de Llamadas")
-root.geometry("500x500")
+root.geometry("500x600")
 
 style = Style()
 style.theme_use('clam')
@@ -117,6 +124,8 @@ main_frame.pack(fill='both', expand=True)
 excel_file_var = StringVar()
 zip_file_var = StringVar()
 output_folder_var = StringVar()
+progress_var = StringVar()
+tarea = None
 
 # Interfaz para seleccionar el Excel
 Label(main_frame, text="Archivo Excel:").pack(anchor='w')
@@ -133,6 +142,11 @@ Label(main_frame, text="Carpeta de Salida:").pack(anchor='w')
 Label(main_frame, textvariable=output_folder_var, width=50, relief="sunken", padx=5).pack(fill='x', pady=(0, 5))
 Button(main_frame, text="Seleccionar Carpeta", command=select_output_folder).pack(pady=(0, 10))
 
+# Avance del procesamiento del ZIP y botón para cancelarlo
+Label(main_frame, textvariable=progress_var, anchor='w').pack(fill='x')
+cancel_button = Button(main_frame, text="Cancelar", command=cancelar_proceso, state='disabled')
+cancel_button.pack(pady=(5, 10))
+
 # Botón para procesar archivos (sin funcionalidad de momento)
 Button(main_frame, text="Procesar Archivos", command=lambda: None, bg='#4CAF50', fg='white', padx=10, pady=5).pack(pady=20)
 
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+# Carpeta del almacén dentro de la raíz de salida, compartida por todas las carpetas de fecha
+CARPETA_ALMACEN = '.almacen_html'
+
+# Cada HTML se lee a memoria mientras se calcula su hash; por encima de este tamaño pasa a un temporal
+LIMITE_MEMORIA_HTML = 8 * 1024 * 1024
+
+
+# Almacén de transcripciones por contenido: cada HTML distinto se guarda una sola vez, con su
+# SHA-256 como nombre, y las carpetas de fecha lo referencian con un enlace duro. Las ventanas
+# de exportación se solapan, así que la misma transcripción suele llegar en varias entregas
+# diarias; con el almacén solo la primera se escribe a disco.
+# Solo guarda la ruta, así que se puede pasar tal cual a los procesos del pool
+class AlmacenContenido:
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+
+    @classmethod
+    def en_salida(cls, output_root):
+        return cls(os.path.join(output_root, CARPETA_ALMACEN))
+
+    def ruta(self, sha256):
+        return os.path.join(self.carpeta, sha256[:2], f"{sha256}.html")
+
+    # Lee el HTML de origen calculando su hash, lo guarda si el almacén no lo tiene y deja en
+    # destino un enlace a la copia del almacén. Devuelve (sha256, True si el contenido ya estaba)
+    def guardar(self, origen, destino, tam_bloque):
+        sha = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_HTML) as temporal:
+            for bloque in iter(lambda: origen.read(tam_bloque), b''):
+                sha.update(bloque)
+                temporal.write(bloque)
+            sha256 = sha.hexdigest()
+            ruta = self.ruta(sha256)
+            duplicado = os.path.exists(ruta)
+            if not duplicado:
+                temporal.seek(0)
+                self._escribir(temporal, ruta, tam_bloque)
+        _enlazar(ruta, destino)
+        return sha256, duplicado
+
+    def _escribir(self, temporal, ruta, tam_bloque):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Se escribe a un nombre propio y se renombra: dos trabajadores con el mismo
+        # contenido nuevo terminan con el mismo archivo, sin dejar uno a medias
+        descriptor, parcial = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as f_out:
+                shutil.copyfileobj(temporal, f_out, tam_bloque)
+            os.replace(parcial, ruta)
+        except BaseException:
+            if os.path.exists(parcial):
+                os.remove(parcial)
+            raise
+
+
+# Deja en destino un enlace duro a ruta; donde no se puede (otro volumen, FAT32) se copia
+def _enlazar(ruta, destino):
+    if os.path.exists(destino) and os.path.samefile(ruta, destino):
+        return
+    parcial = destino + '.tmp'
+    if os.path.exists(parcial):
+        os.remove(parcial)
+    try:
+        os.link(ruta, parcial)
+    except OSError:
+        shutil.copyfile(ruta, parcial)
+    os.replace(parcial, destino)
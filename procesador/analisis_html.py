@@ -0,0 +1,197 @@
+import codecs
+import importlib.util
+import os
+import re
+from html.parser import HTMLParser
+
+# Etiquetas que cierran un bloque de texto: cada bloque es a lo sumo un mensaje del chat
+ETIQUETAS_BLOQUE = {'p', 'div', 'li', 'tr', 'br', 'h1', 'h2', 'h3', 'h4', 'table', 'body'}
+
+# Línea de mensaje de la transcripción: "[07:05:37] Nombre: texto" o "07:05 PM Nombre: texto".
+# Es el único lugar a ajustar si la plataforma cambia el formato de sus transcripciones
+PATRON_MENSAJE = re.compile(
+    r'^\[?\(?(?P<hora>\d{1,2}:\d{2}(?::\d{2})?(?:\s*[AaPp]\.?[Mm]\.?)?)\)?\]?\s*'
+    r'(?P<autor>[^:\[\]]{1,80}?)\s*:\s*(?P<texto>.*)$'
+)
+
+_PARTES_HORA = re.compile(r'(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([AaPp])?')
+
+_SEGUNDOS_DIA = 24 * 60 * 60
+
+# Columnas de métricas que produce cada transcripción, en el orden del dataset
+COLUMNAS_METRICAS = [
+    'mensajes', 'mensajes_cliente', 'mensajes_agente', 'turnos_cliente', 'turnos_agente',
+    'inicio', 'fin', 'duracion_s', 'primera_respuesta_s', 'cliente', 'agentes',
+]
+
+# Sin pyarrow el dataset se guarda en CSV
+FORMATO_DATASET = 'parquet' if importlib.util.find_spec('pyarrow') is not None else 'csv'
+
+
+# Segundos desde la medianoche de una hora del chat, o None si no es válida.
+# Se calcula a mano: strptime por cada mensaje era la mayor parte del análisis
+def _hora(texto):
+    partes = _PARTES_HORA.match(texto)
+    horas, minutos, segundos = int(partes.group(1)), int(partes.group(2)), int(partes.group(3) or 0)
+    meridiano = (partes.group(4) or '').upper()
+    if meridiano:
+        if not 1 <= horas <= 12:
+            return None
+        horas = horas % 12 + (12 if meridiano == 'P' else 0)
+    if horas > 23 or minutos > 59 or segundos > 59:
+        return None
+    return horas * 3600 + minutos * 60 + segundos
+
+
+def _formatear_hora(segundos):
+    segundos %= _SEGUNDOS_DIA
+    return f'{segundos // 3600:02d}:{segundos // 60 % 60:02d}:{segundos % 60:02d}'
+
+
+# Analizador incremental de una transcripción: recibe el HTML en bloques de bytes mientras se
+# copia (alimentar) y, al terminar, devuelve las métricas del chat (metricas). El autor del
+# primer mensaje se toma como el cliente, porque los chats los inicia el cliente; el resto de
+# los autores cuentan como agente. Un turno es una racha de mensajes seguidos del mismo lado.
+# Con guardar_texto también se conserva el texto visible, un bloque por línea (texto)
+class AnalizadorTranscripcion(HTMLParser):
+    def __init__(self, codificacion='utf-8', guardar_texto=False):
+        super().__init__(convert_charrefs=True)
+        self._decodificador = codecs.getincrementaldecoder(codificacion)(errors='replace')
+        self._bloque = []
+        self._mensajes = []
+        self._ignorar = 0
+        self._textos = [] if guardar_texto else None
+        self._terminado = False
+
+    def alimentar(self, datos):
+        self.feed(self._decodificador.decode(datos))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self._ignorar += 1
+        elif tag in ETIQUETAS_BLOQUE:
+            self._cerrar_bloque()
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style'):
+            self._ignorar = max(self._ignorar - 1, 0)
+        elif tag in ETIQUETAS_BLOQUE:
+            self._cerrar_bloque()
+
+    def handle_data(self, data):
+        if not self._ignorar:
+            self._bloque.append(data)
+
+    def _cerrar_bloque(self):
+        texto = ' '.join(''.join(self._bloque).split())
+        self._bloque = []
+        if not texto:
+            return
+        if self._textos is not None:
+            self._textos.append(texto)
+        coincidencia = PATRON_MENSAJE.match(texto)
+        if coincidencia is None:
+            return
+        hora = _hora(coincidencia.group('hora'))
+        if hora is not None:
+            self._mensajes.append((hora, coincidencia.group('autor').strip()))
+
+    def terminar(self):
+        if self._terminado:
+            return
+        self.feed(self._decodificador.decode(b'', final=True))
+        self.close()
+        self._cerrar_bloque()
+        self._terminado = True
+
+    def metricas(self):
+        self.terminar()
+        return _calcular_metricas(self._mensajes)
+
+    def texto(self):
+        self.terminar()
+        return '\n'.join(self._textos or ())
+
+
+def _calcular_metricas(mensajes):
+    metricas = dict.fromkeys(COLUMNAS_METRICAS)
+    metricas.update(mensajes=len(mensajes), mensajes_cliente=0, mensajes_agente=0,
+                    turnos_cliente=0, turnos_agente=0)
+    if not mensajes:
+        return metricas
+
+    # Las horas no traen fecha: si una hora es menor que la anterior, el chat pasó la medianoche
+    horas = []
+    dias = 0
+    for hora, _ in mensajes:
+        if horas and hora + dias * _SEGUNDOS_DIA < horas[-1]:
+            dias += 1
+        horas.append(hora + dias * _SEGUNDOS_DIA)
+
+    cliente = mensajes[0][1]
+    agentes = []
+    lado_anterior = None
+    primera_respuesta = None
+    for (_, autor), hora in zip(mensajes, horas):
+        lado = 'cliente' if autor == cliente else 'agente'
+        metricas[f'mensajes_{lado}'] += 1
+        if lado != lado_anterior:
+            metricas[f'turnos_{lado}'] += 1
+        if lado == 'agente':
+            if autor not in agentes:
+                agentes.append(autor)
+            if primera_respuesta is None:
+                primera_respuesta = hora - horas[0]
+        lado_anterior = lado
+
+    metricas.update(
+        inicio=_formatear_hora(horas[0]),
+        fin=_formatear_hora(horas[-1]),
+        duracion_s=horas[-1] - horas[0],
+        primera_respuesta_s=primera_respuesta,
+        cliente=cliente,
+        agentes=', '.join(agentes),
+    )
+    return metricas
+
+
+# Lector que pasa cada bloque leído al analizador: el HTML se analiza mientras se copia,
+# sin volver a leer el archivo escrito
+class LectorAnalizado:
+    def __init__(self, origen, analizador):
+        self._origen = origen
+        self._analizador = analizador
+
+    def read(self, n=-1):
+        datos = self._origen.read(n)
+        if datos:
+            self._analizador.alimentar(datos)
+        return datos
+
+
+# Texto visible de una transcripción ya escrita (bytes del HTML)
+def texto_html(datos):
+    analizador = AnalizadorTranscripcion(guardar_texto=True)
+    analizador.alimentar(datos)
+    return analizador.texto()
+
+
+# Métricas de una transcripción ya escrita (bytes del HTML)
+def metricas_html(datos):
+    analizador = AnalizadorTranscripcion()
+    analizador.alimentar(datos)
+    return analizador.metricas()
+
+
+# Guarda el dataset de métricas (una fila por transcripción, con la fila del Excel si la hay)
+# como metricas_<nombre>.parquet, o .csv si no hay pyarrow. Devuelve la ruta escrita
+def guardar_metricas(filas, output_folder, nombre):
+    import pandas as pd
+
+    df = pd.DataFrame(filas)
+    ruta = os.path.join(output_folder, f"metricas_{nombre}.{FORMATO_DATASET}")
+    if FORMATO_DATASET == 'parquet':
+        df.to_parquet(ruta, index=False)
+    else:
+        df.to_csv(ruta, index=False, encoding='utf-8-sig')
+    return ruta
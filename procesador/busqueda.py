@@ -0,0 +1,255 @@
+import math
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+# Base de datos de búsqueda dentro de la raíz de salida, compartida por todas las carpetas de fecha
+NOMBRE_INDICE_BUSQUEDA = 'indice_transcripciones.sqlite'
+
+# Las altas se confirman cada tantas transcripciones: si la ejecución se interrumpe, la siguiente
+# vuelve a indexar ese tramo desde los HTML ya escritos
+TRANSCRIPCIONES_POR_TRANSACCION = 500
+
+# Resultados por búsqueda si no se indica otro límite
+LIMITE_RESULTADOS = 100
+
+# Columnas de cada resultado, además del fragmento del texto cuando se busca por texto
+COLUMNAS_BUSQUEDA = ['match_name', 'guid', 'fecha', 'hora', 'agente', 'cliente', 'cuenta', 'ruta', 'zip', 'indexado']
+
+# Sistemas de archivos de red (tipos de /proc/mounts) donde SQLite no admite WAL
+_SISTEMAS_DE_RED = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'sshfs', 'fuse.sshfs', '9p', 'afs', 'ceph', 'glusterfs')
+
+# 'chat_YYYY-MM-DD_HHMMSS_GUID.html', como lo arma normalizacion.construir_claves
+_PARTES_MATCH_NAME = re.compile(r'^chat_(\d{4}-\d{2}-\d{2})_(\d{6})_(.+)\.html$')
+
+_ESQUEMA = (
+    """CREATE TABLE IF NOT EXISTS transcripciones (
+        id INTEGER PRIMARY KEY,
+        match_name TEXT NOT NULL UNIQUE,
+        guid TEXT,
+        fecha TEXT,
+        hora TEXT,
+        agente TEXT,
+        cliente TEXT,
+        cuenta TEXT,
+        ruta TEXT,
+        zip TEXT,
+        indexado TEXT
+    )""",
+    'CREATE INDEX IF NOT EXISTS transcripciones_guid ON transcripciones (guid COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS transcripciones_agente ON transcripciones (agente COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS transcripciones_cliente ON transcripciones (cliente)',
+    'CREATE INDEX IF NOT EXISTS transcripciones_fecha ON transcripciones (fecha, hora)',
+)
+
+_ALTA = """
+    INSERT INTO transcripciones (match_name, guid, fecha, hora, agente, cliente, cuenta, ruta, zip, indexado)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (match_name) DO UPDATE SET
+        agente = COALESCE(excluded.agente, agente),
+        cliente = COALESCE(excluded.cliente, cliente),
+        cuenta = COALESCE(excluded.cuenta, cuenta),
+        ruta = excluded.ruta,
+        zip = excluded.zip,
+        indexado = excluded.indexado
+"""
+
+
+# True si la carpeta está en un disco local. WAL necesita memoria compartida entre procesos y
+# no funciona en un recurso de red; en Windows, si no se puede consultar la unidad, se toma como de red
+def en_disco_local(carpeta):
+    carpeta = os.path.abspath(carpeta)
+    if sys.platform == 'win32':
+        unidad = os.path.splitdrive(carpeta)[0]
+        if not unidad or unidad.startswith(('\\\\', '//')):
+            return False
+        try:
+            import ctypes
+
+            # DRIVE_REMOTE = 4: unidad de red asignada a una letra
+            return ctypes.windll.kernel32.GetDriveTypeW(unidad + '\\') != 4
+        except (ImportError, AttributeError, OSError):
+            return False
+    try:
+        with open('/proc/mounts', 'r', encoding='utf-8') as f:
+            montajes = [linea.split()[1:3] for linea in f]
+    except OSError:
+        # Sin /proc/mounts (macOS) no se puede saber; los recursos de red se montan en /Volumes
+        return not carpeta.startswith('/Volumes/')
+    tipo = None
+    largo = -1
+    for punto, sistema in montajes:
+        punto = punto.replace('\\040', ' ')
+        if (carpeta == punto or carpeta.startswith(punto.rstrip('/') + '/')) and len(punto) > largo:
+            tipo, largo = sistema, len(punto)
+    return tipo not in _SISTEMAS_DE_RED
+
+
+# Fecha, hora (HH:MM:SS) y GUID que van dentro del MATCH NAME
+def _partes_match_name(match_name):
+    partes = _PARTES_MATCH_NAME.match(match_name)
+    if partes is None:
+        return None, None, None
+    hora = partes.group(2)
+    return partes.group(1), f'{hora[:2]}:{hora[2:4]}:{hora[4:]}', partes.group(3)
+
+
+# Valor de una celda del Excel como texto; los CUSTOMER ID numéricos llegan como float
+def _texto_celda(valor):
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    valor = str(valor).strip()
+    return valor or None
+
+
+# Índice de búsqueda de las transcripciones extraídas, en una base SQLite en la raíz de salida:
+# una fila por MATCH NAME con su GUID, fecha, agente, cliente y dónde quedó el HTML, más el texto
+# visible en una tabla FTS5. Se llena mientras procesar_zip escribe cada HTML, así que cada ZIP
+# nuevo solo agrega sus transcripciones y nunca hay que reconstruirlo.
+# Solo guarda la ruta: cada escritura o búsqueda abre su propia conexión.
+# En disco local usa WAL, que permite buscar mientras otra ejecución indexa; en un recurso de red
+# (wal=None lo detecta) queda el journal por defecto de SQLite y una búsqueda espera a que termine
+# la transacción en curso
+class IndiceBusqueda:
+    def __init__(self, ruta, wal=None):
+        self.ruta = ruta
+        self.wal = en_disco_local(os.path.dirname(os.path.abspath(ruta))) if wal is None else wal
+
+    @classmethod
+    def en_salida(cls, output_root):
+        return cls(os.path.join(output_root, NOMBRE_INDICE_BUSQUEDA))
+
+    # Conexión con el esquema creado. Devuelve (conexión, True si el texto está en FTS5)
+    def conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        conexion.row_factory = sqlite3.Row
+        if self.wal:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+        else:
+            # Una base que quedó en WAL de una ejecución en disco local vuelve al journal por defecto
+            conexion.execute('PRAGMA journal_mode=DELETE')
+        with conexion:
+            for sql in _ESQUEMA:
+                conexion.execute(sql)
+            fts = _crear_tabla_texto(conexion)
+        return conexion, fts
+
+    def escritor(self):
+        return EscritorBusqueda(self)
+
+    # Transcripciones que cumplen todos los filtros indicados. texto se busca como frase (sin
+    # distinguir mayúsculas ni tildes) y los resultados traen un fragmento con la frase marcada
+    # entre corchetes; desde y hasta son fechas 'YYYY-MM-DD' del chat, inclusive
+    def buscar(self, texto=None, match_name=None, guid=None, agente=None, cliente=None,
+               desde=None, hasta=None, limite=LIMITE_RESULTADOS):
+        condiciones = []
+        parametros = []
+        for condicion, valor in (
+            ('t.match_name = ?', match_name),
+            ('t.guid = ? COLLATE NOCASE', guid),
+            ('t.agente = ? COLLATE NOCASE', agente),
+            ('t.cliente = ?', _texto_celda(cliente)),
+            ('t.fecha >= ?', desde),
+            ('t.fecha <= ?', hasta),
+        ):
+            if valor:
+                condiciones.append(condicion)
+                parametros.append(valor.strip())
+
+        columnas = ', '.join(f't.{columna}' for columna in COLUMNAS_BUSQUEDA)
+        conexion, fts = self.conectar()
+        try:
+            if texto and fts:
+                consulta = (f"SELECT {columnas}, snippet(textos, 0, '[', ']', '…', 16) AS fragmento "
+                            "FROM textos JOIN transcripciones t ON t.id = textos.rowid WHERE textos MATCH ?")
+                # Entre comillas la consulta es una frase literal y no la sintaxis de FTS5
+                parametros.insert(0, '"' + texto.replace('"', '""') + '"')
+                orden = 'bm25(textos)'
+            elif texto:
+                consulta = (f"SELECT {columnas}, NULL AS fragmento "
+                            "FROM textos JOIN transcripciones t ON t.id = textos.rowid "
+                            "WHERE instr(lower(textos.texto), lower(?)) > 0")
+                parametros.insert(0, texto)
+                orden = 't.fecha DESC, t.hora DESC'
+            else:
+                consulta = f"SELECT {columnas} FROM transcripciones t WHERE 1"
+                orden = 't.fecha DESC, t.hora DESC'
+            for condicion in condiciones:
+                consulta += f" AND {condicion}"
+            consulta += f" ORDER BY {orden} LIMIT ?"
+            parametros.append(int(limite))
+            return [dict(fila) for fila in conexion.execute(consulta, parametros)]
+        finally:
+            conexion.close()
+
+    # Cantidad de transcripciones indexadas
+    def total(self):
+        conexion, _ = self.conectar()
+        try:
+            return conexion.execute('SELECT COUNT(*) FROM transcripciones').fetchone()[0]
+        finally:
+            conexion.close()
+
+
+# Tabla del texto visible. Sin FTS5 (algunas compilaciones de SQLite no lo traen) el texto se
+# guarda en una tabla común y se busca recorriéndolo. Devuelve True si es FTS5
+def _crear_tabla_texto(conexion):
+    try:
+        conexion.execute("CREATE VIRTUAL TABLE IF NOT EXISTS textos "
+                         "USING fts5(texto, tokenize='unicode61 remove_diacritics 2')")
+    except sqlite3.OperationalError:
+        conexion.execute('CREATE TABLE IF NOT EXISTS textos (id INTEGER PRIMARY KEY, texto TEXT)')
+    sql = conexion.execute("SELECT sql FROM sqlite_master WHERE name = 'textos'").fetchone()[0]
+    return 'fts5' in sql.lower()
+
+
+# Altas en el índice durante un procesar_zip, en transacciones de TRANSCRIPCIONES_POR_TRANSACCION.
+# Una transcripción que ya estaba se actualiza: ruta y ZIP pasan a ser los últimos, los datos
+# del Excel se conservan si esta vez no hay fila y el texto se reemplaza si se indica
+class EscritorBusqueda:
+    def __init__(self, indice):
+        self._conexion, self._fts = indice.conectar()
+        self._pendientes = 0
+
+    def contiene(self, match_name):
+        return self._conexion.execute(
+            'SELECT 1 FROM transcripciones WHERE match_name = ?', (match_name,)).fetchone() is not None
+
+    # fila es la fila del Excel del MATCH NAME (o None) y ruta, el HTML o el contenedor que lo tiene
+    def agregar(self, match_name, fila=None, texto=None, ruta=None, ruta_zip=None):
+        fecha, hora, guid = _partes_match_name(match_name)
+        fila = fila or {}
+        self._conexion.execute(_ALTA, (
+            match_name, guid, fecha, hora,
+            _texto_celda(fila.get('AGENT NAME')),
+            _texto_celda(fila.get('CUSTOMER ID')),
+            _texto_celda(fila.get('ACCOUNT NAME')),
+            ruta, ruta_zip, datetime.now().isoformat(timespec='seconds'),
+        ))
+        if texto is not None:
+            id_transcripcion = self._conexion.execute(
+                'SELECT id FROM transcripciones WHERE match_name = ?', (match_name,)).fetchone()[0]
+            self._conexion.execute('DELETE FROM textos WHERE rowid = ?', (id_transcripcion,))
+            self._conexion.execute('INSERT INTO textos (rowid, texto) VALUES (?, ?)', (id_transcripcion, texto))
+        self._pendientes += 1
+        if self._pendientes >= TRANSCRIPCIONES_POR_TRANSACCION:
+            self._conexion.commit()
+            self._pendientes = 0
+
+    def cerrar(self):
+        if self._conexion is not None:
+            self._conexion.commit()
+            self._conexion.close()
+            self._conexion = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Lo ya indexado se confirma aunque la extracción haya fallado: coincide con lo escrito
+        self.cerrar()
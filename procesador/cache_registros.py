@@ -0,0 +1,74 @@
+import hashlib
+import importlib.util
+import os
+import re
+
+import pandas as pd
+
+# La caché se guarda en parquet y sin pyarrow queda desactivada. Nunca se usa pickle: la carpeta
+# de la caché suele estar en un recurso de red compartido y leer un pickle ejecuta código.
+# Solo se comprueba si está instalado: importarlo cuesta más que leer la caché
+CACHE_DISPONIBLE = importlib.util.find_spec('pyarrow') is not None
+
+# Carpeta de la caché, junto al Excel de origen
+CARPETA_CACHE = '.cache_registros'
+
+
+# Hash del contenido del archivo, leído en bloques
+def hash_archivo(ruta_archivo, tam_bloque=1024 * 1024):
+    sha = hashlib.sha256()
+    with open(ruta_archivo, 'rb') as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+# Caché del registro de chats ya normalizado (con MATCH NAME) de un Excel concreto.
+# La entrada depende del contenido del archivo y de la versión del lector, así que
+# cualquier cambio en el origen o en el código de lectura la invalida
+class CacheRegistro:
+    def __init__(self, ruta_archivo, version):
+        self.carpeta = os.path.join(os.path.dirname(os.path.abspath(ruta_archivo)), CARPETA_CACHE)
+        self.prefijo = os.path.basename(ruta_archivo) + '.'
+        self._patron = re.compile(re.escape(self.prefijo) + r'[0-9a-f]{16}\.v\d+\.(parquet|pkl|tmp)')
+        self.base = f"{self.prefijo}{hash_archivo(ruta_archivo)[:16]}.v{version}"
+
+    def _ruta(self, formato):
+        return os.path.join(self.carpeta, f"{self.base}.{formato}")
+
+    def leer(self):
+        ruta = self._ruta('parquet')
+        if not os.path.exists(ruta):
+            return None
+        try:
+            return pd.read_parquet(ruta)
+        except Exception:
+            # Entrada dañada: se vuelve a leer el Excel
+            return None
+
+    def guardar(self, df):
+        temporal = self._ruta('tmp')
+        try:
+            os.makedirs(self.carpeta, exist_ok=True)
+            # Con el índice: es el número de fila de la hoja
+            df.to_parquet(temporal)
+            os.replace(temporal, self._ruta('parquet'))
+        except (OSError, ValueError, TypeError):
+            # Carpeta sin permisos de escritura o columnas con tipos mezclados que parquet no
+            # admite: la caché es opcional y el Excel se vuelve a leer la próxima vez
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return None
+        # Incluye las .pkl que dejaron versiones anteriores, que ya no se leen
+        self._limpiar_anteriores(self._ruta('parquet'))
+        return self._ruta('parquet')
+
+    # Borra las entradas del mismo Excel con otro contenido u otra versión
+    def _limpiar_anteriores(self, vigente):
+        for nombre in os.listdir(self.carpeta):
+            ruta = os.path.join(self.carpeta, nombre)
+            if self._patron.fullmatch(nombre) and ruta != vigente:
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
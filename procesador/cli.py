@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from procesador.busqueda import LIMITE_RESULTADOS, NOMBRE_INDICE_BUSQUEDA, IndiceBusqueda
+from procesador.extraccion import trabajadores_por_defecto
+from procesador.lectura_excel import SUFIJO_MATCH_NAME
+from procesador.medicion import CARPETA_INFORMES, Medicion, perfilar
+from procesador.pipeline import MODOS_EXCEL, parse_date, procesar_lote, resumen_compacto
+from procesador.reporte_excel import AGRUPACIONES, NOMBRE_LIBRO
+from procesador.servicio import (CARPETA_TRABAJOS, MAX_TRABAJOS_PENDIENTES, PUERTO_POR_DEFECTO,
+                                 TRABAJOS_SIMULTANEOS, VARIABLE_TOKEN, ServicioTrabajos, crear_servidor,
+                                 es_local)
+from procesador.vigilancia import INTERVALO_SEGUNDOS, VigilanteBandeja
+
+EXTENSIONES_EXCEL = ('.xlsx', '.xls')
+
+
+def _es_registro_chat(nombre):
+    # Se ignoran los archivos que genera el propio procesador y los temporales de Excel
+    return (
+        nombre.lower().endswith(EXTENSIONES_EXCEL)
+        and not nombre.endswith(SUFIJO_MATCH_NAME)
+        and nombre != NOMBRE_LIBRO
+        and not nombre.startswith('~$')
+    )
+
+
+# Cada subcarpeta con ZIP es una entrega diaria; si su nombre es una fecha, se usa como carpeta de salida
+def buscar_entregas(directorio):
+    entregas = []
+    carpetas = [directorio] + sorted(
+        os.path.join(directorio, nombre) for nombre in os.listdir(directorio)
+        if os.path.isdir(os.path.join(directorio, nombre))
+    )
+    for carpeta in carpetas:
+        nombres = sorted(os.listdir(carpeta))
+        zips = [os.path.join(carpeta, n) for n in nombres if n.lower().endswith('.zip')]
+        if not zips:
+            continue
+        entregas.append({
+            'nombre': os.path.basename(os.path.normpath(carpeta)),
+            'excel': [os.path.join(carpeta, n) for n in nombres if _es_registro_chat(n)],
+            'zip': zips,
+            'fecha': parse_date(os.path.basename(os.path.normpath(carpeta))),
+        })
+    return entregas
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m procesador',
+        description="Procesa registros de chats y ZIP de transcripciones sin interfaz gráfica.",
+    )
+    parser.add_argument('--excel', action='append', default=[],
+                        help="Registro de chats (se puede repetir)")
+    parser.add_argument('--zip', action='append', default=[],
+                        help="ZIP de transcripciones (se puede repetir)")
+    parser.add_argument('--entregas', action='append', default=[], metavar='DIRECTORIO',
+                        help="Directorio de entregas diarias: cada subcarpeta con ZIP es un lote")
+    parser.add_argument('--vigilar', metavar='BANDEJA',
+                        help="Quedarse vigilando esta carpeta y procesar cada ZIP nuevo que llegue")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_SEGUNDOS,
+                        help="Segundos entre revisiones de la bandeja con --vigilar")
+    parser.add_argument('--salida', required=True, help="Carpeta raíz de salida")
+    parser.add_argument('--fecha', help="Fecha de la carpeta de salida (por defecto, la de la entrega o hoy)")
+    parser.add_argument('--solo-coincidencias', action='store_true',
+                        help="Extraer solo los HTML que tienen fila en el registro de chats")
+    parser.add_argument('--excel-salida', choices=MODOS_EXCEL, default='libro',
+                        help="Excel que se genera para las coincidencias (por defecto, un solo libro)")
+    parser.add_argument('--agrupar', choices=sorted(AGRUPACIONES), default='agente',
+                        help="Hojas del libro de coincidencias")
+    parser.add_argument('--sin-hipervinculos', action='store_true',
+                        help="No agregar al libro de coincidencias el enlace a cada HTML")
+    parser.add_argument('--trabajadores', type=int, default=trabajadores_por_defecto(),
+                        help="Trabajadores para extraer los ZIP internos")
+    parser.add_argument('--procesos', action='store_true',
+                        help="Usar procesos en lugar de hilos")
+    parser.add_argument('--procesos-excel', type=int, default=trabajadores_por_defecto(),
+                        help="Procesos para leer a la vez varios registros de chats")
+    parser.add_argument('--sin-reanudar', action='store_true',
+                        help="Ignorar el manifiesto y volver a extraer todo")
+    parser.add_argument('--contenedor', action='store_true',
+                        help="Escribir los HTML dentro de un solo transcripciones.zip por carpeta de fecha")
+    parser.add_argument('--metadatos', action='store_true',
+                        help="Con --contenedor, guardar también la fila del Excel de cada coincidencia")
+    parser.add_argument('--analizar', action='store_true',
+                        help="Extraer métricas de cada transcripción (mensajes, turnos, tiempos) a metricas_<zip>")
+    parser.add_argument('--deduplicar', action='store_true',
+                        help="Guardar cada transcripción una sola vez por contenido y enlazarla desde cada fecha")
+    parser.add_argument('--indexar', action='store_true',
+                        help=f"Agregar cada transcripción al índice de búsqueda <salida>/{NOMBRE_INDICE_BUSQUEDA}")
+    servicio = parser.add_argument_group(
+        "servicio", f"API HTTP local de trabajos; cada trabajo se guarda en <salida>/{CARPETA_TRABAJOS}")
+    servicio.add_argument('--servir', action='store_true',
+                          help="Atender trabajos por HTTP en lugar de procesar ZIP")
+    servicio.add_argument('--host', default='127.0.0.1',
+                          help="Dirección donde escuchar; fuera de 127.0.0.1 se exige el token de la "
+                               f"variable de entorno {VARIABLE_TOKEN} en cada petición")
+    servicio.add_argument('--puerto', type=int, default=PUERTO_POR_DEFECTO, help="Puerto donde escuchar")
+    servicio.add_argument('--trabajos-simultaneos', type=int, default=TRABAJOS_SIMULTANEOS,
+                          help="Trabajos que se procesan a la vez")
+    servicio.add_argument('--max-pendientes', type=int, default=MAX_TRABAJOS_PENDIENTES,
+                          help="Trabajos en cola o en proceso admitidos antes de rechazar nuevos")
+    busqueda = parser.add_argument_group("búsqueda", "Consultar el índice de búsqueda en lugar de procesar ZIP")
+    busqueda.add_argument('--buscar', nargs='?', const='', metavar='FRASE',
+                          help="Buscar transcripciones que contengan la frase (o solo por los filtros, sin frase)")
+    busqueda.add_argument('--match-name', help="Filtrar por MATCH NAME")
+    busqueda.add_argument('--guid', help="Filtrar por SESSION GUID")
+    busqueda.add_argument('--agente', help="Filtrar por AGENT NAME")
+    busqueda.add_argument('--cliente', help="Filtrar por CUSTOMER ID")
+    busqueda.add_argument('--desde', help="Fecha del chat desde (inclusive)")
+    busqueda.add_argument('--hasta', help="Fecha del chat hasta (inclusive)")
+    busqueda.add_argument('--limite', type=int, default=LIMITE_RESULTADOS, help="Máximo de resultados")
+    parser.add_argument('--resumen', help="Archivo JSON del resumen (por defecto, salida estándar)")
+    parser.add_argument('--detalle', action='store_true',
+                        help="Incluir en el resumen los nombres de cada coincidencia y faltante")
+    parser.add_argument('--sin-informe', action='store_true',
+                        help=f"No guardar el informe de tiempos por etapa en <salida>/{CARPETA_INFORMES}")
+    parser.add_argument('--perfil', metavar='ARCHIVO',
+                        help="Perfilar la ejecución con cProfile y guardar las estadísticas en ARCHIVO")
+    return parser
+
+
+def _lotes(args):
+    lotes = []
+    if args.zip:
+        lotes.append({'nombre': 'linea_de_comandos', 'excel': args.excel, 'zip': args.zip, 'fecha': None})
+    for directorio in args.entregas:
+        for entrega in buscar_entregas(directorio):
+            # Sin registro propio, la entrega se cruza con los --excel indicados
+            if not entrega['excel']:
+                entrega['excel'] = args.excel
+            lotes.append(entrega)
+    return lotes
+
+
+# Modo vigilancia: un evento JSON por línea hasta que se interrumpa con Ctrl+C
+def _vigilar(args, opciones):
+    def al_evento(evento):
+        print(json.dumps(evento, ensure_ascii=False, default=str), flush=True)
+
+    try:
+        vigilante = VigilanteBandeja(args.vigilar, args.excel, args.salida, args.fecha,
+                                     intervalo=args.intervalo, al_evento=al_evento, **opciones)
+        vigilante.ejecutar()
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# Modo búsqueda: imprime las transcripciones encontradas en el índice de la carpeta de salida
+def _buscar(args):
+    fechas = {}
+    for nombre in ('desde', 'hasta'):
+        valor = getattr(args, nombre)
+        fechas[nombre] = parse_date(valor) if valor else None
+        if valor and not fechas[nombre]:
+            print(f"Fecha no válida en --{nombre}: {valor}", file=sys.stderr)
+            return 2
+    busqueda = IndiceBusqueda.en_salida(args.salida)
+    if not os.path.exists(busqueda.ruta):
+        print(f"No hay índice de búsqueda en {args.salida}: procesa los ZIP con --indexar", file=sys.stderr)
+        return 2
+    resultados = busqueda.buscar(args.buscar, match_name=args.match_name, guid=args.guid, agente=args.agente,
+                                 cliente=args.cliente, limite=args.limite, **fechas)
+    print(json.dumps(resultados, ensure_ascii=False, indent=2, default=str))
+    return 0
+
+
+# Modo servicio: atiende la API de trabajos hasta que se interrumpa con Ctrl+C. Las opciones de la
+# línea de comandos son las de cada trabajo salvo las que este indique
+def _servir(args, opciones):
+    if not os.path.isdir(args.salida):
+        print("La ruta de salida no es válida", file=sys.stderr)
+        return 2
+    token = os.environ.get(VARIABLE_TOKEN)
+    if not token and not es_local(args.host):
+        print(f"Para escuchar en {args.host} define el token del servicio en {VARIABLE_TOKEN}", file=sys.stderr)
+        return 2
+    servicio = ServicioTrabajos(args.salida, simultaneos=args.trabajos_simultaneos,
+                                max_pendientes=args.max_pendientes, opciones=opciones)
+    servidor = crear_servidor(servicio, args.host, args.puerto, registrar_peticiones=True, token=token)
+    host, puerto = servidor.server_address[:2]
+    print(json.dumps({'tipo': 'servicio', 'url': f"http://{host}:{puerto}/trabajos"}), flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servicio.cerrar()
+    return 0
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.buscar is not None:
+        return _buscar(args)
+    lotes = _lotes(args)
+    if not lotes and not args.vigilar and not args.servir:
+        print("No hay ZIP para procesar: usa --zip, --entregas, --vigilar, --servir o --buscar", file=sys.stderr)
+        return 2
+
+    opciones = {
+        'solo_coincidencias': args.solo_coincidencias,
+        'modo_excel': args.excel_salida,
+        'agrupar_por': args.agrupar,
+        'hipervinculos': not args.sin_hipervinculos,
+        'trabajadores': args.trabajadores,
+        'usar_procesos': args.procesos,
+        'reanudar': not args.sin_reanudar,
+        'deduplicar': args.deduplicar,
+        'indexar': args.indexar,
+        'contenedor': args.contenedor,
+        'metadatos': args.metadatos,
+        'analizar': args.analizar,
+        'procesos_excel': args.procesos_excel,
+    }
+    if args.vigilar:
+        return _vigilar(args, opciones)
+    if args.servir:
+        return _servir(args, opciones)
+    inicio = time.perf_counter()
+    medicion = Medicion()
+    indices_cargados = {}
+    resultados = []
+    with perfilar(args.perfil):
+        for lote in lotes:
+            resultado = {'lote': lote['nombre'], 'excel': lote['excel'], 'zip': lote['zip']}
+            try:
+                procesado = procesar_lote(lote['excel'], lote['zip'], args.salida, args.fecha or lote['fecha'],
+                                          indices_cargados=indices_cargados, medicion=medicion, **opciones)
+                if not args.detalle:
+                    procesado['zips'] = [resumen_compacto(r) for r in procesado['zips']]
+                resultado.update(procesado)
+            except Exception as e:
+                resultado['error'] = str(e)
+            resultados.append(resultado)
+
+    resumen = {
+        'lotes': resultados,
+        'errores': sum(1 for r in resultados if 'error' in r),
+        'segundos': round(time.perf_counter() - inicio, 3),
+    }
+    if not args.sin_informe and os.path.isdir(args.salida):
+        resumen['informe'] = medicion.guardar_informe(
+            args.salida, opciones=opciones, lotes=[r['lote'] for r in resultados], errores=resumen['errores'])
+    texto = json.dumps(resumen, ensure_ascii=False, indent=2, default=str)
+    if args.resumen:
+        with open(args.resumen, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+    return 1 if resumen['errores'] else 0
@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import threading
+import warnings
+import zipfile
+
+# Contenedor de transcripciones dentro de cada carpeta de fecha
+NOMBRE_CONTENEDOR = 'transcripciones.zip'
+
+# Carpeta, dentro del contenedor, con los datos de la fila del Excel de cada coincidencia
+CARPETA_METADATOS = 'metadatos'
+
+
+# Un solo ZIP por carpeta de fecha con todos los HTML renombrados, en lugar de miles de archivos
+# sueltos: en un recurso de red el costo por archivo es la mayor parte del tiempo, y copiar o
+# respaldar la carpeta se reduce a copiar un archivo. Cada HTML se escribe en secuencia, directo
+# desde el ZIP interno al contenedor y sin temporales; el directorio central del ZIP permite leer
+# después una transcripción suelta sin recorrer el resto.
+# Las ejecuciones siguientes del mismo día agregan al contenedor existente. Un miembro que vuelve
+# a escribirse con otro contenido se agrega de nuevo (zipfile lee siempre el último con ese
+# nombre) y al cerrar el contenedor se reescribe sin las versiones anteriores
+class ContenedorZip:
+    def __init__(self, output_folder, comprimir=True):
+        self.ruta = os.path.join(output_folder, NOMBRE_CONTENEDOR)
+        self._compresion = zipfile.ZIP_DEFLATED if comprimir else zipfile.ZIP_STORED
+        if os.path.exists(self.ruta) and not zipfile.is_zipfile(self.ruta):
+            # Contenedor sin directorio central: el proceso anterior terminó sin cerrarlo.
+            # Se aparta (en modo 'a' zipfile escribiría un ZIP nuevo a continuación de los
+            # datos dañados) y se empieza uno nuevo; el manifiesto vuelve a extraer lo que falte
+            os.replace(self.ruta, self.ruta + '.incompleto')
+        self._zip = zipfile.ZipFile(self.ruta, 'a', compression=self._compresion)
+        nombres = self._zip.namelist()
+        self._nombres = set(nombres)
+        # Hay que compactar al cerrar si quedaron versiones reemplazadas (también las de una
+        # ejecución anterior que terminó antes de compactar)
+        self._reemplazados = len(nombres) != len(self._nombres)
+        # zipfile no admite escribir dos miembros a la vez
+        self._lock = threading.Lock()
+
+    def contiene(self, nombre):
+        return nombre in self._nombres
+
+    # Copia el contenido de origen al miembro nombre en bloques y devuelve los bytes escritos.
+    # crc y tamano son los del HTML de origen: si el contenedor ya tiene ese mismo contenido no se
+    # vuelve a escribir, aunque el origen se lee igual para que el análisis que lo envuelve se complete
+    def escribir(self, origen, nombre, tam_bloque, crc=None, tamano=None):
+        with self._lock:
+            if not self._igual(nombre, crc, tamano):
+                with self._abrir_escritura(nombre) as destino:
+                    shutil.copyfileobj(origen, destino, tam_bloque)
+                return self._zip.getinfo(nombre).file_size
+        while origen.read(tam_bloque):
+            pass
+        return 0
+
+    # Contenido de un miembro ya escrito; espera a que termine la escritura en curso
+    def leer(self, nombre):
+        with self._lock:
+            return self._zip.read(nombre)
+
+    # Guarda la fila del Excel de una coincidencia como metadatos/<MATCH NAME>.json; si ya estaba
+    # con otros datos se reemplaza
+    def escribir_metadatos(self, match_name, fila):
+        nombre = f"{CARPETA_METADATOS}/{os.path.splitext(match_name)[0]}.json"
+        datos = json.dumps(fila, ensure_ascii=False, default=str).encode('utf-8')
+        with self._lock:
+            if not self._igual(nombre, zipfile.crc32(datos), len(datos)):
+                with self._abrir_escritura(nombre) as destino:
+                    destino.write(datos)
+
+    # True si el miembro nombre ya está con ese CRC y tamaño. Se llama con el lock tomado
+    def _igual(self, nombre, crc, tamano):
+        if nombre not in self._nombres:
+            return False
+        info = self._zip.getinfo(nombre)
+        return crc is not None and info.CRC == crc and info.file_size == tamano
+
+    # Abre nombre para escribir; si ya existe, la versión nueva oculta a la anterior hasta compactar.
+    # Se llama con el lock tomado
+    def _abrir_escritura(self, nombre):
+        if nombre in self._nombres:
+            self._reemplazados = True
+            with warnings.catch_warnings():
+                # "Duplicate name": la versión anterior se descarta al compactar
+                warnings.simplefilter('ignore', UserWarning)
+                destino = self._zip.open(nombre, 'w', force_zip64=True)
+        else:
+            destino = self._zip.open(nombre, 'w', force_zip64=True)
+        self._nombres.add(nombre)
+        return destino
+
+    # Reescribe el contenedor con solo la última versión de cada miembro, a un temporal que
+    # después reemplaza al original
+    def _compactar(self):
+        parcial = self.ruta + '.compactando'
+        with zipfile.ZipFile(self.ruta, 'r') as anterior, \
+                zipfile.ZipFile(parcial, 'w', compression=self._compresion) as nuevo:
+            for info in anterior.infolist():
+                if anterior.getinfo(info.filename) is not info:
+                    continue
+                copia = zipfile.ZipInfo(info.filename, info.date_time)
+                copia.compress_type = info.compress_type
+                with anterior.open(info) as origen, nuevo.open(copia, 'w', force_zip64=True) as destino:
+                    shutil.copyfileobj(origen, destino, 1024 * 1024)
+        os.replace(parcial, self.ruta)
+
+    def cerrar(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+            if self._reemplazados:
+                self._compactar()
+                self._reemplazados = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# Lee una transcripción de un contenedor sin extraer las demás
+def leer_transcripcion(ruta_contenedor, match_name):
+    with zipfile.ZipFile(ruta_contenedor, 'r') as contenedor:
+        return contenedor.read(match_name)
+
+
+# Nombres de las transcripciones guardadas en un contenedor
+def listar_transcripciones(ruta_contenedor):
+    with zipfile.ZipFile(ruta_contenedor, 'r') as contenedor:
+        # Una versión reemplazada que todavía no se compactó aparece dos veces; se lista una
+        nombres = dict.fromkeys(contenedor.namelist())
+    return [nombre for nombre in nombres if not nombre.startswith(CARPETA_METADATOS + '/')]
@@ -0,0 +1,379 @@
+import atexit
+import io
+import os
+import queue
+import shutil
+import struct
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from procesador.analisis_html import AnalizadorTranscripcion, LectorAnalizado
+
+# Tamaño de los bloques usados para copiar los HTML sin cargarlos completos en memoria
+TAM_BLOQUE = 1024 * 1024
+
+# Los ZIP internos comprimidos se descomprimen a un archivo temporal en bloques;
+# hasta este tamaño se mantienen en memoria
+LIMITE_MEMORIA_ZIP_INTERNO = 8 * 1024 * 1024
+
+
+# Vista de solo lectura sobre un rango de bytes de otro archivo.
+# Permite abrir un ZIP interno almacenado (sin compresión) directamente desde el ZIP principal
+class _VentanaArchivo(io.RawIOBase):
+    def __init__(self, archivo, inicio, tamano):
+        self._archivo = archivo
+        self._inicio = inicio
+        self._tamano = tamano
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._tamano + offset
+        else:
+            raise ValueError(f"whence no válido: {whence}")
+        if pos < 0:
+            raise ValueError("Posición negativa")
+        self._pos = pos
+        return self._pos
+
+    def readinto(self, buffer):
+        restante = self._tamano - self._pos
+        if restante <= 0:
+            return 0
+        n = min(len(buffer), restante)
+        self._archivo.seek(self._inicio + self._pos)
+        leidos = self._archivo.readinto(memoryview(buffer)[:n])
+        self._pos += leidos
+        return leidos
+
+
+# Calcula la posición de los datos de un miembro a partir de su cabecera local
+def _inicio_datos(fuente, info):
+    fuente.seek(info.header_offset)
+    cabecera = fuente.read(zipfile.sizeFileHeader)
+    if len(cabecera) != zipfile.sizeFileHeader:
+        raise zipfile.BadZipFile(f"Cabecera incompleta para {info.filename}")
+    campos = struct.unpack(zipfile.structFileHeader, cabecera)
+    if campos[0] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Cabecera inválida para {info.filename}")
+    largo_nombre, largo_extra = campos[10], campos[11]
+    return info.header_offset + zipfile.sizeFileHeader + largo_nombre + largo_extra
+
+
+# Abre un ZIP interno sin extraer el ZIP principal a disco
+@contextmanager
+def _abrir_zip_interno(main_zip, fuente, info):
+    if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+        # Sin compresión: se lee directamente del archivo principal
+        ventana = _VentanaArchivo(fuente, _inicio_datos(fuente, info), info.compress_size)
+        with zipfile.ZipFile(ventana, 'r') as inner_zip:
+            yield inner_zip
+        return
+
+    # Comprimido: se descomprime en bloques a un temporal acotado al tamaño de este miembro
+    with tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_ZIP_INTERNO) as temporal:
+        with main_zip.open(info) as origen:
+            shutil.copyfileobj(origen, temporal, TAM_BLOQUE)
+        temporal.seek(0)
+        with zipfile.ZipFile(temporal, 'r') as inner_zip:
+            yield inner_zip
+
+
+# Nombre con el que se guarda el HTML de un ZIP interno
+def nombre_html(nombre_zip_interno):
+    return f"{os.path.splitext(os.path.basename(nombre_zip_interno))[0]}.html"
+
+
+# Miembros del ZIP principal que son ZIP internos, según su directorio central
+def _infos_zips_internos(main_zip):
+    return [
+        info for info in main_zip.infolist()
+        if not info.is_dir() and info.filename.endswith('.zip')
+    ]
+
+
+# Copia el HTML de origen al destino en bloques de tamaño fijo y devuelve los bytes escritos
+def _copiar_a_archivo(origen, destino, tam_bloque):
+    with open(destino, 'wb') as f_out:
+        shutil.copyfileobj(origen, f_out, tam_bloque)
+        return f_out.tell()
+
+
+# Copia los HTML de un ZIP interno ya abierto y devuelve lo escrito por cada miembro.
+# Con un almacén por contenido, cada HTML se guarda una sola vez y la carpeta de salida lo enlaza;
+# con un contenedor (ContenedorZip), los HTML van dentro de él en lugar de a archivos sueltos.
+# Con analizar, cada HTML se analiza mientras se copia y sus métricas quedan en el miembro;
+# con extraer_texto, el texto visible queda en miembro['texto'] (no se guarda en el manifiesto)
+def _copiar_htmls_zip_interno(inner_zip, file_name, output_folder, tam_bloque, almacen=None, contenedor=None,
+                              analizar=False, extraer_texto=False):
+    html_files = [f for f in inner_zip.namelist() if f.endswith('.html')]
+    miembros = []
+
+    for html_file_name in html_files:
+        # Renombrar el archivo HTML usando el nombre del archivo ZIP interno
+        new_html_name = nombre_html(file_name)
+        html_output_path = os.path.join(output_folder, new_html_name)
+        info = inner_zip.getinfo(html_file_name)
+        miembro = {
+            'html': new_html_name,
+            'miembro': html_file_name,
+            'crc': info.CRC,
+            'tamano': info.file_size,
+        }
+        analizador = AnalizadorTranscripcion(guardar_texto=extraer_texto) if analizar or extraer_texto else None
+        with inner_zip.open(html_file_name) as html_file:
+            origen = LectorAnalizado(html_file, analizador) if analizador is not None else html_file
+            if contenedor is not None:
+                contenedor.escribir(origen, new_html_name, tam_bloque, info.CRC, info.file_size)
+            elif almacen is not None:
+                miembro['sha256'], miembro['duplicado'] = almacen.guardar(origen, html_output_path, tam_bloque)
+            else:
+                _copiar_a_archivo(origen, html_output_path, tam_bloque)
+        if analizar:
+            miembro['metricas'] = analizador.metricas()
+        if extraer_texto:
+            miembro['texto'] = analizador.texto()
+        miembros.append(miembro)
+    return miembros
+
+
+class ProcesoCancelado(Exception):
+    pass
+
+
+# Avance de una extracción. al_avanzar(procesados, total, bytes_escritos, nombres) se llama
+# por cada ZIP interno terminado o descartado y al_miembro(miembro) por cada HTML, incluidos
+# los que el manifiesto da por extraídos; si el evento cancelar se activa, la extracción
+# se detiene antes del siguiente ZIP interno
+class _Avance:
+    def __init__(self, total, al_avanzar=None, cancelar=None, al_miembro=None):
+        self.total = total
+        self.procesados = 0
+        self.bytes_escritos = 0
+        self._al_avanzar = al_avanzar
+        self._cancelar = cancelar
+        self._al_miembro = al_miembro
+
+    def verificar(self):
+        if self._cancelar is not None and self._cancelar.is_set():
+            raise ProcesoCancelado("Proceso cancelado")
+
+    def paso(self, miembros=(), nuevos=False):
+        self.procesados += 1
+        if nuevos:
+            # Los HTML que el almacén ya tenía no se escriben de nuevo
+            self.bytes_escritos += sum(miembro['tamano'] for miembro in miembros if not miembro.get('duplicado'))
+        if self._al_miembro is not None:
+            for miembro in miembros:
+                self._al_miembro(miembro)
+        if self._al_avanzar is not None:
+            self._al_avanzar(self.procesados, self.total, self.bytes_escritos,
+                             [miembro['html'] for miembro in miembros])
+
+
+# Extrae los HTML de cada ZIP interno renombrándolos con el nombre del ZIP que los contiene.
+# Devuelve el nuevo nombre de cada HTML a medida que se escribe. Con más de un trabajador
+# los ZIP internos se reparten en un pool, pero el orden de los resultados es el mismo.
+# Con un manifiesto, los ZIP internos ya extraídos en una ejecución anterior se saltan,
+# con un almacén (AlmacenContenido) los HTML repetidos entre entregas no se vuelven a escribir
+# y con un contenedor (ContenedorZip) se escriben dentro de un solo ZIP por carpeta.
+# Con analizar (y con extraer_texto), cada trabajador analiza los HTML mientras los copia
+# (ver analisis_html)
+def extraer_htmls(ruta_zip, output_folder, tam_bloque=TAM_BLOQUE, filtro=None,
+                  trabajadores=1, usar_procesos=False, manifiesto=None,
+                  al_avanzar=None, cancelar=None, almacen=None, contenedor=None,
+                  analizar=False, extraer_texto=False, al_miembro=None):
+    if contenedor is not None and usar_procesos:
+        raise ValueError("El contenedor de salida solo admite trabajadores en hilos, no en procesos")
+    if trabajadores > 1:
+        yield from _extraer_htmls_paralelo(
+            ruta_zip, output_folder, tam_bloque, filtro, trabajadores, usar_procesos, manifiesto,
+            al_avanzar=al_avanzar, cancelar=cancelar, almacen=almacen, contenedor=contenedor,
+            analizar=analizar, extraer_texto=extraer_texto, al_miembro=al_miembro,
+        )
+        return
+
+    with zipfile.ZipFile(ruta_zip, 'r') as main_zip, open(ruta_zip, 'rb') as fuente:
+        infos = _infos_zips_internos(main_zip)
+        avance = _Avance(len(infos), al_avanzar, cancelar, al_miembro)
+        for info in infos:
+            avance.verificar()
+            if filtro is not None and not filtro(nombre_html(info.filename)):
+                avance.paso()
+                continue
+
+            miembros = manifiesto.miembros_procesados(info) if manifiesto is not None else None
+            nuevos = miembros is None
+            if nuevos:
+                file_name = os.path.basename(info.filename)
+                with _abrir_zip_interno(main_zip, fuente, info) as inner_zip:
+                    miembros = _copiar_htmls_zip_interno(inner_zip, file_name, output_folder, tam_bloque,
+                                                         almacen, contenedor, analizar, extraer_texto)
+                if manifiesto is not None:
+                    manifiesto.registrar(info, miembros)
+
+            avance.paso(miembros, nuevos)
+            for miembro in miembros:
+                yield miembro['html']
+
+
+# Número de trabajadores por defecto para la extracción en paralelo
+def trabajadores_por_defecto():
+    return os.cpu_count() or 1
+
+
+# Lectores del ZIP principal (ZipFile + archivo crudo) que se prestan a un trabajador a la vez
+class _LectoresZip:
+    def __init__(self, ruta_zip, cantidad):
+        self._libres = queue.Queue()
+        self._todos = []
+        for _ in range(cantidad):
+            lector = (zipfile.ZipFile(ruta_zip, 'r'), open(ruta_zip, 'rb'))
+            self._todos.append(lector)
+            self._libres.put(lector)
+
+    @contextmanager
+    def prestar(self):
+        lector = self._libres.get()
+        try:
+            yield lector
+        finally:
+            self._libres.put(lector)
+
+    def cerrar(self):
+        for main_zip, fuente in self._todos:
+            main_zip.close()
+            fuente.close()
+
+
+# Lector propio de cada proceso del pool, abierto por _iniciar_proceso
+_lectores_proceso = None
+
+
+def _iniciar_proceso(ruta_zip):
+    global _lectores_proceso
+    _lectores_proceso = _LectoresZip(ruta_zip, 1)
+    atexit.register(_lectores_proceso.cerrar)
+
+
+# Tarea del pool: un ZIP interno por tarea
+def _tarea_zip_interno(lectores, info, output_folder, tam_bloque, almacen=None, contenedor=None, analizar=False,
+                       extraer_texto=False):
+    lectores = lectores or _lectores_proceso
+    with lectores.prestar() as (main_zip, fuente):
+        with _abrir_zip_interno(main_zip, fuente, info) as inner_zip:
+            file_name = os.path.basename(info.filename)
+            return _copiar_htmls_zip_interno(inner_zip, file_name, output_folder, tam_bloque,
+                                             almacen, contenedor, analizar, extraer_texto)
+
+
+# Reparte los ZIP internos en un pool de hilos o procesos. Como mucho hay
+# max_pendientes tareas en vuelo y los resultados se devuelven en el orden del ZIP principal.
+# Los procesos solo deben usarse desde scripts sin interfaz (en Windows el proceso hijo
+# vuelve a importar el módulo principal)
+def _extraer_htmls_paralelo(ruta_zip, output_folder, tam_bloque, filtro, trabajadores,
+                            usar_procesos, manifiesto=None, max_pendientes=None,
+                            al_avanzar=None, cancelar=None, almacen=None, contenedor=None,
+                            analizar=False, extraer_texto=False, al_miembro=None):
+    max_pendientes = max_pendientes or trabajadores * 2
+
+    with zipfile.ZipFile(ruta_zip, 'r') as main_zip:
+        infos = _infos_zips_internos(main_zip)
+    avance = _Avance(len(infos), al_avanzar, cancelar, al_miembro)
+
+    if usar_procesos:
+        lectores = None
+        pool = ProcessPoolExecutor(trabajadores, initializer=_iniciar_proceso, initargs=(ruta_zip,))
+    else:
+        lectores = _LectoresZip(ruta_zip, trabajadores)
+        pool = ThreadPoolExecutor(trabajadores)
+
+    pendientes = deque()
+    # Último futuro por nombre de salida: dos ZIP internos con el mismo nombre se escriben
+    # en orden para que el archivo final sea el mismo que en el modo secuencial
+    en_vuelo = {}
+    try:
+        for info in infos:
+            avance.verificar()
+            new_html_name = nombre_html(info.filename)
+            if filtro is not None and not filtro(new_html_name):
+                avance.paso()
+                continue
+
+            miembros = manifiesto.miembros_procesados(info) if manifiesto is not None else None
+            if miembros is not None:
+                # Ya extraído: se mantiene su lugar en el orden de los resultados
+                futuro = Future()
+                futuro.set_result(miembros)
+                pendientes.append((new_html_name, info, futuro, False))
+                continue
+
+            anterior = en_vuelo.get(new_html_name)
+            if anterior is not None:
+                anterior.result()
+
+            futuro = pool.submit(_tarea_zip_interno, lectores, info, output_folder, tam_bloque,
+                                 almacen, contenedor, analizar, extraer_texto)
+            en_vuelo[new_html_name] = futuro
+            pendientes.append((new_html_name, info, futuro, True))
+
+            while len(pendientes) >= max_pendientes:
+                yield from _resultado_tarea(pendientes, en_vuelo, manifiesto, avance)
+
+        while pendientes:
+            avance.verificar()
+            yield from _resultado_tarea(pendientes, en_vuelo, manifiesto, avance)
+    finally:
+        for _, _, futuro, _ in pendientes:
+            futuro.cancel()
+        pool.shutdown(wait=True)
+        if lectores is not None:
+            lectores.cerrar()
+
+
+def _resultado_tarea(pendientes, en_vuelo, manifiesto, avance):
+    new_html_name, info, futuro, nuevo = pendientes.popleft()
+    miembros = futuro.result()
+    if en_vuelo.get(new_html_name) is futuro:
+        del en_vuelo[new_html_name]
+    if nuevo and manifiesto is not None:
+        manifiesto.registrar(info, miembros)
+    avance.paso(miembros, nuevo)
+    return [miembro['html'] for miembro in miembros]
+
+
+# Modo "primero coincidencias": cruza los nombres del directorio central con el índice
+# de MATCH NAME y solo descomprime los ZIP internos que tienen fila en el Excel
+def extraer_coincidencias(ruta_zip, output_folder, indice, tam_bloque=TAM_BLOQUE, **opciones):
+    reporte = {'coincidencias': [], 'sin_excel': [], 'sin_zip': []}
+
+    def filtro(new_html_name):
+        if new_html_name in indice:
+            return True
+        reporte['sin_excel'].append(new_html_name)
+        return False
+
+    encontrados = set()
+    for new_html_name in extraer_htmls(ruta_zip, output_folder, tam_bloque, filtro, **opciones):
+        if new_html_name not in encontrados:
+            encontrados.add(new_html_name)
+            reporte['coincidencias'].append(new_html_name)
+
+    reporte['sin_zip'] = indice.sin_transcripcion(encontrados)
+    return reporte
@@ -0,0 +1,61 @@
+# Columnas de la fila del Excel que se conservan para cada MATCH NAME
+COLUMNAS_FILA = ['AGENT NAME', 'CUSTOMER ID', 'ACCOUNT NAME']
+
+# Clave de la fila con el archivo del que salió, cuando el índice reúne varios registros
+COLUMNA_ORIGEN = 'ARCHIVO ORIGEN'
+
+
+# Índice MATCH NAME -> fila del Excel para buscar cada HTML en tiempo constante
+class IndiceMatch:
+    def __init__(self):
+        self.filas = {}
+        # MATCH NAME repetidos -> número de filas adicionales que se descartaron
+        self.duplicados = {}
+
+    def agregar(self, match_name, fila):
+        if match_name in self.filas:
+            # Se conserva la primera fila, igual que df[...].iloc[0]
+            self.duplicados[match_name] = self.duplicados.get(match_name, 0) + 1
+            return False
+        self.filas[match_name] = fila
+        return True
+
+    def __contains__(self, match_name):
+        return match_name in self.filas
+
+    def __getitem__(self, match_name):
+        return self.filas[match_name]
+
+    def __iter__(self):
+        return iter(self.filas)
+
+    def __len__(self):
+        return len(self.filas)
+
+    def get(self, match_name, default=None):
+        return self.filas.get(match_name, default)
+
+    # Filas del Excel cuyo HTML no apareció entre los nombres encontrados
+    def sin_transcripcion(self, encontrados):
+        return [match_name for match_name in self.filas if match_name not in encontrados]
+
+
+# Construye el índice en una sola pasada sobre el DataFrame ya procesado.
+# Si se pasa un índice existente, las filas se añaden a él (ante un MATCH NAME repetido
+# gana la fila que llegó primero); con origen, cada fila guarda el nombre del archivo
+def construir_indice(df, columnas=COLUMNAS_FILA, indice=None, origen=None):
+    if indice is None:
+        indice = IndiceMatch()
+    presentes = [col for col in columnas if col in df.columns]
+    valores = [df[col].tolist() for col in presentes]
+    for i, match_name in enumerate(df['MATCH NAME'].tolist()):
+        if not isinstance(match_name, str):
+            # Filas sin DATE, TIME o SESSION GUID no generan una clave válida
+            continue
+        fila = {col: None for col in columnas}
+        for col, columna in zip(presentes, valores):
+            fila[col] = columna[i]
+        if origen is not None:
+            fila[COLUMNA_ORIGEN] = origen
+        indice.agregar(match_name, fila)
+    return indice
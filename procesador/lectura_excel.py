@@ -0,0 +1,182 @@
+import os
+import re
+import zipfile
+
+from procesador.indice import COLUMNAS_FILA
+
+# pandas, openpyxl y los módulos que dependen de ellos se importan dentro de cada función,
+# para que abrir la interfaz o extraer un ZIP sin Excel no pague su carga
+
+# Versión del lector y del cálculo de MATCH NAME; cambiarla invalida la caché de registros
+VERSION_LECTOR = 4
+
+# Columnas sin las que no se puede construir el MATCH NAME
+COLUMNAS_NECESARIAS = ['DATE', 'TIME', 'SESSION GUID']
+
+# Únicas columnas que se leen del registro de chats
+COLUMNAS_LEIDAS = COLUMNAS_NECESARIAS + COLUMNAS_FILA
+
+# Nombre del índice del registro leído: el número de cada fila en la hoja (el encabezado es la
+# fila 1), que se conserva aunque se salteen filas en blanco
+INDICE_FILA = 'FILA EXCEL'
+
+# Sufijo del archivo con la columna MATCH NAME que se escribe junto al original
+SUFIJO_MATCH_NAME = ' - MATCH NAME.xlsx'
+
+# Identificador que se guarda en las propiedades del archivo con MATCH NAME: un archivo escrito
+# por otra versión del lector tiene claves calculadas de otra forma y se vuelve a escribir
+IDENTIFICADOR_MATCH_NAME = f"MATCH NAME v{VERSION_LECTOR}"
+
+
+# ruta es el registro al que le faltan las columnas, para saber cuál es cuando se leen varios
+class ColumnasFaltantes(ValueError):
+    def __init__(self, faltantes, ruta=None):
+        self.faltantes = faltantes
+        self.ruta = ruta
+        mensaje = f"El archivo no contiene las columnas necesarias: {', '.join(faltantes)}"
+        if ruta is not None:
+            mensaje = f"{os.path.basename(ruta)}: {mensaje}"
+        super().__init__(mensaje)
+
+    # Al volver de un proceso del pool se reconstruye con sus argumentos y no con el mensaje
+    def __reduce__(self):
+        return type(self), (self.faltantes, self.ruta)
+
+
+# Registro de chats con MATCH NAME, desde la caché si el Excel no cambió (sin pyarrow no hay caché)
+def cargar_registro_chat(ruta_archivo, usar_cache=True):
+    from procesador.cache_registros import CACHE_DISPONIBLE, CacheRegistro
+
+    cache = CacheRegistro(ruta_archivo, VERSION_LECTOR) if usar_cache and CACHE_DISPONIBLE else None
+    if cache is not None:
+        df = cache.leer()
+        if df is not None:
+            return df
+
+    df = leer_registro_chat(ruta_archivo)
+    df['MATCH NAME'] = construir_match_name(df)
+    if cache is not None:
+        cache.guardar(df)
+    return df
+
+
+# Lee el registro de chats en una sola pasada y solo con las columnas necesarias. Las filas en
+# blanco se descartan; el índice es el número de fila de la hoja (INDICE_FILA)
+def leer_registro_chat(ruta_archivo):
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    if os.path.splitext(ruta_archivo)[1].lower() == '.xls':
+        # openpyxl no lee .xls; pandas los lee en una sola pasada filtrando columnas
+        df = pd.read_excel(ruta_archivo, usecols=lambda col: col in COLUMNAS_LEIDAS)
+        _validar_columnas(df.columns, ruta_archivo)
+        for col in COLUMNAS_LEIDAS:
+            if col not in df.columns:
+                df[col] = None
+        df.index = pd.RangeIndex(2, len(df) + 2, name=INDICE_FILA)
+        return df[COLUMNAS_LEIDAS].dropna(how='all')
+
+    book = load_workbook(ruta_archivo, read_only=True, data_only=True)
+    try:
+        # Igual que pd.read_excel: primera hoja y primera fila como encabezado
+        sheet = book.worksheets[0]
+        sheet.reset_dimensions()
+        filas = sheet.iter_rows(values_only=True)
+        encabezado = next(filas, ())
+
+        posiciones = {}
+        for i, nombre in enumerate(encabezado):
+            if nombre in COLUMNAS_LEIDAS and nombre not in posiciones:
+                posiciones[nombre] = i
+        _validar_columnas(posiciones, ruta_archivo)
+
+        columnas = {col: [] for col in COLUMNAS_LEIDAS}
+        numeros = []
+        seleccion = [(col, posiciones.get(col)) for col in COLUMNAS_LEIDAS]
+        for numero, fila in enumerate(filas, start=2):
+            valores = [fila[i] if i is not None and i < len(fila) else None for _, i in seleccion]
+            if all(valor is None for valor in valores):
+                continue
+            numeros.append(numero)
+            for (col, _), valor in zip(seleccion, valores):
+                columnas[col].append(valor)
+    finally:
+        book.close()
+
+    return pd.DataFrame(columnas, columns=COLUMNAS_LEIDAS, index=pd.Index(numeros, dtype='int64', name=INDICE_FILA))
+
+
+def _validar_columnas(columnas, ruta_archivo):
+    faltantes = [col for col in COLUMNAS_NECESARIAS if col not in columnas]
+    if faltantes:
+        raise ColumnasFaltantes(faltantes, ruta_archivo)
+
+
+# Construye la columna MATCH NAME con el nombre del HTML de cada sesión
+def construir_match_name(df):
+    from procesador.normalizacion import construir_claves
+
+    return construir_claves(df)
+
+
+# Mensaje de resultado de la lectura, con las filas cuya fecha u hora no se pudo interpretar
+def mensaje_registro(df, ruta_salida):
+    from procesador.normalizacion import filas_sin_clave
+
+    if ruta_salida is None:
+        mensaje = ("Archivo procesado exitosamente, pero no se pudo guardar la columna 'MATCH NAME' "
+                   "junto al Excel (¿carpeta de solo lectura o archivo abierto?); se usa igual.")
+    else:
+        mensaje = f"Archivo procesado exitosamente y columna 'MATCH NAME' guardada en {os.path.basename(ruta_salida)}."
+    filas = filas_sin_clave(df)
+    if filas:
+        ejemplo = ', '.join(str(fila) for fila in filas[:10])
+        if len(filas) > 10:
+            ejemplo += ', ...'
+        mensaje += f"\n{len(filas)} filas sin MATCH NAME por DATE, TIME o SESSION GUID no válidos (filas {ejemplo})."
+    return mensaje
+
+
+# Archivo donde se guarda la columna MATCH NAME sin modificar el Excel original
+def ruta_match_name(ruta_archivo):
+    return os.path.splitext(ruta_archivo)[0] + SUFIJO_MATCH_NAME
+
+
+# Escribe el archivo con MATCH NAME salvo que ya exista, sea posterior al Excel original y lo
+# haya escrito esta versión del lector. Si no se puede escribir (carpeta de solo lectura, archivo
+# abierto en Excel) devuelve None: el archivo es una ayuda y el índice en memoria no lo necesita
+def guardar_match_names(df, ruta_archivo):
+    ruta_salida = ruta_match_name(ruta_archivo)
+    if (os.path.exists(ruta_salida) and os.path.getmtime(ruta_salida) >= os.path.getmtime(ruta_archivo)
+            and _version_match_names(ruta_salida) == IDENTIFICADOR_MATCH_NAME):
+        return ruta_salida
+    try:
+        return escribir_match_names(df, ruta_salida)
+    except OSError:
+        return None
+
+
+# Identificador guardado en un archivo con MATCH NAME, o None si no tiene (versiones anteriores)
+def _version_match_names(ruta_salida):
+    try:
+        with zipfile.ZipFile(ruta_salida) as libro:
+            propiedades = libro.read('docProps/core.xml').decode('utf-8')
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+    identificador = re.search(r'<dc:identifier>(.*?)</dc:identifier>', propiedades)
+    return identificador.group(1) if identificador else None
+
+
+# Escribe las columnas leídas más MATCH NAME en un libro aparte, fila a fila
+def escribir_match_names(df, ruta_salida):
+    import pandas as pd
+    from openpyxl import Workbook
+
+    book = Workbook(write_only=True)
+    book.properties.identifier = IDENTIFICADOR_MATCH_NAME
+    sheet = book.create_sheet("MATCH NAME")
+    sheet.append(list(df.columns))
+    for fila in df.itertuples(index=False, name=None):
+        sheet.append([None if pd.isna(valor) else valor for valor in fila])
+    book.save(ruta_salida)
+    return ruta_salida
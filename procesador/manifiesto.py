@@ -0,0 +1,87 @@
+import json
+import os
+
+# Archivo del manifiesto dentro de la carpeta de salida (una línea JSON por ZIP interno)
+NOMBRE_MANIFIESTO = '.manifiesto_extraccion.jsonl'
+
+# Datos de cada miembro que solo sirven durante la ejecución y no se guardan
+CAMPOS_TRANSITORIOS = ('texto',)
+
+
+# Registro de los ZIP internos ya extraídos en una carpeta de salida, para poder
+# retomar una ejecución interrumpida sin volver a escribir lo que ya está hecho.
+# Cada ZIP interno se identifica por nombre, CRC32 y tamaño según el directorio del ZIP principal.
+# existe(nombre_html) dice si un HTML sigue en la salida; por defecto se busca en la carpeta
+class ManifiestoExtraccion:
+    def __init__(self, output_folder, existe=None):
+        self.output_folder = output_folder
+        self.existe = existe or (lambda nombre: os.path.exists(os.path.join(output_folder, nombre)))
+        self.ruta = os.path.join(output_folder, NOMBRE_MANIFIESTO)
+        self.entradas = {}
+        self._archivo = None
+        self._cargar()
+
+    @staticmethod
+    def clave(info):
+        return f"{info.filename}|{info.CRC:08x}|{info.file_size}"
+
+    def _cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    # Última línea incompleta de una ejecución interrumpida
+                    continue
+                self.entradas[entrada['clave']] = entrada['miembros']
+
+    # Miembros ya extraídos de este ZIP interno, o None si hay que procesarlo
+    def miembros_procesados(self, info):
+        miembros = self.entradas.get(self.clave(info))
+        if miembros is None:
+            return None
+        for miembro in miembros:
+            if not self.existe(miembro['html']):
+                return None
+        return miembros
+
+    # Se llama cuando todos los HTML del ZIP interno ya están escritos
+    def registrar(self, info, miembros):
+        if self._archivo is None:
+            self._abrir()
+        clave = self.clave(info)
+        miembros = [{campo: valor for campo, valor in miembro.items() if campo not in CAMPOS_TRANSITORIOS}
+                    for miembro in miembros]
+        entrada = {
+            'clave': clave,
+            'zip_interno': info.filename,
+            'crc': info.CRC,
+            'tamano': info.file_size,
+            'miembros': miembros,
+        }
+        self._archivo.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+        self._archivo.flush()
+        self.entradas[clave] = miembros
+
+    def _abrir(self):
+        termina_en_linea = True
+        if os.path.exists(self.ruta) and os.path.getsize(self.ruta) > 0:
+            with open(self.ruta, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                termina_en_linea = f.read(1) == b'\n'
+        self._archivo = open(self.ruta, 'a', encoding='utf-8')
+        if not termina_en_linea:
+            self._archivo.write('\n')
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -0,0 +1,117 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Carpeta, dentro de la raíz de salida, donde se guarda el informe de cada ejecución
+CARPETA_INFORMES = 'informes_ejecucion'
+
+
+# Pico de memoria residente del proceso en MB, o None si no se puede consultar
+def pico_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return _pico_rss_windows()
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo informa en KB y macOS en bytes
+    return round(pico / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+
+def _pico_rss_windows():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ContadoresMemoria(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        contadores = ContadoresMemoria()
+        contadores.cb = ctypes.sizeof(contadores)
+        proceso = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+            return None
+        return round(contadores.PeakWorkingSetSize / 2 ** 20, 1)
+    except (ImportError, AttributeError, OSError):
+        return None
+
+
+# Tiempos y contadores por etapa de una ejecución (lectura del Excel, índice, extracción,
+# Excel de coincidencias...). Cada etapa acumula el tiempo de todas sus pasadas y el pico
+# de memoria del proceso al terminar la última
+class Medicion:
+    def __init__(self):
+        self.fecha = datetime.now()
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+
+    def _datos(self, nombre):
+        if nombre not in self.etapas:
+            self.etapas[nombre] = {'segundos': 0.0, 'veces': 0}
+        return self.etapas[nombre]
+
+    @contextmanager
+    def etapa(self, nombre):
+        datos = self._datos(nombre)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            datos['segundos'] += time.perf_counter() - inicio
+            datos['veces'] += 1
+            datos['pico_rss_mb'] = pico_rss_mb()
+
+    def contar(self, nombre, **contadores):
+        datos = self._datos(nombre)
+        for clave, valor in contadores.items():
+            datos[clave] = datos.get(clave, 0) + valor
+
+    def informe(self, **extra):
+        etapas = {}
+        for nombre, datos in self.etapas.items():
+            etapas[nombre] = dict(datos, segundos=round(datos['segundos'], 3))
+        return dict({
+            'fecha': self.fecha.isoformat(timespec='seconds'),
+            'segundos': round(time.perf_counter() - self.inicio, 3),
+            'pico_rss_mb': pico_rss_mb(),
+            'etapas': etapas,
+        }, **extra)
+
+    # Escribe el informe en <output_root>/informes_ejecucion/<nombre>_<fecha>.json
+    def guardar_informe(self, output_root, nombre='ejecucion', **extra):
+        carpeta = os.path.join(output_root, CARPETA_INFORMES)
+        os.makedirs(carpeta, exist_ok=True)
+        ruta = os.path.join(carpeta, f"{nombre}_{self.fecha.strftime('%Y-%m-%d_%H%M%S')}.json")
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(self.informe(**extra), f, ensure_ascii=False, indent=2, default=str)
+        return ruta
+
+
+# Perfila con cProfile lo que se ejecute dentro del bloque y guarda las estadísticas en ruta
+# (se leen con python -m pstats o snakeviz). Sin ruta no hace nada
+@contextmanager
+def perfilar(ruta=None):
+    if not ruta:
+        yield
+        return
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        perfil.dump_stats(ruta)
@@ -0,0 +1,147 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from procesador.lectura_excel import INDICE_FILA
+
+# Formatos de texto aceptados para DATE: los de parse_date más los que produce Excel al exportar
+FORMATOS_FECHA = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y%m%d', '%Y/%m/%d', '%Y-%m-%d %H:%M:%S']
+
+# Formatos de texto aceptados para TIME
+FORMATOS_HORA = ['%H:%M:%S', '%H:%M', '%H%M%S', '%I:%M:%S %p', '%I:%M %p', '%Y-%m-%d %H:%M:%S']
+
+# Origen de las fechas seriales de Excel (sistema 1900)
+ORIGEN_EXCEL = '1899-12-30'
+
+_SEGUNDOS_DIA = 24 * 60 * 60
+
+
+# Clasifica cada celda por tipo de valor sin recorrer la columna más de una vez
+def _tipos(columna):
+    tipos = columna.map(type)
+    es_texto = tipos == str
+    es_numero = tipos.isin([int, float, np.int64, np.float64]) & columna.notna()
+    es_fecha = tipos.isin([datetime.datetime, pd.Timestamp, datetime.date])
+    es_hora = tipos == datetime.time
+    es_duracion = tipos.isin([datetime.timedelta, pd.Timedelta])
+    return es_texto, es_numero, es_fecha, es_hora, es_duracion
+
+
+# Prueba cada formato sobre las celdas de texto que aún no se pudieron interpretar
+def _texto_a_fecha(textos, formatos):
+    resultado = pd.Series(pd.NaT, index=textos.index, dtype='datetime64[ns]')
+    for formato in formatos:
+        pendientes = resultado.isna()
+        if not pendientes.any():
+            break
+        resultado[pendientes] = pd.to_datetime(textos[pendientes], format=formato, errors='coerce')
+    return resultado
+
+
+# Aplica la normalización solo a los valores distintos de la columna y reparte el resultado.
+# En un registro de chats las fechas y horas se repiten mucho, así que el trabajo real es pequeño
+def _por_valores_unicos(normalizar, columna):
+    codigos, unicos = pd.factorize(columna)
+    valores = normalizar(pd.Series(unicos, dtype=object)).to_numpy(dtype=object)
+    resultado = np.full(len(codigos), np.nan, dtype=object)
+    validos = codigos >= 0
+    resultado[validos] = valores[codigos[validos]]
+    return pd.Series(resultado, index=columna.index, dtype=object)
+
+
+# Convierte la columna DATE a texto 'YYYY-MM-DD'; las celdas que no se pueden interpretar quedan NaN
+def normalizar_fecha(columna):
+    return _por_valores_unicos(_normalizar_fecha, columna)
+
+
+def _normalizar_fecha(columna):
+    es_texto, es_numero, es_fecha, _, _ = _tipos(columna)
+    fechas = pd.Series(pd.NaT, index=columna.index, dtype='datetime64[ns]')
+
+    if es_fecha.any():
+        fechas[es_fecha] = pd.to_datetime(columna[es_fecha], errors='coerce')
+
+    if es_texto.any():
+        fechas[es_texto] = _texto_a_fecha(columna[es_texto].str.strip(), FORMATOS_FECHA)
+
+    if es_numero.any():
+        numeros = pd.to_numeric(columna[es_numero], errors='coerce')
+        # Números con forma YYYYMMDD; el resto se toma como fecha serial de Excel
+        es_ymd = numeros.between(19000101, 99991231) & (numeros % 1 == 0)
+        fechas[numeros[es_ymd].index] = pd.to_datetime(
+            numeros[es_ymd].astype('int64').astype(str), format='%Y%m%d', errors='coerce'
+        )
+        seriales = numeros[~es_ymd & numeros.between(1, 2958465)]
+        fechas[seriales.index] = pd.to_datetime(seriales, unit='D', origin=ORIGEN_EXCEL)
+
+    return fechas.dt.strftime('%Y-%m-%d').where(fechas.notna())
+
+
+# Convierte la columna TIME a texto 'HHMMSS'; las celdas que no se pueden interpretar quedan NaN
+def normalizar_hora(columna):
+    return _por_valores_unicos(_normalizar_hora, columna)
+
+
+def _normalizar_hora(columna):
+    es_texto, es_numero, es_fecha, es_hora, es_duracion = _tipos(columna)
+    segundos = pd.Series(np.nan, index=columna.index)
+
+    if es_hora.any() or es_duracion.any():
+        # str(time) y str(timedelta) ya tienen la forma H:MM:SS que entiende to_timedelta
+        mascara = es_hora | es_duracion
+        duraciones = pd.to_timedelta(columna[mascara].astype(str), errors='coerce')
+        segundos[mascara] = duraciones.dt.total_seconds()
+
+    if es_fecha.any():
+        fechas = pd.to_datetime(columna[es_fecha], errors='coerce')
+        segundos[es_fecha] = (fechas - fechas.dt.normalize()).dt.total_seconds()
+
+    if es_texto.any():
+        horas = _texto_a_fecha(columna[es_texto].str.strip(), FORMATOS_HORA)
+        segundos[es_texto] = (horas - horas.dt.normalize()).dt.total_seconds()
+
+    if es_numero.any():
+        numeros = pd.to_numeric(columna[es_numero], errors='coerce')
+        numeros = numeros[numeros >= 0]
+        # Los enteros son horas HHMMSS (Excel le quita el cero inicial a 070537); los que no son
+        # una hora válida quedan NaN. El resto se toma como fracción de día de Excel; en una
+        # fecha serial completa se toma solo la parte decimal
+        es_hhmmss = numeros % 1 == 0
+        hhmmss = numeros[es_hhmmss].astype('int64')
+        hh, mm, ss = hhmmss // 10000, hhmmss // 100 % 100, hhmmss % 100
+        validas = (hh < 24) & (mm < 60) & (ss < 60)
+        segundos[hhmmss[validas].index] = (hh * 3600 + mm * 60 + ss)[validas]
+        fracciones = numeros[~es_hhmmss]
+        segundos[fracciones.index] = (fracciones % 1) * _SEGUNDOS_DIA
+
+    segundos = segundos.round()
+    validos = segundos.notna()
+    enteros = segundos[validos].astype('int64') % _SEGUNDOS_DIA
+    horas = pd.Series(np.nan, index=columna.index, dtype=object)
+    horas[validos] = (
+        (enteros // 3600).astype(str).str.zfill(2)
+        + (enteros % 3600 // 60).astype(str).str.zfill(2)
+        + (enteros % 60).astype(str).str.zfill(2)
+    )
+    return horas
+
+
+# Construye 'chat_YYYY-MM-DD_HHMMSS_GUID.html' para todo el registro a la vez.
+# Las filas sin fecha, hora o GUID interpretables quedan con MATCH NAME vacío
+def construir_claves(df):
+    fecha = normalizar_fecha(df['DATE'])
+    hora = normalizar_hora(df['TIME'])
+    # Sin ningún texto (registro vacío, GUID numéricos o en blanco) la columna no es de texto
+    guid = df['SESSION GUID'].astype(object)
+    guid = guid.where(guid.map(type) == str).str.strip().replace('', np.nan)
+    return 'chat_' + fecha + '_' + hora + '_' + guid + '.html'
+
+
+# Filas del Excel (numeradas como en la hoja, con encabezado en la fila 1) sin MATCH NAME. Un
+# registro leído del Excel trae ese número en el índice; en otro DataFrame se cuenta desde la fila 2
+def filas_sin_clave(df):
+    sin_clave = df['MATCH NAME'].isna().to_numpy()
+    if df.index.name == INDICE_FILA:
+        return [int(fila) for fila in df.index[sin_clave]]
+    return [int(i) + 2 for i in np.flatnonzero(sin_clave)]
@@ -0,0 +1,358 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import repeat
+
+from procesador.almacen import AlmacenContenido
+from procesador.analisis_html import COLUMNAS_METRICAS, guardar_metricas, metricas_html, texto_html
+from procesador.busqueda import IndiceBusqueda
+from procesador.contenedor import ContenedorZip
+from procesador.extraccion import extraer_coincidencias, extraer_htmls
+from procesador.indice import COLUMNAS_FILA, IndiceMatch, construir_indice
+from procesador.lectura_excel import cargar_registro_chat, guardar_match_names
+from procesador.manifiesto import ManifiestoExtraccion
+from procesador.medicion import Medicion
+from procesador.reporte_excel import NOMBRE_LIBRO, LibroCoincidencias, crear_excel_coincidencia
+
+# Qué Excel se genera para las coincidencias
+MODOS_EXCEL = ('ninguno', 'por_coincidencia', 'libro')
+
+
+# Formatea una fecha escrita por el usuario como 'YYYY-MM-DD', o None si no es válida
+def parse_date(date_str):
+    date_formats = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y%m%d']
+    for fmt in date_formats:
+        try:
+            return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+# Carpeta output/<fecha> donde se escriben los HTML; sin fecha se usa la de hoy
+def carpeta_salida(output_root, fecha=None):
+    if not os.path.isdir(output_root):
+        raise ValueError("La ruta de salida no es válida")
+    if fecha:
+        folder_date = parse_date(fecha)
+        if not folder_date:
+            raise ValueError(
+                "El formato de la fecha no es válido. Usa formatos como "
+                "'YYYY-MM-DD', 'DD/MM/YYYY', 'DD-MM-YYYY', o 'YYYYMMDD'"
+            )
+    else:
+        folder_date = datetime.now().strftime('%Y-%m-%d')
+
+    output_folder = os.path.join(output_root, folder_date)
+    os.makedirs(output_folder, exist_ok=True)
+    return output_folder
+
+
+# Lee un registro de chats (o su caché) y escribe su columna MATCH NAME. Es también la tarea
+# de cada proceso del pool cuando se leen varios registros a la vez. Devuelve (df, False) si la
+# columna no se pudo guardar: el registro se usa igual desde memoria
+def preparar_registro(ruta_excel, guardar_sidecar=True):
+    df = cargar_registro_chat(ruta_excel)
+    if guardar_sidecar:
+        return df, guardar_match_names(df, ruta_excel) is not None
+    return df, True
+
+
+# Registros de chats en el orden de rutas_excel. Con procesos > 1 se leen a la vez en un pool
+# de procesos, así que el tiempo total se acerca al del archivo más grande y no a la suma.
+# Los registros cuya columna MATCH NAME no se pudo guardar se cuentan en columna_match_name
+def leer_registros(rutas_excel, guardar_sidecar, procesos, medicion):
+    if procesos > 1 and len(rutas_excel) > 1:
+        with medicion.etapa('lectura_excel'), ProcessPoolExecutor(min(procesos, len(rutas_excel))) as pool:
+            leidos = list(pool.map(preparar_registro, rutas_excel, repeat(guardar_sidecar)))
+        registros = [df for df, _ in leidos]
+        sin_guardar = sum(1 for _, guardado in leidos if not guardado)
+    else:
+        registros = []
+        sin_guardar = 0
+        for ruta_excel in rutas_excel:
+            with medicion.etapa('lectura_excel'):
+                df = cargar_registro_chat(ruta_excel)
+            if guardar_sidecar:
+                with medicion.etapa('columna_match_name'):
+                    if guardar_match_names(df, ruta_excel) is None:
+                        sin_guardar += 1
+            registros.append(df)
+    if sin_guardar:
+        medicion.contar('columna_match_name', sin_guardar=sin_guardar)
+    return registros
+
+
+# Lee uno o varios registros de chats (por ejemplo el Agent Chat Log y las bitácoras de cada
+# agente) y los reúne en un solo índice de MATCH NAME. Cada fila del índice guarda el archivo
+# del que salió; si una clave aparece en varios archivos gana el primero de rutas_excel
+def cargar_indice(rutas_excel, guardar_sidecar=True, medicion=None, procesos=1):
+    medicion = medicion if medicion is not None else Medicion()
+    registros = leer_registros(rutas_excel, guardar_sidecar, procesos, medicion)
+    return indexar_registros(rutas_excel, registros, medicion)
+
+
+# Reúne los registros ya leídos (DataFrames en el orden de rutas_excel) en un índice de MATCH NAME.
+# duplicados cuenta las filas de cada registro descartadas por repetir un MATCH NAME ya indexado
+def indexar_registros(rutas_excel, registros, medicion=None):
+    from procesador.normalizacion import filas_sin_clave
+
+    medicion = medicion if medicion is not None else Medicion()
+    indice = IndiceMatch()
+    resumen = []
+    for ruta_excel, df in zip(rutas_excel, registros):
+        medicion.contar('lectura_excel', archivos=1, filas=len(df), bytes_entrada=os.path.getsize(ruta_excel))
+        claves_previas = len(indice)
+        duplicados_previos = sum(indice.duplicados.values())
+        with medicion.etapa('indice'):
+            construir_indice(df, indice=indice, origen=os.path.basename(ruta_excel))
+        medicion.contar('indice', filas=len(df))
+        resumen.append({
+            'excel': ruta_excel,
+            'filas': len(df),
+            'filas_sin_clave': len(filas_sin_clave(df)),
+            'claves_nuevas': len(indice) - claves_previas,
+            'duplicados': sum(indice.duplicados.values()) - duplicados_previos,
+        })
+    return indice, resumen
+
+
+# Convierte el avance de la extracción en eventos de progreso con coincidencias y tiempo restante
+def _seguimiento(progreso, indice, inicio):
+    if progreso is None:
+        return None
+    coincidencias = 0
+
+    def al_avanzar(procesados, total, bytes_escritos, nombres):
+        nonlocal coincidencias
+        if indice is not None:
+            coincidencias += sum(1 for nombre in nombres if nombre in indice)
+        transcurrido = time.perf_counter() - inicio
+        eta = transcurrido / procesados * (total - procesados) if procesados else None
+        progreso({
+            'zips_internos': procesados,
+            'total': total,
+            'coincidencias': coincidencias,
+            'bytes_escritos': bytes_escritos,
+            'eta': eta,
+        })
+    return al_avanzar
+
+
+# Extrae los HTML de un ZIP en la carpeta de salida y los cruza con el índice; sin índice (no hay
+# registro de chats) solo se extraen, sin coincidencias ni Excel.
+# Devuelve un resumen con las coincidencias y lo que quedó sin pareja en cada lado.
+# al_coincidir(match_name, ruta_excel) se llama por cada coincidencia registrada,
+# progreso(evento) por cada ZIP interno y cancelar (threading.Event) detiene la extracción.
+# Los tiempos y contadores de cada etapa se acumulan en medicion; con almacen los HTML se
+# guardan una vez por contenido y la carpeta de salida los enlaza. Con contenedor, los HTML se
+# escriben dentro de un solo ZIP por carpeta (transcripciones.zip) y, con metadatos, también
+# la fila del Excel de cada coincidencia. Con analizar, los HTML se analizan mientras se copian
+# y sus métricas, unidas a la fila del Excel, se guardan en metricas_<zip>.parquet. Con busqueda
+# (IndiceBusqueda), cada HTML escrito se agrega al índice de búsqueda con su texto y su fila del Excel.
+# Sin hipervinculos, el libro de coincidencias no lleva la columna con el enlace a cada HTML
+def procesar_zip(ruta_zip, indice, output_folder, solo_coincidencias=False, modo_excel='ninguno',
+                 agrupar_por='agente', trabajadores=1, usar_procesos=False, reanudar=True,
+                 al_coincidir=None, progreso=None, cancelar=None, medicion=None, almacen=None,
+                 contenedor=False, metadatos=False, analizar=False, busqueda=None,
+                 hipervinculos=True):
+    if modo_excel not in MODOS_EXCEL:
+        raise ValueError(f"Modo de Excel no válido: {modo_excel}")
+    if contenedor and almacen is not None:
+        raise ValueError("El contenedor de salida no se puede combinar con el almacén por contenido")
+    if indice is None:
+        # Sin registro de chats solo se extraen los HTML
+        solo_coincidencias, modo_excel = False, 'ninguno'
+
+    medicion = medicion if medicion is not None else Medicion()
+    inicio = time.perf_counter()
+    seguimiento = _seguimiento(progreso, indice, inicio)
+    avance = {'zips_internos': 0, 'bytes_salida': 0}
+
+    def al_avanzar(procesados, total, bytes_escritos, nombres):
+        avance.update(zips_internos=procesados, bytes_salida=bytes_escritos)
+        if seguimiento is not None:
+            seguimiento(procesados, total, bytes_escritos, nombres)
+
+    extraccion = {
+        'trabajadores': trabajadores,
+        'usar_procesos': usar_procesos,
+        'al_avanzar': al_avanzar,
+        'cancelar': cancelar,
+        'almacen': almacen,
+        'analizar': analizar,
+        'extraer_texto': busqueda is not None,
+    }
+    metricas = []
+    destino = ContenedorZip(output_folder) if contenedor else nullcontext()
+    indexado = busqueda.escritor() if busqueda is not None else nullcontext()
+    with destino as contenedor_zip, indexado as escritor:
+        def al_miembro(miembro):
+            if escritor is not None:
+                with medicion.etapa('indice_busqueda'):
+                    _indexar_miembro(escritor, miembro, indice, output_folder, contenedor_zip, ruta_zip)
+                medicion.contar('indice_busqueda', transcripciones=1)
+            if analizar:
+                if miembro.get('metricas') is None:
+                    # Extraído por una ejecución anterior sin análisis: el manifiesto no tiene sus métricas
+                    miembro['metricas'] = metricas_html(_leer_html(miembro['html'], output_folder, contenedor_zip))
+                metricas.append(miembro)
+
+        if analizar or escritor is not None:
+            extraccion['al_miembro'] = al_miembro
+        existe = contenedor_zip.contiene if contenedor_zip is not None else None
+        registro_extraccion = ManifiestoExtraccion(output_folder, existe) if reanudar else nullcontext()
+        extraccion['contenedor'] = contenedor_zip
+        with medicion.etapa('extraccion'), registro_extraccion as manifiesto:
+            if solo_coincidencias:
+                reporte = extraer_coincidencias(ruta_zip, output_folder, indice, manifiesto=manifiesto, **extraccion)
+                htmls = len(reporte['coincidencias'])
+            else:
+                reporte = {'coincidencias': [], 'sin_excel': [], 'sin_zip': []}
+                encontrados = set()
+                htmls = 0
+                for new_html_name in extraer_htmls(ruta_zip, output_folder, manifiesto=manifiesto, **extraccion):
+                    htmls += 1
+                    if indice is None:
+                        continue
+                    if new_html_name not in indice:
+                        reporte['sin_excel'].append(new_html_name)
+                    elif new_html_name not in encontrados:
+                        encontrados.add(new_html_name)
+                        reporte['coincidencias'].append(new_html_name)
+                if indice is not None:
+                    reporte['sin_zip'] = indice.sin_transcripcion(encontrados)
+
+        medicion.contar('extraccion', zips=1, bytes_entrada=os.path.getsize(ruta_zip), htmls=htmls, **avance)
+        if contenedor_zip is not None and metadatos:
+            for match_name in reporte['coincidencias']:
+                contenedor_zip.escribir_metadatos(match_name, indice[match_name])
+
+    ruta_metricas = None
+    if analizar:
+        with medicion.etapa('metricas'):
+            ruta_metricas = _guardar_metricas(metricas, indice, output_folder, ruta_zip)
+        medicion.contar('metricas', transcripciones=len(metricas))
+
+    with medicion.etapa('excel_coincidencias'):
+        ruta_libro = _registrar_coincidencias(reporte['coincidencias'], indice, output_folder,
+                                              modo_excel, agrupar_por, al_coincidir, medicion,
+                                              hipervinculos=hipervinculos, enlazar_html=not contenedor)
+
+    return {
+        'zip': ruta_zip,
+        'carpeta_salida': output_folder,
+        'htmls': htmls,
+        'coincidencias': reporte['coincidencias'],
+        'sin_excel': reporte['sin_excel'],
+        'sin_zip': reporte['sin_zip'],
+        'libro': ruta_libro,
+        'metricas': ruta_metricas,
+        'segundos': round(time.perf_counter() - inicio, 3),
+    }
+
+
+# Agrega un HTML al índice de búsqueda. Los que el manifiesto dio por extraídos llegan sin texto:
+# si el índice todavía no los tiene (se extrajeron sin índice) se lee el HTML ya escrito
+def _indexar_miembro(escritor, miembro, indice, output_folder, contenedor_zip, ruta_zip):
+    match_name = miembro['html']
+    texto = miembro.pop('texto', None)
+    if contenedor_zip is not None:
+        ruta = contenedor_zip.ruta
+    else:
+        ruta = os.path.join(output_folder, match_name)
+    if texto is None and not escritor.contiene(match_name):
+        texto = texto_html(_leer_html(match_name, output_folder, contenedor_zip))
+    fila = indice.get(match_name) if indice is not None else None
+    escritor.agregar(match_name, fila, texto, ruta=ruta, ruta_zip=ruta_zip)
+
+
+# Bytes de un HTML ya escrito, suelto en la carpeta de salida o dentro del contenedor
+def _leer_html(match_name, output_folder, contenedor_zip):
+    if contenedor_zip is not None:
+        return contenedor_zip.leer(match_name)
+    with open(os.path.join(output_folder, match_name), 'rb') as f:
+        return f.read()
+
+
+# Una fila por HTML extraído: MATCH NAME, la fila del Excel (vacía si no tiene) y sus métricas.
+# Los HTML que el manifiesto dio por extraídos traen las métricas de la ejecución anterior, o
+# las de volver a leer el HTML escrito si esa ejecución no las calculó
+def _guardar_metricas(miembros, indice, output_folder, ruta_zip):
+    filas = []
+    for miembro in miembros:
+        fila = {'MATCH NAME': miembro['html']}
+        fila_excel = indice.get(miembro['html']) if indice is not None else None
+        fila.update(fila_excel or dict.fromkeys(COLUMNAS_FILA))
+        fila.update(miembro.get('metricas') or dict.fromkeys(COLUMNAS_METRICAS))
+        filas.append(fila)
+    nombre = os.path.splitext(os.path.basename(ruta_zip))[0]
+    return guardar_metricas(filas, output_folder, nombre)
+
+
+# hipervinculos agrega al libro una columna con el enlace a cada HTML; enlazar_html indica si hay
+# archivo al que enlazar (no lo hay cuando están en el contenedor)
+def _registrar_coincidencias(coincidencias, indice, output_folder, modo_excel, agrupar_por, al_coincidir,
+                             medicion, hipervinculos=True, enlazar_html=True):
+    medicion.contar('excel_coincidencias', coincidencias=len(coincidencias))
+    if modo_excel == 'libro':
+        ruta_libro = os.path.join(output_folder, NOMBRE_LIBRO)
+        with LibroCoincidencias(ruta_libro, agrupar_por=agrupar_por, hipervinculos=hipervinculos) as libro:
+            for match_name in coincidencias:
+                libro.agregar(match_name, indice[match_name], match_name if enlazar_html else None)
+                if al_coincidir is not None:
+                    al_coincidir(match_name, ruta_libro)
+        medicion.contar('excel_coincidencias', archivos=1, bytes_salida=os.path.getsize(ruta_libro))
+        return ruta_libro
+
+    for match_name in coincidencias:
+        ruta_excel = None
+        if modo_excel == 'por_coincidencia':
+            ruta_excel = crear_excel_coincidencia(indice[match_name], output_folder)
+            medicion.contar('excel_coincidencias', archivos=1, bytes_salida=os.path.getsize(ruta_excel))
+        if al_coincidir is not None:
+            al_coincidir(match_name, ruta_excel)
+    return None
+
+
+# Procesa un lote: uno o varios registros de chats contra uno o varios ZIP, con la misma fecha de salida.
+# indices_cargados permite reutilizar entre lotes el índice de los mismos registros de chats,
+# y medicion acumular los tiempos de varios lotes en un mismo informe. Con deduplicar, los HTML
+# van al almacén por contenido de output_root y cada carpeta de fecha los enlaza. procesos_excel
+# es cuántos registros de chats se leen a la vez. Con indexar, cada HTML se agrega al índice de
+# búsqueda de output_root
+def procesar_lote(rutas_excel, rutas_zip, output_root, fecha=None, indices_cargados=None, medicion=None,
+                  deduplicar=False, procesos_excel=1, indexar=False, **opciones):
+    medicion = medicion if medicion is not None else Medicion()
+    if deduplicar:
+        opciones['almacen'] = AlmacenContenido.en_salida(output_root)
+    if indexar:
+        opciones['busqueda'] = IndiceBusqueda.en_salida(output_root)
+    output_folder = carpeta_salida(output_root, fecha)
+    clave = tuple(os.path.abspath(ruta) for ruta in rutas_excel)
+    if indices_cargados is not None and clave in indices_cargados:
+        indice, registros = indices_cargados[clave]
+    else:
+        if rutas_excel:
+            indice, registros = cargar_indice(rutas_excel, medicion=medicion, procesos=procesos_excel)
+        else:
+            indice, registros = None, []
+        if indices_cargados is not None:
+            indices_cargados[clave] = (indice, registros)
+    resultados = [procesar_zip(ruta_zip, indice, output_folder, medicion=medicion, **opciones)
+                  for ruta_zip in rutas_zip]
+    return {
+        'carpeta_salida': output_folder,
+        'registros': registros,
+        'zips': resultados,
+    }
+
+
+# Versión del resumen sin las listas de nombres, para reportes compactos
+def resumen_compacto(resultado):
+    compacto = dict(resultado)
+    for clave in ('coincidencias', 'sin_excel', 'sin_zip'):
+        compacto[clave] = len(resultado[clave])
+    return compacto
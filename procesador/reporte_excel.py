@@ -0,0 +1,108 @@
+import os
+import re
+
+# openpyxl se importa al escribir, para no cargarlo al arrancar
+
+# Nombre del libro consolidado dentro de la carpeta de salida
+NOMBRE_LIBRO = 'coincidencias.xlsx'
+
+ENCABEZADOS = ["MATCH NAME", "Agent", "Customer ID", "Account Name"]
+
+# Columna de la fila usada para repartir las coincidencias en hojas
+AGRUPACIONES = {
+    'agente': 'AGENT NAME',
+    'cuenta': 'ACCOUNT NAME',
+}
+
+_CARACTERES_INVALIDOS_HOJA = re.compile(r'[\[\]:*?/\\]')
+
+
+# Crea el Excel de una sola coincidencia, '{agente}_{cliente}_{cuenta}.xlsx' en la carpeta de salida
+def crear_excel_coincidencia(fila, output_folder):
+    from openpyxl import Workbook
+
+    agent_name = fila.get('AGENT NAME')
+    customer_id = fila.get('CUSTOMER ID')
+    account_name = fila.get('ACCOUNT NAME')
+    ruta = os.path.join(output_folder, f"{agent_name}_{customer_id}_{account_name}.xlsx")
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Sheet1")
+    hoja.append(["Agent", "Customer ID", "Account Name"])
+    hoja.append([agent_name, customer_id, account_name])
+    libro.save(ruta)
+    return ruta
+
+
+# Libro único con todas las coincidencias, escrito en modo write-only para que la
+# memoria no crezca con el número de filas. Cada fila se añade tal como llega
+class LibroCoincidencias:
+    def __init__(self, ruta, agrupar_por=None, hipervinculos=False):
+        if agrupar_por is not None and agrupar_por not in AGRUPACIONES:
+            raise ValueError(f"Agrupación no válida: {agrupar_por}")
+        from openpyxl import Workbook
+
+        self.ruta = ruta
+        self.agrupar_por = agrupar_por
+        self.hipervinculos = hipervinculos
+        self.filas_escritas = 0
+        self._libro = Workbook(write_only=True)
+        self._hojas = {}
+        self._nombres_hoja = set()
+
+    def _hoja(self, fila):
+        if self.agrupar_por is None:
+            grupo = "Coincidencias"
+        else:
+            grupo = fila.get(AGRUPACIONES[self.agrupar_por])
+            # grupo != grupo detecta los NaN que deja pandas en celdas vacías
+            grupo = "Sin dato" if grupo is None or grupo != grupo else str(grupo)
+
+        hoja = self._hojas.get(grupo)
+        if hoja is None:
+            hoja = self._libro.create_sheet(self._nombre_hoja(grupo))
+            encabezados = list(ENCABEZADOS)
+            if self.hipervinculos:
+                encabezados.append("Transcripción")
+            hoja.append(encabezados)
+            self._hojas[grupo] = hoja
+        return hoja
+
+    # Excel limita los nombres de hoja a 31 caracteres sin []:*?/\ y sin repetir
+    def _nombre_hoja(self, grupo):
+        base = _CARACTERES_INVALIDOS_HOJA.sub('_', grupo).strip("'") or "Sin dato"
+        base = base[:31]
+        nombre, n = base, 1
+        while nombre.lower() in self._nombres_hoja:
+            n += 1
+            sufijo = f" ({n})"
+            nombre = base[:31 - len(sufijo)] + sufijo
+        self._nombres_hoja.add(nombre.lower())
+        return nombre
+
+    def agregar(self, match_name, fila, ruta_html=None):
+        valores = [match_name, fila.get('AGENT NAME'), fila.get('CUSTOMER ID'), fila.get('ACCOUNT NAME')]
+        if self.hipervinculos:
+            if ruta_html:
+                destino = ruta_html.replace('"', '""')
+                texto = match_name.replace('"', '""')
+                valores.append(f'=HYPERLINK("{destino}","{texto}")')
+            else:
+                valores.append(None)
+        self._hoja(fila).append(valores)
+        self.filas_escritas += 1
+
+    def cerrar(self):
+        if self._libro is None:
+            return
+        if not self._hojas:
+            # Un libro sin hojas no se puede guardar
+            self._hoja({})
+        self._libro.save(self.ruta)
+        self._libro = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
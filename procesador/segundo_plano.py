@@ -0,0 +1,71 @@
+import queue
+import threading
+
+# Cada cuánto revisa la interfaz los eventos del hilo de trabajo
+INTERVALO_MS = 100
+
+
+# Ejecuta funcion(progreso, cancelar) en un hilo aparte para que la ventana de Tk siga respondiendo.
+# Los eventos se entregan a los callbacks siempre desde el hilo de la interfaz
+class TareaEnSegundoPlano:
+    def __init__(self, root, funcion, al_progreso=None, al_terminar=None, al_fallar=None):
+        self.cancelar = threading.Event()
+        self._root = root
+        self._funcion = funcion
+        self._al_progreso = al_progreso
+        self._al_terminar = al_terminar
+        self._al_fallar = al_fallar
+        self._eventos = queue.Queue()
+
+    def iniciar(self):
+        threading.Thread(target=self._ejecutar, daemon=True).start()
+        self._root.after(INTERVALO_MS, self._revisar)
+
+    def _ejecutar(self):
+        try:
+            resultado = self._funcion(self._progreso, self.cancelar)
+        except Exception as e:
+            self._eventos.put(('error', e))
+        else:
+            self._eventos.put(('fin', resultado))
+
+    def _progreso(self, evento):
+        self._eventos.put(('progreso', evento))
+
+    def _revisar(self):
+        ultimo_progreso = None
+        final = None
+        while final is None:
+            try:
+                tipo, dato = self._eventos.get_nowait()
+            except queue.Empty:
+                break
+            if tipo == 'progreso':
+                # Solo interesa el avance más reciente
+                ultimo_progreso = dato
+            else:
+                final = (tipo, dato)
+
+        if ultimo_progreso is not None and self._al_progreso is not None:
+            self._al_progreso(ultimo_progreso)
+
+        if final is None:
+            self._root.after(INTERVALO_MS, self._revisar)
+        elif final[0] == 'fin':
+            if self._al_terminar is not None:
+                self._al_terminar(final[1])
+        elif self._al_fallar is not None:
+            self._al_fallar(final[1])
+
+
+# Texto de una línea para un evento de progreso de la extracción
+def texto_progreso(evento):
+    texto = (
+        f"ZIP internos: {evento['zips_internos']}/{evento['total']}  ·  "
+        f"coincidencias: {evento['coincidencias']}  ·  "
+        f"{evento['bytes_escritos'] / (1024 * 1024):.1f} MB escritos"
+    )
+    if evento['eta'] is not None:
+        minutos, segundos = divmod(int(evento['eta']), 60)
+        texto += f"  ·  restante: {minutos:02d}:{segundos:02d}"
+    return texto
@@ -0,0 +1,533 @@
+import hmac
+import ipaddress
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from procesador.extraccion import TAM_BLOQUE, ProcesoCancelado, trabajadores_por_defecto
+from procesador.medicion import Medicion
+from procesador.pipeline import MODOS_EXCEL, parse_date, procesar_lote, resumen_compacto
+from procesador.reporte_excel import AGRUPACIONES
+
+# Carpeta, dentro de la raíz del servicio, con una subcarpeta por trabajo (entrada/ y salida/)
+CARPETA_TRABAJOS = 'trabajos'
+
+# Estado de cada trabajo, guardado en su carpeta para sobrevivir a un reinicio del servicio
+NOMBRE_ESTADO = 'trabajo.json'
+
+# Archivos que se pueden subir a un trabajo
+EXTENSIONES_ENTRADA = ('.zip', '.xlsx', '.xls')
+
+# Opciones de procesamiento que un trabajo puede cambiar, con su tipo
+OPCIONES_TRABAJO = {
+    'fecha': str,
+    'solo_coincidencias': bool,
+    'modo_excel': str,
+    'agrupar_por': str,
+    'hipervinculos': bool,
+    'trabajadores': int,
+    'usar_procesos': bool,
+    'analizar': bool,
+    'contenedor': bool,
+    'metadatos': bool,
+    'indexar': bool,
+}
+
+# Estados de un trabajo: recibe archivos hasta que se inicia, espera su turno y se procesa
+RECIBIENDO, EN_COLA, PROCESANDO, TERMINADO, FALLIDO, CANCELADO, INTERRUMPIDO = (
+    'recibiendo', 'en_cola', 'procesando', 'terminado', 'fallido', 'cancelado', 'interrumpido')
+
+# Variable de entorno con el token que exige el servicio; sin él solo se escucha en loopback
+VARIABLE_TOKEN = 'PROCESADOR_TOKEN'
+
+# Opciones con una cantidad de hilos o procesos: cada uno abre sus propios archivos, así que
+# se limitan a los núcleos del equipo para que un trabajo no agote los descriptores de todos
+OPCIONES_PARALELISMO = ('trabajadores', 'procesos_excel')
+
+PUERTO_POR_DEFECTO = 8765
+TRABAJOS_SIMULTANEOS = 2
+MAX_TRABAJOS_PENDIENTES = 16
+
+
+class TrabajoNoEncontrado(Exception):
+    pass
+
+
+# La operación no corresponde al estado del trabajo (por ejemplo, subir archivos a uno ya iniciado)
+class EstadoNoValido(Exception):
+    pass
+
+
+class ColaLlena(Exception):
+    pass
+
+
+class Trabajo:
+    def __init__(self, carpeta, id_trabajo, opciones):
+        self.id = id_trabajo
+        self.carpeta = carpeta
+        self.opciones = opciones
+        self.estado = RECIBIENDO
+        self.archivos = {}
+        self.progreso = None
+        self.resultado = None
+        self.error = None
+        self.creado = datetime.now().isoformat(timespec='seconds')
+        self.iniciado = None
+        self.terminado = None
+        self.cancelar = threading.Event()
+
+    @property
+    def entrada(self):
+        return os.path.join(self.carpeta, 'entrada')
+
+    @property
+    def salida(self):
+        return os.path.join(self.carpeta, 'salida')
+
+    def rutas(self, extensiones):
+        return [os.path.join(self.entrada, nombre) for nombre in sorted(self.archivos)
+                if nombre.lower().endswith(extensiones)]
+
+    # Archivos escritos en la salida, relativos a ella
+    def archivos_salida(self):
+        if not os.path.isdir(self.salida):
+            return []
+        archivos = []
+        for carpeta, _, nombres in os.walk(self.salida):
+            for nombre in nombres:
+                archivos.append(os.path.relpath(os.path.join(carpeta, nombre), self.salida).replace(os.sep, '/'))
+        return sorted(archivos)
+
+    def datos(self):
+        return {
+            'id': self.id,
+            'estado': self.estado,
+            'opciones': self.opciones,
+            'archivos': [{'nombre': nombre, 'bytes': tamano} for nombre, tamano in sorted(self.archivos.items())],
+            'progreso': self.progreso,
+            'resultado': self.resultado,
+            'error': self.error,
+            'creado': self.creado,
+            'iniciado': self.iniciado,
+            'terminado': self.terminado,
+        }
+
+    def guardar(self):
+        parcial = os.path.join(self.carpeta, NOMBRE_ESTADO + '.tmp')
+        with open(parcial, 'w', encoding='utf-8') as f:
+            json.dump(self.datos(), f, ensure_ascii=False, indent=2, default=str)
+        os.replace(parcial, os.path.join(self.carpeta, NOMBRE_ESTADO))
+
+    @classmethod
+    def cargar(cls, carpeta):
+        with open(os.path.join(carpeta, NOMBRE_ESTADO), 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        trabajo = cls(carpeta, datos['id'], datos['opciones'])
+        trabajo.archivos = {archivo['nombre']: archivo['bytes'] for archivo in datos['archivos']}
+        for campo in ('estado', 'progreso', 'resultado', 'error', 'creado', 'iniciado', 'terminado'):
+            setattr(trabajo, campo, datos[campo])
+        if trabajo.estado in (EN_COLA, PROCESANDO):
+            # El servicio se detuvo con el trabajo pendiente; la salida puede estar a medias
+            trabajo.estado = INTERRUMPIDO
+        return trabajo
+
+
+# Copia de opciones con los hilos y procesos limitados a los núcleos del equipo
+def _limitar_paralelismo(opciones):
+    opciones = dict(opciones)
+    for clave in OPCIONES_PARALELISMO:
+        if clave in opciones:
+            opciones[clave] = min(opciones[clave], trabajadores_por_defecto())
+    return opciones
+
+
+# Cola de trabajos del servicio: cada trabajo reúne los registros de chats y ZIP subidos y se
+# procesa con procesar_lote en un pool de simultaneos hilos. Se admiten a lo sumo
+# max_pendientes trabajos en cola o en proceso; el resto se rechaza hasta que se libere lugar.
+# opciones son las opciones de procesar_lote por defecto de cada trabajo
+class ServicioTrabajos:
+    def __init__(self, raiz, simultaneos=TRABAJOS_SIMULTANEOS, max_pendientes=MAX_TRABAJOS_PENDIENTES,
+                 opciones=None):
+        self.carpeta = os.path.join(raiz, CARPETA_TRABAJOS)
+        os.makedirs(self.carpeta, exist_ok=True)
+        self.max_pendientes = max_pendientes
+        self.opciones = _limitar_paralelismo(opciones or {})
+        self._pool = ThreadPoolExecutor(simultaneos)
+        self._lock = threading.Lock()
+        self._trabajos = {}
+        for nombre in sorted(os.listdir(self.carpeta)):
+            if os.path.exists(os.path.join(self.carpeta, nombre, NOMBRE_ESTADO)):
+                trabajo = Trabajo.cargar(os.path.join(self.carpeta, nombre))
+                self._trabajos[trabajo.id] = trabajo
+
+    def crear(self, opciones=None):
+        opciones = opciones or {}
+        for clave, valor in opciones.items():
+            tipo = OPCIONES_TRABAJO.get(clave)
+            if tipo is None:
+                raise ValueError(f"Opción desconocida: {clave}")
+            if type(valor) is not tipo:
+                raise ValueError(f"La opción {clave} debe ser de tipo {tipo.__name__}")
+        if 'fecha' in opciones and not parse_date(opciones['fecha']):
+            raise ValueError(f"Fecha no válida: {opciones['fecha']}")
+        if opciones.get('modo_excel', MODOS_EXCEL[0]) not in MODOS_EXCEL:
+            raise ValueError(f"Modo de Excel no válido: {opciones['modo_excel']}")
+        if opciones.get('agrupar_por', 'agente') not in AGRUPACIONES:
+            raise ValueError(f"Agrupación no válida: {opciones['agrupar_por']}")
+        if opciones.get('trabajadores', 1) < 1:
+            raise ValueError("trabajadores debe ser al menos 1")
+        opciones = _limitar_paralelismo(opciones)
+        id_trabajo = uuid.uuid4().hex
+        trabajo = Trabajo(os.path.join(self.carpeta, id_trabajo), id_trabajo, opciones)
+        os.makedirs(trabajo.entrada)
+        trabajo.guardar()
+        with self._lock:
+            self._trabajos[id_trabajo] = trabajo
+        return trabajo
+
+    def obtener(self, id_trabajo):
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+        if trabajo is None:
+            raise TrabajoNoEncontrado(f"No existe el trabajo {id_trabajo}")
+        return trabajo
+
+    def listar(self):
+        with self._lock:
+            return list(self._trabajos.values())
+
+    # Copia en bloques los tamano bytes de lector a la entrada del trabajo, sin tenerlos en memoria.
+    # Se escribe a un nombre temporal: una subida cortada no deja un archivo a medias
+    def recibir_archivo(self, trabajo, nombre, lector, tamano):
+        if not nombre or nombre != os.path.basename(nombre) or nombre.startswith('.'):
+            raise ValueError(f"Nombre de archivo no válido: {nombre}")
+        if not nombre.lower().endswith(EXTENSIONES_ENTRADA):
+            raise ValueError(f"Solo se aceptan archivos {', '.join(EXTENSIONES_ENTRADA)}")
+        if tamano == 0:
+            raise ValueError(f"El archivo {nombre} está vacío")
+        if trabajo.estado != RECIBIENDO:
+            raise EstadoNoValido(f"El trabajo ya no recibe archivos (estado: {trabajo.estado})")
+
+        destino = os.path.join(trabajo.entrada, nombre)
+        descriptor, parcial = tempfile.mkstemp(dir=trabajo.entrada, prefix='.', suffix='.parcial')
+        restante = tamano
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                while restante > 0:
+                    bloque = lector.read(min(TAM_BLOQUE, restante))
+                    if not bloque:
+                        raise ConnectionError(f"La subida de {nombre} se cortó antes de terminar")
+                    f.write(bloque)
+                    restante -= len(bloque)
+            with self._lock:
+                # Se vuelve a mirar: el trabajo pudo iniciarse mientras llegaba el archivo
+                if trabajo.estado != RECIBIENDO:
+                    raise EstadoNoValido(f"El trabajo se inició antes de terminar la subida de {nombre}")
+                os.replace(parcial, destino)
+                trabajo.archivos[nombre] = tamano
+                trabajo.guardar()
+        except BaseException:
+            if os.path.exists(parcial):
+                os.remove(parcial)
+            raise
+
+    # Pone el trabajo en la cola. Uno interrumpido por un reinicio del servicio se puede volver a
+    # iniciar: el manifiesto de extracción hace que siga donde quedó
+    def encolar(self, trabajo):
+        with self._lock:
+            if trabajo.estado not in (RECIBIENDO, INTERRUMPIDO):
+                raise EstadoNoValido(f"El trabajo ya se inició (estado: {trabajo.estado})")
+            if not trabajo.rutas('.zip'):
+                raise EstadoNoValido("El trabajo no tiene ZIP de transcripciones")
+            pendientes = sum(1 for t in self._trabajos.values() if t.estado in (EN_COLA, PROCESANDO))
+            if pendientes >= self.max_pendientes:
+                raise ColaLlena(f"Hay {pendientes} trabajos pendientes; intenta más tarde")
+            trabajo.estado = EN_COLA
+            trabajo.progreso = trabajo.resultado = trabajo.error = trabajo.terminado = None
+            trabajo.guardar()
+        self._pool.submit(self._ejecutar, trabajo)
+
+    def cancelar(self, trabajo):
+        with self._lock:
+            if trabajo.estado == EN_COLA:
+                trabajo.estado = CANCELADO
+                trabajo.guardar()
+            elif trabajo.estado != PROCESANDO:
+                raise EstadoNoValido(f"El trabajo no está pendiente (estado: {trabajo.estado})")
+        # Uno en proceso se detiene antes del siguiente ZIP interno
+        trabajo.cancelar.set()
+
+    def eliminar(self, trabajo):
+        with self._lock:
+            if trabajo.estado in (EN_COLA, PROCESANDO):
+                raise EstadoNoValido("Cancela el trabajo antes de eliminarlo")
+            del self._trabajos[trabajo.id]
+        shutil.rmtree(trabajo.carpeta, ignore_errors=True)
+
+    def _ejecutar(self, trabajo):
+        with self._lock:
+            if trabajo.estado != EN_COLA:
+                return
+            trabajo.estado = PROCESANDO
+            trabajo.iniciado = datetime.now().isoformat(timespec='seconds')
+            trabajo.guardar()
+
+        try:
+            estado, resultado, error = self._correr(trabajo)
+        except Exception as e:
+            # Falló algo fuera del procesamiento (por ejemplo, el informe): el trabajo no puede
+            # quedar en proceso para siempre
+            estado, resultado, error = FALLIDO, None, str(e)
+
+        with self._lock:
+            trabajo.estado = estado
+            trabajo.resultado = resultado
+            trabajo.error = error
+            trabajo.terminado = datetime.now().isoformat(timespec='seconds')
+            trabajo.guardar()
+
+    # Procesa el trabajo y guarda su informe. Devuelve (estado, resultado, error)
+    def _correr(self, trabajo):
+        medicion = Medicion()
+        try:
+            resultado = self._procesar(trabajo, medicion)
+        except ProcesoCancelado:
+            estado, resultado, error = CANCELADO, None, None
+        except Exception as e:
+            estado, resultado, error = FALLIDO, None, str(e)
+        else:
+            estado, error = TERMINADO, None
+        medicion.guardar_informe(trabajo.salida, nombre=f"trabajo_{trabajo.id}", estado=estado, error=error)
+        return estado, resultado, error
+
+    # Procesa los ZIP del trabajo de a uno para informar el avance por ZIP; el índice de los
+    # registros de chats se lee una sola vez y se reutiliza con indices_cargados
+    def _procesar(self, trabajo, medicion):
+        opciones = dict(self.opciones, **trabajo.opciones)
+        fecha = opciones.pop('fecha', None)
+        rutas_excel = trabajo.rutas(('.xlsx', '.xls'))
+        rutas_zip = trabajo.rutas('.zip')
+        os.makedirs(trabajo.salida, exist_ok=True)
+
+        indices_cargados = {}
+        resultado = {'registros': [], 'zips': []}
+        for numero, ruta_zip in enumerate(rutas_zip, start=1):
+            def progreso(evento, numero=numero):
+                trabajo.progreso = dict(evento, zip=numero, zips=len(rutas_zip))
+
+            procesado = procesar_lote(rutas_excel, [ruta_zip], trabajo.salida, fecha,
+                                      indices_cargados=indices_cargados, medicion=medicion,
+                                      progreso=progreso, cancelar=trabajo.cancelar, **opciones)
+            resultado['registros'] = procesado['registros']
+            resultado['zips'].extend(resumen_compacto(r) for r in procesado['zips'])
+        return resultado
+
+    def cerrar(self):
+        with self._lock:
+            trabajos = list(self._trabajos.values())
+        for trabajo in trabajos:
+            trabajo.cancelar.set()
+        self._pool.shutdown(wait=True)
+
+
+# Rutas de la API (todas las respuestas, salvo las descargas, son JSON):
+#   GET    /trabajos                         lista de trabajos
+#   POST   /trabajos                         crea un trabajo; el cuerpo opcional son sus opciones
+#   GET    /trabajos/<id>                    estado, avance y resultado
+#   DELETE /trabajos/<id>                    elimina el trabajo y sus archivos
+#   PUT    /trabajos/<id>/archivos/<nombre>  sube un registro de chats o un ZIP (cuerpo = archivo)
+#   POST   /trabajos/<id>/iniciar            pone el trabajo en la cola
+#   POST   /trabajos/<id>/cancelar           cancela un trabajo en cola o en proceso
+#   GET    /trabajos/<id>/salida             archivos de la salida
+#   GET    /trabajos/<id>/salida/<ruta>      descarga un archivo de la salida
+#   GET    /trabajos/<id>/descarga           descarga toda la salida en un ZIP
+# Si el servicio tiene token, toda petición debe traer 'Authorization: Bearer <token>' (si no, 401)
+class ManejadorTrabajos(BaseHTTPRequestHandler):
+    server_version = 'ProcesadorTrabajos/1.0'
+    # Respuestas con búfer: la descarga en ZIP hace muchas escrituras pequeñas
+    wbufsize = 64 * 1024
+
+    @property
+    def servicio(self):
+        return self.server.servicio
+
+    def _partes(self):
+        return [unquote(parte) for parte in urlsplit(self.path).path.strip('/').split('/') if parte]
+
+    def _responder(self, estado, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _tamano_cuerpo(self, obligatorio=False):
+        if self.headers.get('Content-Length') is None:
+            if obligatorio:
+                raise ValueError("La subida necesita Content-Length (no se acepta Transfer-Encoding: chunked)")
+            return 0
+        try:
+            tamano = int(self.headers['Content-Length'])
+        except ValueError:
+            raise ValueError("Content-Length no válido")
+        if tamano < 0:
+            raise ValueError("Content-Length no válido")
+        return tamano
+
+    # Con token, cada petición debe traer 'Authorization: Bearer <token>'
+    def _autorizado(self):
+        token = self.server.token
+        if token is None:
+            return True
+        recibido = self.headers.get('Authorization', '')
+        return hmac.compare_digest(recibido.encode('utf-8'), f"Bearer {token}".encode('utf-8'))
+
+    def _atender(self, metodo):
+        if not self._autorizado():
+            self.close_connection = True
+            return self._responder(HTTPStatus.UNAUTHORIZED, {'error': "Falta el token del servicio o no es válido"})
+        try:
+            self._despachar(metodo, self._partes())
+        except TrabajoNoEncontrado as e:
+            self._responder(HTTPStatus.NOT_FOUND, {'error': str(e)})
+        except EstadoNoValido as e:
+            self._responder(HTTPStatus.CONFLICT, {'error': str(e)})
+        except ColaLlena as e:
+            self._responder(HTTPStatus.SERVICE_UNAVAILABLE, {'error': str(e)})
+        except ValueError as e:
+            self._responder(HTTPStatus.BAD_REQUEST, {'error': str(e)})
+        except ConnectionError:
+            # El cliente cortó la conexión: no hay a quién responder
+            self.close_connection = True
+
+    def _despachar(self, metodo, partes):
+        if not partes or partes[0] != 'trabajos' or (len(partes) > 4 and partes[2] != 'salida'):
+            raise TrabajoNoEncontrado(f"Ruta desconocida: {self.path}")
+        if len(partes) == 1:
+            if metodo == 'GET':
+                return self._responder(HTTPStatus.OK, [t.datos() for t in self.servicio.listar()])
+            if metodo == 'POST':
+                return self._crear()
+            return self._no_permitido()
+
+        trabajo = self.servicio.obtener(partes[1])
+        accion = partes[2] if len(partes) > 2 else None
+        if accion is None and metodo == 'GET':
+            return self._responder(HTTPStatus.OK, trabajo.datos())
+        if accion is None and metodo == 'DELETE':
+            self.servicio.eliminar(trabajo)
+            return self._responder(HTTPStatus.OK, {'id': trabajo.id, 'eliminado': True})
+        if accion == 'archivos' and len(partes) == 4 and metodo == 'PUT':
+            self.servicio.recibir_archivo(trabajo, partes[3], self.rfile, self._tamano_cuerpo(obligatorio=True))
+            return self._responder(HTTPStatus.CREATED, trabajo.datos())
+        if accion == 'iniciar' and len(partes) == 3 and metodo == 'POST':
+            self.servicio.encolar(trabajo)
+            return self._responder(HTTPStatus.ACCEPTED, trabajo.datos())
+        if accion == 'cancelar' and len(partes) == 3 and metodo == 'POST':
+            self.servicio.cancelar(trabajo)
+            return self._responder(HTTPStatus.ACCEPTED, trabajo.datos())
+        if accion == 'salida' and metodo == 'GET':
+            if len(partes) == 3:
+                return self._responder(HTTPStatus.OK, trabajo.archivos_salida())
+            return self._enviar_archivo(trabajo, '/'.join(partes[3:]))
+        if accion == 'descarga' and len(partes) == 3 and metodo == 'GET':
+            return self._enviar_salida(trabajo)
+        if accion in ('archivos', 'iniciar', 'cancelar', 'salida', 'descarga', None):
+            return self._no_permitido()
+        raise TrabajoNoEncontrado(f"Ruta desconocida: {self.path}")
+
+    def _no_permitido(self):
+        self._responder(HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"Método no permitido: {self.command}"})
+
+    def _crear(self):
+        tamano = self._tamano_cuerpo()
+        opciones = {}
+        if tamano:
+            try:
+                opciones = json.loads(self.rfile.read(tamano).decode('utf-8'))
+            except ValueError:
+                raise ValueError("El cuerpo debe ser un objeto JSON con las opciones del trabajo")
+            if not isinstance(opciones, dict):
+                raise ValueError("El cuerpo debe ser un objeto JSON con las opciones del trabajo")
+        trabajo = self.servicio.crear(opciones)
+        self._responder(HTTPStatus.CREATED, trabajo.datos())
+
+    def _enviar_archivo(self, trabajo, ruta_relativa):
+        salida = os.path.realpath(trabajo.salida)
+        ruta = os.path.realpath(os.path.join(salida, ruta_relativa))
+        if not ruta.startswith(salida + os.sep) or not os.path.isfile(ruta):
+            raise TrabajoNoEncontrado(f"No existe el archivo {ruta_relativa} en la salida")
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(os.path.getsize(ruta)))
+        self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(ruta)}"')
+        self.end_headers()
+        with open(ruta, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, TAM_BLOQUE)
+
+    # La salida se comprime a medida que se envía, sin armar el ZIP en disco ni en memoria;
+    # como no se conoce el tamaño de antemano, el fin de la respuesta es el cierre de la conexión
+    def _enviar_salida(self, trabajo):
+        if trabajo.estado != TERMINADO:
+            raise EstadoNoValido(f"El trabajo no terminó (estado: {trabajo.estado})")
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Disposition', f'attachment; filename="trabajo_{trabajo.id}.zip"')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        with zipfile.ZipFile(self.wfile, 'w', zipfile.ZIP_DEFLATED) as destino:
+            for ruta_relativa in trabajo.archivos_salida():
+                destino.write(os.path.join(trabajo.salida, ruta_relativa), ruta_relativa)
+
+    def do_GET(self):
+        self._atender('GET')
+
+    def do_POST(self):
+        self._atender('POST')
+
+    def do_PUT(self):
+        self._atender('PUT')
+
+    def do_DELETE(self):
+        self._atender('DELETE')
+
+    def log_message(self, formato, *args):
+        if self.server.registrar_peticiones:
+            super().log_message(formato, *args)
+
+
+# True si host es una dirección de loopback (solo accesible desde el mismo equipo)
+def es_local(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+# Servidor HTTP del servicio: un hilo por conexión, así una subida larga no frena las consultas
+# de estado. Con puerto 0 el sistema elige uno libre (server_address tiene el real). La API no
+# tiene usuarios: fuera de loopback solo se escucha con un token, que cada petición debe enviar
+def crear_servidor(servicio, host='127.0.0.1', puerto=PUERTO_POR_DEFECTO, registrar_peticiones=False, token=None):
+    if not token and not es_local(host):
+        raise ValueError(f"Para escuchar en {host} se necesita un token ({VARIABLE_TOKEN}); "
+                         "sin él solo se admite 127.0.0.1")
+    servidor = ThreadingHTTPServer((host, puerto), ManejadorTrabajos)
+    servidor.daemon_threads = True
+    servidor.servicio = servicio
+    servidor.registrar_peticiones = registrar_peticiones
+    servidor.token = token or None
+    return servidor
@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+import zipfile
+
+from procesador.almacen import AlmacenContenido
+from procesador.busqueda import IndiceBusqueda
+from procesador.medicion import Medicion
+from procesador.pipeline import carpeta_salida, indexar_registros, leer_registros, procesar_zip, resumen_compacto
+
+# Segundos entre dos revisiones de la bandeja y de los registros de chats
+INTERVALO_SEGUNDOS = 2.0
+
+# Registro de los ZIP de la bandeja ya procesados, dentro de la raíz de salida (una línea JSON por ZIP)
+NOMBRE_REGISTRO_BANDEJA = '.bandeja_procesados.jsonl'
+
+# Veces que se intenta un ZIP que falla antes de dejarlo de lado hasta que cambie o se reinicie la
+# vigilancia; cada intento sigue donde quedó el anterior gracias al manifiesto de extracción
+INTENTOS_POR_ZIP = 3
+
+
+# Tamaño y fecha de modificación de un archivo, o None si ya no existe
+def _firma(ruta):
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return estado.st_size, estado.st_mtime_ns
+
+
+# Índice de MATCH NAME que se mantiene en memoria mientras corre la vigilancia. Cada registro
+# de chats se vuelve a leer solo cuando cambia su tamaño o su fecha (y gracias a la caché por
+# contenido, un guardado sin cambios reales no vuelve a parsear el Excel); el índice combinado
+# se rearma a partir de los registros que ya están en memoria
+class IndiceVivo:
+    def __init__(self, rutas_excel, guardar_sidecar=True, procesos=1):
+        self.rutas_excel = list(rutas_excel)
+        self.guardar_sidecar = guardar_sidecar
+        self.procesos = procesos
+        self.indice = None
+        self.resumen = []
+        self._firmas = {}
+        self._registros = {}
+
+    # Relee los registros que cambiaron. Devuelve la lista de rutas releídas; si alguna falla
+    # (por ejemplo, el Excel se está guardando) se conserva el índice anterior y se reintenta luego
+    def actualizar(self, medicion=None):
+        medicion = medicion if medicion is not None else Medicion()
+        firmas = {ruta: _firma(ruta) for ruta in self.rutas_excel}
+        cambiados = [ruta for ruta in self.rutas_excel
+                     if ruta not in self._registros or firmas[ruta] != self._firmas.get(ruta)]
+        if not cambiados:
+            return []
+        registros = leer_registros(cambiados, self.guardar_sidecar, self.procesos, medicion)
+        for ruta, df in zip(cambiados, registros):
+            self._registros[ruta] = df
+            self._firmas[ruta] = firmas[ruta]
+        self.indice, self.resumen = indexar_registros(
+            self.rutas_excel, [self._registros[ruta] for ruta in self.rutas_excel], medicion)
+        return cambiados
+
+
+# ZIP de la bandeja ya procesados, identificados por nombre, tamaño y fecha de modificación:
+# si se vuelve a dejar un ZIP con el mismo nombre pero otro contenido, se procesa de nuevo
+class RegistroBandeja:
+    def __init__(self, output_root):
+        self.ruta = os.path.join(output_root, NOMBRE_REGISTRO_BANDEJA)
+        self.claves = set()
+        if os.path.exists(self.ruta):
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        self.claves.add(json.loads(linea)['clave'])
+                    except ValueError:
+                        # Última línea incompleta de una ejecución interrumpida
+                        continue
+
+    @staticmethod
+    def clave(ruta_zip, firma):
+        return f"{os.path.basename(ruta_zip)}|{firma[0]}|{firma[1]}"
+
+    def __contains__(self, clave):
+        return clave in self.claves
+
+    def registrar(self, clave, **datos):
+        with open(self.ruta, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(datos, clave=clave), ensure_ascii=False, default=str) + '\n')
+        self.claves.add(clave)
+
+
+# Vigila una bandeja de entrada y procesa cada ZIP nuevo con procesar_zip en cuanto termina de
+# copiarse (su tamaño y fecha no cambian entre dos revisiones). Cada ZIP deja su informe en
+# <output_root>/informes_ejecucion. al_evento(evento) recibe un diccionario por cada registro
+# releído, ZIP procesado o error; detener (threading.Event) termina la vigilancia
+class VigilanteBandeja:
+    def __init__(self, bandeja, rutas_excel, output_root, fecha=None, intervalo=INTERVALO_SEGUNDOS,
+                 al_evento=None, deduplicar=False, procesos_excel=1, indexar=False, **opciones):
+        if not os.path.isdir(bandeja):
+            raise ValueError(f"La bandeja no es una carpeta: {bandeja}")
+        carpeta_salida(output_root, fecha)
+        self.bandeja = bandeja
+        self.output_root = output_root
+        self.fecha = fecha
+        self.intervalo = intervalo
+        self.al_evento = al_evento
+        self.opciones = opciones
+        if deduplicar:
+            self.opciones['almacen'] = AlmacenContenido.en_salida(output_root)
+        if indexar:
+            self.opciones['busqueda'] = IndiceBusqueda.en_salida(output_root)
+        self.indice_vivo = IndiceVivo(rutas_excel, procesos=procesos_excel) if rutas_excel else None
+        self.registro = RegistroBandeja(output_root)
+        self._vistos = {}
+        # Clave del ZIP -> intentos fallidos; solo en memoria, así que un reinicio los vuelve a intentar
+        self._fallos = {}
+
+    def _avisar(self, **evento):
+        if self.al_evento is not None:
+            self.al_evento(dict(evento, hora=time.strftime('%H:%M:%S')))
+
+    # ZIP de la bandeja que ya terminaron de copiarse y no se procesaron todavía
+    def _zips_listos(self):
+        listos = []
+        vistos = {}
+        for nombre in sorted(os.listdir(self.bandeja)):
+            ruta = os.path.join(self.bandeja, nombre)
+            if not nombre.lower().endswith('.zip') or not os.path.isfile(ruta):
+                continue
+            firma = _firma(ruta)
+            if firma is None:
+                continue
+            clave = self.registro.clave(ruta, firma)
+            if clave in self.registro or self._fallos.get(clave, 0) >= INTENTOS_POR_ZIP:
+                continue
+            vistos[ruta] = firma
+            if self._vistos.get(ruta) == firma and zipfile.is_zipfile(ruta):
+                listos.append((ruta, firma))
+        self._vistos = vistos
+        return listos
+
+    def _actualizar_indice(self):
+        if self.indice_vivo is None:
+            return True
+        try:
+            releidos = self.indice_vivo.actualizar()
+        except Exception as e:
+            self._avisar(tipo='error_registro', error=str(e))
+            return self.indice_vivo.indice is not None
+        if releidos:
+            self._avisar(tipo='registro_actualizado', excel=releidos, claves=len(self.indice_vivo.indice))
+        return True
+
+    def _procesar(self, ruta_zip, firma):
+        medicion = Medicion()
+        indice = self.indice_vivo.indice if self.indice_vivo is not None else None
+        clave = self.registro.clave(ruta_zip, firma)
+        nombre = os.path.splitext(os.path.basename(ruta_zip))[0]
+        try:
+            output_folder = carpeta_salida(self.output_root, self.fecha)
+            resultado = resumen_compacto(procesar_zip(ruta_zip, indice, output_folder, medicion=medicion,
+                                                      **self.opciones))
+        except Exception as e:
+            # No se registra como procesado: el error queda en el informe del ZIP y se reintenta
+            # en las revisiones siguientes, hasta INTENTOS_POR_ZIP veces
+            self._fallos[clave] = self._fallos.get(clave, 0) + 1
+            informe = medicion.guardar_informe(self.output_root, nombre=f"bandeja_{nombre}",
+                                               zip=ruta_zip, error=str(e))
+            self._avisar(tipo='error_zip', zip=ruta_zip, error=str(e), informe=informe,
+                         intento=self._fallos[clave], reintentos=INTENTOS_POR_ZIP - self._fallos[clave])
+            return
+        self._fallos.pop(clave, None)
+        informe = medicion.guardar_informe(self.output_root, nombre=f"bandeja_{nombre}", resultado=resultado)
+        self.registro.registrar(clave, zip=ruta_zip, informe=informe)
+        self._avisar(tipo='zip_procesado', informe=informe, **resultado)
+
+    # Una revisión de la bandeja: actualiza el índice y procesa los ZIP listos
+    def revisar(self):
+        if not self._actualizar_indice():
+            return
+        for ruta_zip, firma in self._zips_listos():
+            self._procesar(ruta_zip, firma)
+
+    def ejecutar(self, detener=None):
+        detener = detener or threading.Event()
+        self._avisar(tipo='inicio', bandeja=self.bandeja, salida=self.output_root)
+        while not detener.is_set():
+            self.revisar()
+            detener.wait(self.intervalo)
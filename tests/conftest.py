@@ -0,0 +1,50 @@
+import hashlib
+import os
+import sys
+
+import pytest
+
+# Las pruebas importan el paquete desde la raíz del repositorio, sin instalarlo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.datos_sinteticos import generar_conjunto  # noqa: E402
+
+
+# Registro de chats y ZIP de entrega sintéticos, compartidos por todas las pruebas: 240 filas y
+# 40 ZIP internos, de los que 32 tienen fila en el registro
+@pytest.fixture(scope='session')
+def conjunto(tmp_path_factory):
+    carpeta = tmp_path_factory.mktemp('conjunto')
+    ruta_registro, ruta_zip = generar_conjunto(str(carpeta), filas=240, zips_internos=40, tam_html=2048)
+    return ruta_registro, ruta_zip
+
+
+@pytest.fixture(scope='session')
+def indice(conjunto):
+    from procesador.pipeline import cargar_indice
+
+    indice, _ = cargar_indice([conjunto[0]], guardar_sidecar=False)
+    return indice
+
+
+# procesar(carpeta, **opciones) corre procesar_zip del ZIP sintético sobre carpeta y devuelve
+# (resultado, {nombre del HTML: sha256}) con lo que quedó escrito
+@pytest.fixture
+def procesar(conjunto, indice):
+    from procesador.pipeline import procesar_zip
+
+    def _procesar(carpeta, **opciones):
+        os.makedirs(carpeta, exist_ok=True)
+        resultado = procesar_zip(conjunto[1], indice, str(carpeta), **opciones)
+        return resultado, hashes_html(carpeta)
+    return _procesar
+
+
+# Hash de cada HTML escrito en una carpeta de salida
+def hashes_html(carpeta):
+    hashes = {}
+    for nombre in sorted(os.listdir(carpeta)):
+        if nombre.endswith('.html'):
+            with open(os.path.join(carpeta, nombre), 'rb') as f:
+                hashes[nombre] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+from procesador import almacen as modulo_almacen
+from procesador.almacen import CARPETA_ALMACEN
+from procesador.manifiesto import NOMBRE_MANIFIESTO
+from procesador.medicion import Medicion
+
+from conftest import hashes_html
+
+POOLS = {
+    'secuencial': {},
+    'hilos': {'trabajadores': 3},
+    'procesos': {'trabajadores': 3, 'usar_procesos': True},
+}
+
+
+# Procesa el ZIP sintético con el almacén en dos carpetas de fecha de la misma raíz y devuelve
+# por fecha (carpeta, miembros del manifiesto, bytes_salida de la extracción)
+def _dos_entregas(conjunto, raiz, **opciones):
+    from procesador.pipeline import procesar_lote
+
+    entregas = []
+    for fecha in ('2024-10-10', '2024-10-11'):
+        medicion = Medicion()
+        resultado = procesar_lote([], [conjunto[1]], str(raiz), fecha, medicion=medicion, deduplicar=True,
+                                  **opciones)
+        carpeta = resultado['carpeta_salida']
+        with open(os.path.join(carpeta, NOMBRE_MANIFIESTO), encoding='utf-8') as f:
+            miembros = [miembro for linea in f for miembro in json.loads(linea)['miembros']]
+        entregas.append((carpeta, miembros, medicion.etapas['extraccion']['bytes_salida']))
+    return entregas
+
+
+def _almacenados(raiz):
+    return sorted(nombre for _, _, nombres in os.walk(raiz / CARPETA_ALMACEN)
+                  for nombre in nombres if nombre.endswith('.html'))
+
+
+# La misma entrega en dos fechas se guarda una sola vez: la segunda carpeta enlaza al almacén,
+# el manifiesto marca sus HTML como duplicados y no cuentan en bytes_salida
+@pytest.mark.parametrize('pool', list(POOLS))
+def test_deduplica_entre_fechas(conjunto, tmp_path, pool):
+    (primera, miembros_1, bytes_1), (segunda, miembros_2, bytes_2) = _dos_entregas(conjunto, tmp_path, **POOLS[pool])
+
+    hashes = hashes_html(primera)
+    assert len(hashes) == 40
+    assert hashes_html(segunda) == hashes
+    assert _almacenados(tmp_path) == sorted(f"{sha256}.html" for sha256 in hashes.values())
+
+    assert {miembro['html']: miembro['sha256'] for miembro in miembros_1} == hashes
+    assert {miembro['html']: miembro['sha256'] for miembro in miembros_2} == hashes
+    assert not any(miembro['duplicado'] for miembro in miembros_1)
+    assert all(miembro['duplicado'] for miembro in miembros_2)
+
+    assert bytes_1 == sum(miembro['tamano'] for miembro in miembros_1)
+    assert bytes_2 == 0
+
+    almacen = modulo_almacen.AlmacenContenido.en_salida(str(tmp_path))
+    for carpeta in (primera, segunda):
+        for nombre, sha256 in hashes.items():
+            assert os.path.samefile(os.path.join(carpeta, nombre), almacen.ruta(sha256))
+
+
+# Donde no se pueden crear enlaces duros cada carpeta de fecha recibe una copia, y el almacén
+# igual evita volver a guardar el contenido repetido
+def test_sin_enlaces_duros_copia(conjunto, tmp_path, monkeypatch):
+    def sin_enlace(origen, destino):
+        raise OSError('el volumen no admite enlaces duros')
+
+    monkeypatch.setattr(modulo_almacen.os, 'link', sin_enlace)
+    (primera, _, _), (segunda, miembros_2, bytes_2) = _dos_entregas(conjunto, tmp_path, trabajadores=3)
+
+    hashes = hashes_html(primera)
+    assert hashes_html(segunda) == hashes
+    assert len(_almacenados(tmp_path)) == 40
+    assert all(miembro['duplicado'] for miembro in miembros_2)
+    assert bytes_2 == 0
+
+    almacen = modulo_almacen.AlmacenContenido.en_salida(str(tmp_path))
+    for carpeta in (primera, segunda):
+        for nombre, sha256 in hashes.items():
+            ruta = os.path.join(carpeta, nombre)
+            assert not os.path.samefile(ruta, almacen.ruta(sha256))
+            assert os.stat(ruta).st_nlink == 1
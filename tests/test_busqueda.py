@@ -0,0 +1,139 @@
+import os
+import sqlite3
+
+import pytest
+
+from procesador import busqueda as modulo_busqueda
+from procesador.analisis_html import texto_html
+from procesador.busqueda import IndiceBusqueda
+from procesador.contenedor import NOMBRE_CONTENEDOR, leer_transcripcion, listar_transcripciones
+
+GUID = '0f8fad5b-d9cb-469f-a165-70867728950e'
+
+
+def _match_name(fecha, hora='070537', guid=GUID):
+    return f'chat_{fecha}_{hora}_{guid}.html'
+
+
+def _indice(tmp_path, textos, **opciones):
+    indice = IndiceBusqueda(str(tmp_path / 'indice.sqlite'), **opciones)
+    with indice.escritor() as escritor:
+        for match_name, texto in textos.items():
+            escritor.agregar(match_name, texto=texto, ruta=match_name)
+    return indice
+
+
+def _nombres(resultados):
+    return [resultado['match_name'] for resultado in resultados]
+
+
+# Una transcripción que vuelve a indexarse sin fila del Excel conserva los datos de la anterior;
+# ruta y ZIP pasan a ser los últimos y el texto solo cambia si se indica
+def test_alta_repetida_conserva_el_excel(tmp_path):
+    indice = IndiceBusqueda(str(tmp_path / 'indice.sqlite'))
+    match_name = _match_name('2024-10-10')
+    fila = {'AGENT NAME': 'agente001@example.com', 'CUSTOMER ID': 123456.0, 'ACCOUNT NAME': 'Cuenta 0001'}
+    with indice.escritor() as escritor:
+        escritor.agregar(match_name, fila, 'consulta por la factura', ruta='uno.html', ruta_zip='uno.zip')
+        escritor.agregar(match_name, None, None, ruta='dos.html', ruta_zip='dos.zip')
+
+    [resultado] = indice.buscar('factura')
+    assert (resultado['agente'], resultado['cliente'], resultado['cuenta']) == (
+        'agente001@example.com', '123456', 'Cuenta 0001')
+    assert (resultado['ruta'], resultado['zip']) == ('dos.html', 'dos.zip')
+    assert (resultado['fecha'], resultado['hora'], resultado['guid']) == ('2024-10-10', '07:05:37', GUID)
+    assert _nombres(indice.buscar(cliente=123456)) == [match_name]
+
+    with indice.escritor() as escritor:
+        escritor.agregar(match_name, {'AGENT NAME': 'agente002@example.com'}, 'cambio de dirección')
+    assert indice.buscar('factura') == []
+    [resultado] = indice.buscar('direccion')
+    assert (resultado['agente'], resultado['cliente']) == ('agente002@example.com', '123456')
+    assert indice.total() == 1
+
+
+# El texto se busca como frase, sin distinguir mayúsculas ni tildes, y trae el fragmento marcado
+def test_busqueda_por_frase(tmp_path):
+    con_frase = _match_name('2024-10-10', guid='a')
+    palabras_sueltas = _match_name('2024-10-10', guid='b')
+    indice = _indice(tmp_path, {
+        con_frase: 'quiero pagar la factura del agua hoy',
+        palabras_sueltas: 'el agua llegó pero la factura del mes no',
+    })
+
+    [resultado] = indice.buscar('Factura del AGUA')
+    assert resultado['match_name'] == con_frase
+    assert '[factura del agua]' in resultado['fragmento']
+    assert sorted(_nombres(indice.buscar('factura'))) == [con_frase, palabras_sueltas]
+    assert _nombres(indice.buscar('llego')) == [palabras_sueltas]
+    # Comillas y operadores no se interpretan como sintaxis de FTS5
+    assert len(indice.buscar('"factura')) == 2
+    assert indice.buscar('factura NOT agua') == []
+
+
+# Sin FTS5 el texto queda en una tabla común y se busca recorriéndolo
+def test_sin_fts5(tmp_path):
+    ruta = tmp_path / 'indice.sqlite'
+    conexion = sqlite3.connect(ruta)
+    conexion.execute('CREATE TABLE textos (id INTEGER PRIMARY KEY, texto TEXT)')
+    conexion.close()
+    match_name = _match_name('2024-10-10')
+    indice = _indice(tmp_path, {match_name: 'Consulta por la Factura del agua'})
+
+    assert indice.conectar()[1] is False
+    [resultado] = indice.buscar('factura DEL agua')
+    assert resultado['match_name'] == match_name
+    assert resultado['fragmento'] is None
+    assert indice.buscar('botellón') == []
+
+
+# desde y hasta filtran por la fecha del chat, inclusive, y los resultados van del más nuevo al más viejo
+def test_filtro_por_fechas(tmp_path):
+    fechas = ['2024-10-09', '2024-10-10', '2024-10-11', '2024-10-12']
+    indice = _indice(tmp_path, {_match_name(fecha): 'pedido' for fecha in fechas})
+
+    assert _nombres(indice.buscar(desde='2024-10-10', hasta='2024-10-11')) == [
+        _match_name('2024-10-11'), _match_name('2024-10-10')]
+    assert _nombres(indice.buscar('pedido', desde='2024-10-12')) == [_match_name('2024-10-12')]
+    assert _nombres(indice.buscar(hasta='2024-10-09')) == [_match_name('2024-10-09')]
+    assert len(indice.buscar(limite=2)) == 2
+
+
+# En un recurso de red el índice usa el journal por defecto de SQLite en lugar de WAL
+def test_wal_solo_en_disco_local(tmp_path, monkeypatch):
+    def modo(indice):
+        conexion, _ = indice.conectar()
+        try:
+            return conexion.execute('PRAGMA journal_mode').fetchone()[0]
+        finally:
+            conexion.close()
+
+    ruta = str(tmp_path / 'indice.sqlite')
+    assert modo(IndiceBusqueda(ruta, wal=True)) == 'wal'
+    monkeypatch.setattr(modulo_busqueda, 'en_disco_local', lambda carpeta: False)
+    assert IndiceBusqueda(ruta).wal is False
+    assert modo(IndiceBusqueda(ruta)) == 'delete'
+
+
+# Lo extraído sin índice se indexa al reanudar con índice, leyendo el texto de los HTML ya escritos
+@pytest.mark.parametrize('contenedor', [False, True], ids=['sueltos', 'contenedor'])
+def test_reanudar_indexa_lo_ya_extraido(procesar, indice, tmp_path, contenedor):
+    salida = tmp_path / 'salida'
+    procesar(salida, contenedor=contenedor)
+    busqueda = IndiceBusqueda(str(tmp_path / 'indice.sqlite'))
+    procesar(salida, contenedor=contenedor, busqueda=busqueda)
+
+    assert busqueda.total() == 40
+    if contenedor:
+        nombre = listar_transcripciones(salida / NOMBRE_CONTENEDOR)[0]
+        datos = leer_transcripcion(salida / NOMBRE_CONTENEDOR, nombre)
+    else:
+        nombre = sorted(n for n in os.listdir(salida) if n.endswith('.html'))[0]
+        with open(salida / nombre, 'rb') as f:
+            datos = f.read()
+    # Cada línea termina con un código al azar que identifica a la transcripción
+    codigo = texto_html(datos).split()[-1]
+    [resultado] = busqueda.buscar(codigo)
+    assert resultado['match_name'] == nombre
+    if nombre in indice:
+        assert resultado['agente'] == indice[nombre]['AGENT NAME']
@@ -0,0 +1,45 @@
+import os
+import pickle
+import shutil
+
+from procesador import cache_registros
+from procesador.cache_registros import CacheRegistro
+from procesador.lectura_excel import VERSION_LECTOR, cargar_registro_chat
+
+
+class _Malicioso:
+    def __init__(self, marca):
+        self.marca = marca
+
+    def __reduce__(self):
+        return open, (self.marca, 'w')
+
+
+def _copiar_registro(conjunto, tmp_path):
+    ruta = str(tmp_path / 'registro.xlsx')
+    shutil.copy(conjunto[0], ruta)
+    return ruta
+
+
+# Un pickle dejado en la carpeta de la caché nunca se lee: ejecutaría código al cargarlo
+def test_no_lee_pickles_de_la_cache(conjunto, tmp_path):
+    ruta = _copiar_registro(conjunto, tmp_path)
+    cache = CacheRegistro(ruta, VERSION_LECTOR)
+    os.makedirs(cache.carpeta)
+    marca = tmp_path / 'ejecutado'
+    with open(os.path.join(cache.carpeta, f"{cache.base}.pkl"), 'wb') as f:
+        pickle.dump(_Malicioso(str(marca)), f)
+
+    df = cargar_registro_chat(ruta)
+
+    assert not marca.exists()
+    assert df['MATCH NAME'].tolist() == cargar_registro_chat(ruta, usar_cache=False)['MATCH NAME'].tolist()
+
+
+def test_sin_pyarrow_no_hay_cache(conjunto, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_registros, 'CACHE_DISPONIBLE', False)
+    ruta = _copiar_registro(conjunto, tmp_path)
+
+    cargar_registro_chat(ruta)
+
+    assert not os.path.exists(os.path.join(tmp_path, cache_registros.CARPETA_CACHE))
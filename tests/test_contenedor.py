@@ -0,0 +1,80 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+from procesador.contenedor import (CARPETA_METADATOS, NOMBRE_CONTENEDOR, ContenedorZip, leer_transcripcion,
+                                   listar_transcripciones)
+from procesador.manifiesto import NOMBRE_MANIFIESTO
+
+
+def _nombres(carpeta):
+    with zipfile.ZipFile(carpeta / NOMBRE_CONTENEDOR) as contenedor:
+        return contenedor.namelist()
+
+
+# Volver a extraer sobre el mismo contenedor (sin reanudar, o sin el manifiesto que lo evita)
+# no agrega miembros duplicados ni hace crecer el archivo
+@pytest.mark.parametrize('repeticion', ['sin_reanudar', 'sin_manifiesto'])
+def test_reextraer_no_duplica(procesar, tmp_path, repeticion):
+    primero, _ = procesar(tmp_path, contenedor=True, metadatos=True, trabajadores=3)
+    nombres = _nombres(tmp_path)
+    tamano = os.path.getsize(tmp_path / NOMBRE_CONTENEDOR)
+    assert len(listar_transcripciones(tmp_path / NOMBRE_CONTENEDOR)) == 40
+
+    opciones = {'reanudar': False}
+    if repeticion == 'sin_manifiesto':
+        os.remove(tmp_path / NOMBRE_MANIFIESTO)
+        opciones = {}
+    segundo, _ = procesar(tmp_path, contenedor=True, metadatos=True, trabajadores=3, **opciones)
+
+    assert segundo['coincidencias'] == primero['coincidencias']
+    assert _nombres(tmp_path) == nombres
+    assert len(set(nombres)) == len(nombres)
+    assert os.path.getsize(tmp_path / NOMBRE_CONTENEDOR) == tamano
+
+
+# ZIP de entrega con un ZIP interno por transcripción: {nombre sin extensión: HTML}
+def _entrega(ruta, htmls):
+    with zipfile.ZipFile(ruta, 'w') as entrega:
+        for nombre, html in htmls.items():
+            interno = io.BytesIO()
+            with zipfile.ZipFile(interno, 'w') as zip_interno:
+                zip_interno.writestr('transcripcion.html', html)
+            entrega.writestr(f"{nombre}.zip", interno.getvalue())
+    return str(ruta)
+
+
+# Un HTML que vuelve a extraerse con otro contenido reemplaza al anterior en el contenedor, como
+# en la carpeta suelta, y el contenedor queda sin la versión vieja
+@pytest.mark.parametrize('opciones', [{}, {'reanudar': False}], ids=['reanudar', 'sin_reanudar'])
+def test_contenido_nuevo_reemplaza(tmp_path, opciones):
+    from procesador.pipeline import procesar_zip
+
+    salida = tmp_path / 'salida'
+    salida.mkdir()
+    originales = {'chat_a': b'<p>[10:00:00] Cliente: hola</p>', 'chat_b': b'<p>[11:00:00] Cliente: pedido</p>'}
+    procesar_zip(_entrega(tmp_path / 'uno.zip', originales), None, str(salida), contenedor=True)
+
+    cambiados = dict(originales, chat_a=b'<p>[10:00:00] Cliente: hola, corrijo la factura</p>')
+    procesar_zip(_entrega(tmp_path / 'uno.zip', cambiados), None, str(salida), contenedor=True, **opciones)
+
+    ruta = salida / NOMBRE_CONTENEDOR
+    for nombre, html in cambiados.items():
+        assert leer_transcripcion(ruta, f"{nombre}.html") == html
+    assert sorted(_nombres(salida)) == ['chat_a.html', 'chat_b.html']
+
+
+# Los metadatos de una coincidencia se reemplazan si cambió su fila del Excel
+def test_metadatos_se_actualizan(tmp_path):
+    with ContenedorZip(str(tmp_path)) as contenedor:
+        contenedor.escribir_metadatos('chat_a.html', {'AGENT NAME': 'agente001'})
+    with ContenedorZip(str(tmp_path)) as contenedor:
+        contenedor.escribir_metadatos('chat_a.html', {'AGENT NAME': 'agente001'})
+        contenedor.escribir_metadatos('chat_a.html', {'AGENT NAME': 'agente002'})
+
+    nombre = f"{CARPETA_METADATOS}/chat_a.json"
+    assert _nombres(tmp_path) == [nombre]
+    assert json.loads(leer_transcripcion(tmp_path / NOMBRE_CONTENEDOR, nombre)) == {'AGENT NAME': 'agente002'}
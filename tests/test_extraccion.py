@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+CLAVES_RESULTADO = ('htmls', 'coincidencias', 'sin_excel', 'sin_zip')
+
+
+# Con hilos o procesos, las listas del resultado y cada HTML escrito son los del modo secuencial
+@pytest.mark.parametrize('solo_coincidencias', [False, True], ids=['todo', 'solo_coincidencias'])
+def test_pool_igual_que_secuencial(procesar, tmp_path, solo_coincidencias):
+    esperado, hashes_esperados = procesar(tmp_path / 'secuencial', solo_coincidencias=solo_coincidencias)
+    assert len(esperado['coincidencias']) == 32
+    assert len(hashes_esperados) == (32 if solo_coincidencias else 40)
+
+    for nombre, opciones in (('hilos', {'trabajadores': 3}), ('procesos', {'trabajadores': 3, 'usar_procesos': True})):
+        resultado, hashes = procesar(tmp_path / nombre, solo_coincidencias=solo_coincidencias, **opciones)
+        for clave in CLAVES_RESULTADO:
+            assert resultado[clave] == esperado[clave], (nombre, clave)
+        assert hashes == hashes_esperados, nombre
+
+
+# Sin registro de chats procesar_zip solo extrae los HTML, aunque se pidan coincidencias o Excel
+def test_sin_registro_solo_extrae(conjunto, tmp_path):
+    from procesador.pipeline import procesar_zip
+
+    resultado = procesar_zip(conjunto[1], None, str(tmp_path), solo_coincidencias=True, modo_excel='libro')
+
+    assert resultado['htmls'] == 40
+    assert resultado['libro'] is None
+    assert all(not resultado[clave] for clave in ('coincidencias', 'sin_excel', 'sin_zip'))
+    assert sum(nombre.endswith('.html') for nombre in os.listdir(tmp_path)) == 40
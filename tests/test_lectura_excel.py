@@ -0,0 +1,144 @@
+import os
+import shutil
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from procesador import lectura_excel
+from procesador.lectura_excel import cargar_registro_chat, guardar_match_names, ruta_match_name
+
+
+def _claves_sidecar(ruta):
+    libro = load_workbook(ruta, read_only=True)
+    try:
+        filas = list(libro.worksheets[0].iter_rows(values_only=True))
+    finally:
+        libro.close()
+    columna = filas[0].index('MATCH NAME')
+    return [fila[columna] for fila in filas[1:]]
+
+
+# Un archivo MATCH NAME escrito por otra versión del lector se reescribe aunque sea más nuevo
+def test_sidecar_de_otra_version_se_reescribe(conjunto, tmp_path, monkeypatch):
+    ruta_registro = str(tmp_path / 'registro.xlsx')
+    shutil.copy(conjunto[0], ruta_registro)
+    df = cargar_registro_chat(ruta_registro, usar_cache=False)
+
+    # Archivo de una versión anterior, con claves viejas y posterior al Excel
+    viejo = Workbook(write_only=True)
+    hoja = viejo.create_sheet('MATCH NAME')
+    hoja.append(['MATCH NAME'])
+    hoja.append(['chat_2024-10-10 00:00:00_viejo.html'])
+    viejo.save(ruta_match_name(ruta_registro))
+    os.utime(ruta_registro, (0, 0))
+
+    ruta = guardar_match_names(df, ruta_registro)
+    assert _claves_sidecar(ruta) == df['MATCH NAME'].tolist()
+
+    # Con la versión vigente no se vuelve a escribir
+    fecha = os.path.getmtime(ruta)
+    os.utime(ruta, (fecha + 10, fecha + 10))
+    guardar_match_names(df, ruta_registro)
+    assert os.path.getmtime(ruta) == fecha + 10
+
+    # Un cambio de versión del lector lo invalida
+    monkeypatch.setattr(lectura_excel, 'IDENTIFICADOR_MATCH_NAME', 'MATCH NAME v999')
+    guardar_match_names(df.iloc[:5], ruta_registro)
+    assert len(_claves_sidecar(ruta)) == 5
+
+
+# Las filas en blanco o solo con notas no corren la numeración de las filas sin MATCH NAME
+def test_filas_sin_clave_con_el_numero_de_la_hoja(tmp_path):
+    from procesador.lectura_excel import mensaje_registro
+    from procesador.normalizacion import filas_sin_clave
+
+    ruta = str(tmp_path / 'registro.xlsx')
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(['DATE', 'TIME', 'SESSION GUID', 'NOTAS'])
+    hoja.append(['2024-10-10', '07:05:37', 'guid-1'])
+    hoja.append([])
+    hoja.append([None, None, None, 'cambio de turno'])
+    hoja.append(['no es fecha', '07:05:37', 'guid-2'])
+    hoja.append(['2024-10-10', '08:00:00', 'guid-3'])
+    libro.save(ruta)
+
+    df = cargar_registro_chat(ruta, usar_cache=False)
+
+    assert len(df) == 3
+    assert filas_sin_clave(df) == [5]
+    assert '(filas 5)' in mensaje_registro(df, ruta)
+
+
+# Un registro sin las columnas necesarias entre varios leídos en procesos: el error cruza el
+# pool intacto y dice qué archivo es
+def test_columnas_faltantes_en_el_pool(conjunto, tmp_path):
+    from procesador.lectura_excel import ColumnasFaltantes
+    from procesador.pipeline import cargar_indice
+
+    ruta_mala = str(tmp_path / 'bitacora.xlsx')
+    libro = Workbook()
+    libro.active.append(['DATE', 'AGENT NAME'])
+    libro.save(ruta_mala)
+    buena = str(tmp_path / 'registro.xlsx')
+    shutil.copy(conjunto[0], buena)
+
+    with pytest.raises(ColumnasFaltantes) as error:
+        cargar_indice([buena, ruta_mala], guardar_sidecar=False, procesos=2)
+
+    assert error.value.faltantes == ['TIME', 'SESSION GUID']
+    assert error.value.ruta == ruta_mala
+    assert str(error.value) == "bitacora.xlsx: El archivo no contiene las columnas necesarias: TIME, SESSION GUID"
+
+
+# Un MATCH NAME repetido, dentro de un registro o entre registros, conserva la primera fila
+# y el resumen cuenta en cada registro las filas descartadas
+def test_duplicados_gana_la_primera_fila(tmp_path):
+    from procesador.indice import COLUMNA_ORIGEN
+    from procesador.pipeline import cargar_indice
+
+    registros = {
+        'registro.xlsx': [('guid-1', 'agente001'), ('guid-1', 'agente002'), ('guid-2', 'agente003')],
+        'bitacora.xlsx': [('guid-2', 'agente004'), ('guid-3', 'agente005'), ('guid-3', 'agente006')],
+    }
+    rutas = []
+    for nombre, filas in registros.items():
+        rutas.append(str(tmp_path / nombre))
+        libro = Workbook()
+        libro.active.append(['DATE', 'TIME', 'SESSION GUID', 'AGENT NAME'])
+        for guid, agente in filas:
+            libro.active.append(['2024-10-10', '07:05:37', guid, agente])
+        libro.save(rutas[-1])
+
+    indice, resumen = cargar_indice(rutas, guardar_sidecar=False)
+
+    assert [(r['filas'], r['claves_nuevas'], r['duplicados']) for r in resumen] == [(3, 2, 1), (3, 1, 2)]
+    assert [(fila['AGENT NAME'], fila[COLUMNA_ORIGEN]) for fila in indice.filas.values()] == [
+        ('agente001', 'registro.xlsx'), ('agente003', 'registro.xlsx'), ('agente005', 'bitacora.xlsx')]
+    assert sorted(indice.duplicados.values()) == [1, 1, 1]
+
+
+# Si la columna MATCH NAME no se puede guardar junto al Excel, el registro se usa igual desde
+# memoria y el problema queda en el mensaje y en la medición
+def test_sin_permiso_para_guardar_match_names(conjunto, tmp_path, monkeypatch):
+    from procesador.lectura_excel import mensaje_registro
+    from procesador.medicion import Medicion
+    from procesador.pipeline import cargar_indice
+
+    def sin_permiso(df, ruta_salida):
+        raise PermissionError(13, 'Permiso denegado', ruta_salida)
+
+    monkeypatch.setattr(lectura_excel, 'escribir_match_names', sin_permiso)
+    ruta_registro = str(tmp_path / 'registro.xlsx')
+    shutil.copy(conjunto[0], ruta_registro)
+    df = cargar_registro_chat(ruta_registro, usar_cache=False)
+
+    assert guardar_match_names(df, ruta_registro) is None
+    assert 'no se pudo guardar' in mensaje_registro(df, None)
+
+    medicion = Medicion()
+    indice, resumen = cargar_indice([ruta_registro], medicion=medicion)
+    assert resumen[0]['filas'] == 240
+    assert len(indice) > 0
+    assert medicion.etapas['columna_match_name']['sin_guardar'] == 1
+    assert not os.path.exists(ruta_match_name(ruta_registro))
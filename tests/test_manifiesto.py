@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from procesador.medicion import Medicion
+
+CLAVES_RESULTADO = ('htmls', 'coincidencias', 'sin_excel', 'sin_zip')
+
+MODOS = [
+    pytest.param({'trabajadores': 1}, id='secuencial'),
+    pytest.param({'trabajadores': 3}, id='hilos'),
+    pytest.param({'trabajadores': 3, 'usar_procesos': True}, id='procesos'),
+]
+
+
+def _fechas(carpeta, nombres):
+    return {nombre: os.path.getmtime(carpeta / nombre) for nombre in nombres}
+
+
+# La segunda ejecución sobre la misma carpeta no escribe nada y devuelve el mismo resultado
+@pytest.mark.parametrize('opciones', MODOS)
+def test_reanudar_no_vuelve_a_extraer(procesar, tmp_path, opciones):
+    primero, hashes = procesar(tmp_path, **opciones)
+    fechas = _fechas(tmp_path, hashes)
+
+    medicion = Medicion()
+    segundo, hashes_segundo = procesar(tmp_path, medicion=medicion, **opciones)
+
+    for clave in CLAVES_RESULTADO:
+        assert segundo[clave] == primero[clave], clave
+    assert hashes_segundo == hashes
+    assert _fechas(tmp_path, hashes) == fechas
+    assert medicion.etapas['extraccion']['bytes_salida'] == 0
+
+
+# Un HTML borrado de la salida se vuelve a extraer; el resto no se toca
+def test_reanudar_extrae_lo_que_falta(procesar, tmp_path):
+    primero, hashes = procesar(tmp_path)
+    borrado = sorted(hashes)[0]
+    os.remove(tmp_path / borrado)
+    otros = _fechas(tmp_path, [nombre for nombre in hashes if nombre != borrado])
+
+    segundo, hashes_segundo = procesar(tmp_path)
+
+    assert segundo['coincidencias'] == primero['coincidencias']
+    assert hashes_segundo == hashes
+    assert _fechas(tmp_path, otros) == otros
+
+
+def test_sin_reanudar_vuelve_a_extraer(procesar, tmp_path):
+    _, hashes = procesar(tmp_path)
+    medicion = Medicion()
+    _, hashes_segundo = procesar(tmp_path, reanudar=False, medicion=medicion)
+
+    assert hashes_segundo == hashes
+    assert medicion.etapas['extraccion']['bytes_salida'] > 0
+
+
+def _leer_metricas(ruta):
+    import pandas as pd
+
+    return pd.read_parquet(ruta) if ruta.endswith('.parquet') else pd.read_csv(ruta)
+
+
+# Reanudar con análisis sobre lo que extrajo una ejecución sin análisis calcula las métricas
+# desde los HTML escritos, igual que una extracción con análisis desde cero
+@pytest.mark.parametrize('contenedor', [False, True], ids=['sueltos', 'contenedor'])
+def test_reanudar_con_analisis(procesar, tmp_path, contenedor):
+    from procesador.analisis_html import COLUMNAS_METRICAS
+
+    esperado, _ = procesar(tmp_path / 'desde_cero', analizar=True, contenedor=contenedor)
+    procesar(tmp_path / 'reanudado', contenedor=contenedor)
+    medicion = Medicion()
+    reanudado, _ = procesar(tmp_path / 'reanudado', analizar=True, contenedor=contenedor, medicion=medicion)
+
+    assert medicion.etapas['extraccion']['bytes_salida'] == 0
+    metricas = _leer_metricas(reanudado['metricas'])
+    assert len(metricas) == 40
+    assert metricas['mensajes'].notna().all() and (metricas['mensajes'] > 0).all()
+    assert metricas[COLUMNAS_METRICAS].equals(_leer_metricas(esperado['metricas'])[COLUMNAS_METRICAS])
@@ -0,0 +1,76 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from benchmark.datos_sinteticos import ENCABEZADOS
+from procesador.lectura_excel import cargar_registro_chat
+from procesador.normalizacion import construir_claves, filas_sin_clave, normalizar_hora
+
+GUID = '0f8fad5b-d9cb-469f-a165-70867728950e'
+
+
+def _registro(filas):
+    return pd.DataFrame(filas, columns=['DATE', 'TIME', 'SESSION GUID'])
+
+
+@pytest.mark.parametrize('valor, esperado', [
+    (70537, '070537'),
+    (70537.0, '070537'),
+    (235959, '235959'),
+    (0, '000000'),
+    (0.5, '120000'),
+    (45575.25, '060000'),
+    ('07:05:37', '070537'),
+    (datetime.time(7, 5, 37), '070537'),
+])
+def test_normalizar_hora(valor, esperado):
+    assert normalizar_hora(pd.Series([valor], dtype=object)).tolist() == [esperado]
+
+
+# Un entero que no es una hora HHMMSS válida queda sin interpretar, no como medianoche
+@pytest.mark.parametrize('valor', [70575, 76037, 245959])
+def test_hora_entera_no_valida(valor):
+    assert normalizar_hora(pd.Series([valor], dtype=object)).isna().all()
+
+
+@pytest.mark.parametrize('guids', [
+    pytest.param(pd.Series([], dtype=float), id='vacio'),
+    pytest.param(pd.Series([12345, 67890]), id='numericos'),
+    pytest.param(pd.Series([np.nan, np.nan]), id='en_blanco'),
+])
+def test_guid_sin_texto_queda_sin_clave(guids):
+    df = pd.DataFrame({
+        'DATE': ['2024-10-10'] * len(guids),
+        'TIME': ['07:05:37'] * len(guids),
+        'SESSION GUID': guids,
+    })
+    df['MATCH NAME'] = construir_claves(df)
+    assert df['MATCH NAME'].isna().all()
+    assert filas_sin_clave(df) == list(range(2, len(guids) + 2))
+
+
+def test_claves_mezcladas():
+    df = _registro([
+        ['2024-10-10', 70537, GUID],
+        ['2024-10-10', 70575, GUID],
+        ['2024-10-10', '07:05:37', 12345],
+    ])
+    df['MATCH NAME'] = construir_claves(df)
+    assert df['MATCH NAME'].iloc[0] == f'chat_2024-10-10_070537_{GUID}.html'
+    assert filas_sin_clave(df) == [3, 4]
+
+
+# Un día sin chats: el registro solo tiene encabezado
+def test_registro_solo_encabezado(tmp_path):
+    ruta = str(tmp_path / 'vacio.xlsx')
+    libro = Workbook(write_only=True)
+    libro.create_sheet().append(ENCABEZADOS)
+    libro.save(ruta)
+
+    df = cargar_registro_chat(ruta, usar_cache=False)
+
+    assert len(df) == 0
+    assert 'MATCH NAME' in df.columns
@@ -0,0 +1,86 @@
+from openpyxl import load_workbook
+
+from procesador.reporte_excel import ENCABEZADOS, LibroCoincidencias
+
+
+def _fila(agente, cuenta='Cuenta 0001'):
+    return {'AGENT NAME': agente, 'CUSTOMER ID': 123456.0, 'ACCOUNT NAME': cuenta}
+
+
+# {hoja: filas sin encabezado} del libro escrito
+def _hojas(ruta):
+    libro = load_workbook(ruta)
+    return {hoja.title: [list(fila) for fila in hoja.iter_rows(min_row=2, values_only=True)]
+            for hoja in libro.worksheets}
+
+
+# Cada agente o cuenta va a su propia hoja, en el orden en que aparece
+def test_agrupar_por_agente_y_cuenta(tmp_path):
+    filas = [('chat_1.html', _fila('ana', 'Cuenta A')), ('chat_2.html', _fila('beto', 'Cuenta A')),
+             ('chat_3.html', _fila('ana', 'Cuenta B')), ('chat_4.html', _fila(None, 'Cuenta B'))]
+    for agrupar_por, esperado in [
+        ('agente', {'ana': ['chat_1.html', 'chat_3.html'], 'beto': ['chat_2.html'], 'Sin dato': ['chat_4.html']}),
+        ('cuenta', {'Cuenta A': ['chat_1.html', 'chat_2.html'], 'Cuenta B': ['chat_3.html', 'chat_4.html']}),
+        (None, {'Coincidencias': ['chat_1.html', 'chat_2.html', 'chat_3.html', 'chat_4.html']}),
+    ]:
+        ruta = tmp_path / f'{agrupar_por}.xlsx'
+        with LibroCoincidencias(str(ruta), agrupar_por=agrupar_por) as libro:
+            for match_name, fila in filas:
+                libro.agregar(match_name, fila)
+        assert libro.filas_escritas == 4
+
+        hojas = _hojas(ruta)
+        assert {hoja: [fila[0] for fila in filas_hoja] for hoja, filas_hoja in hojas.items()} == esperado
+        assert list(hojas) == list(esperado)
+    assert load_workbook(tmp_path / 'None.xlsx').active[1][1].value == ENCABEZADOS[1]
+
+
+# Los nombres de hoja se limpian de caracteres inválidos, se cortan a 31 caracteres y
+# los que coinciden sin distinguir mayúsculas reciben un sufijo
+def test_nombres_de_hoja(tmp_path):
+    ruta = tmp_path / 'libro.xlsx'
+    agentes = ['ana/beto', 'ANA/BETO', "'[equipo]: ventas?'", 'x' * 40, 'x' * 35, '***']
+    with LibroCoincidencias(str(ruta), agrupar_por='agente') as libro:
+        for numero, agente in enumerate(agentes):
+            libro.agregar(f'chat_{numero}.html', _fila(agente))
+
+    assert list(_hojas(ruta)) == [
+        'ana_beto', 'ANA_BETO (2)', '_equipo__ ventas_', 'x' * 31, 'x' * 27 + ' (2)', '___']
+
+
+# Con hipervinculos, cada fila enlaza a su HTML escapando las comillas del destino y del texto;
+# las filas sin HTML dejan la celda vacía
+def test_hipervinculos(tmp_path):
+    ruta = tmp_path / 'libro.xlsx'
+    with LibroCoincidencias(str(ruta), hipervinculos=True) as libro:
+        libro.agregar('chat_1.html', _fila('ana'), 'chat_1.html')
+        libro.agregar('chat_"2".html', _fila('ana'), 'sub/chat_"2".html')
+        libro.agregar('chat_3.html', _fila('ana'))
+
+    hoja = load_workbook(ruta)['Coincidencias']
+    assert [celda.value for celda in hoja[1]] == ENCABEZADOS + ["Transcripción"]
+    assert [fila[4] for fila in hoja.iter_rows(min_row=2, values_only=True)] == [
+        '=HYPERLINK("chat_1.html","chat_1.html")',
+        '=HYPERLINK("sub/chat_""2"".html","chat_""2"".html")',
+        None,
+    ]
+
+
+# Sin coincidencias el libro igual se guarda, con una hoja que solo tiene los encabezados
+def test_libro_vacio(tmp_path):
+    ruta = tmp_path / 'libro.xlsx'
+    with LibroCoincidencias(str(ruta), agrupar_por='agente') as libro:
+        pass
+
+    [hoja] = load_workbook(ruta).worksheets
+    assert [list(fila) for fila in hoja.iter_rows(values_only=True)] == [ENCABEZADOS]
+    assert libro.filas_escritas == 0
+
+
+# Sin hipervínculos el libro del lote no lleva la columna con el enlace
+def test_libro_sin_hipervinculos(procesar, tmp_path):
+    resultado, _ = procesar(tmp_path, modo_excel='libro', agrupar_por=None, hipervinculos=False)
+
+    hoja = load_workbook(resultado['libro'])['Coincidencias']
+    assert [celda.value for celda in hoja[1]] == ENCABEZADOS
+    assert hoja.max_row == len(resultado['coincidencias']) + 1
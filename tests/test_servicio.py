@@ -0,0 +1,237 @@
+import http.client
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+
+import pytest
+
+from procesador import servicio as modulo_servicio
+from procesador.reporte_excel import NOMBRE_LIBRO
+from procesador.extraccion import trabajadores_por_defecto
+from procesador.medicion import Medicion
+from procesador.servicio import INTERRUMPIDO, ServicioTrabajos, crear_servidor
+
+ESPERA_SEGUNDOS = 30
+
+
+# Servicio real en 127.0.0.1 con un puerto libre. servidor(**opciones) crea el ServicioTrabajos
+# con esas opciones y devuelve el puerto; al terminar la prueba se detiene el servidor y el pool
+@pytest.fixture
+def servidor(tmp_path):
+    abiertos = []
+
+    def _servidor(token=None, **opciones):
+        servicio = ServicioTrabajos(str(tmp_path), **opciones)
+        http_servidor = crear_servidor(servicio, '127.0.0.1', 0, token=token)
+        threading.Thread(target=http_servidor.serve_forever, daemon=True).start()
+        abiertos.append((http_servidor, servicio))
+        return http_servidor.server_address[1]
+
+    yield _servidor
+    for http_servidor, servicio in abiertos:
+        http_servidor.shutdown()
+        http_servidor.server_close()
+        servicio.cerrar()
+
+
+# (estado HTTP, cuerpo); el cuerpo JSON ya decodificado salvo con crudo
+def _pedir(puerto, metodo, ruta, cuerpo=None, cabeceras=None, crudo=False):
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=ESPERA_SEGUNDOS)
+    try:
+        conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras or {})
+        respuesta = conexion.getresponse()
+        datos = respuesta.read()
+    finally:
+        conexion.close()
+    return respuesta.status, datos if crudo else json.loads(datos)
+
+
+def _subir(puerto, id_trabajo, ruta, nombre=None):
+    with open(ruta, 'rb') as f:
+        return _pedir(puerto, 'PUT', f"/trabajos/{id_trabajo}/archivos/{nombre or os.path.basename(ruta)}", f,
+                      {'Content-Length': str(os.path.getsize(ruta))})
+
+
+def _crear(puerto, rutas, opciones=None):
+    estado, trabajo = _pedir(puerto, 'POST', '/trabajos', json.dumps(opciones or {}))
+    assert estado == 201
+    for ruta in rutas:
+        assert _subir(puerto, trabajo['id'], ruta)[0] == 201
+    return trabajo['id']
+
+
+def _esperar(puerto, id_trabajo):
+    limite = time.monotonic() + ESPERA_SEGUNDOS
+    while time.monotonic() < limite:
+        _, trabajo = _pedir(puerto, 'GET', f"/trabajos/{id_trabajo}")
+        if trabajo['estado'] not in ('en_cola', 'procesando'):
+            return trabajo
+        time.sleep(0.05)
+    raise AssertionError(f"El trabajo {id_trabajo} no terminó")
+
+
+# Crear, subir, iniciar y esperar; luego listar y descargar la salida, archivo por archivo y en ZIP
+def test_trabajo_completo(servidor, conjunto):
+    puerto = servidor()
+    id_trabajo = _crear(puerto, conjunto, {'fecha': '2024-10-10', 'modo_excel': 'libro'})
+
+    estado, trabajo = _pedir(puerto, 'POST', f"/trabajos/{id_trabajo}/iniciar")
+    assert estado == 202 and trabajo['estado'] in ('en_cola', 'procesando', 'terminado')
+    trabajo = _esperar(puerto, id_trabajo)
+    assert trabajo['estado'] == 'terminado', trabajo['error']
+    resumen = trabajo['resultado']['zips'][0]
+    assert (resumen['htmls'], resumen['coincidencias']) == (40, 32)
+
+    estado, archivos = _pedir(puerto, 'GET', f"/trabajos/{id_trabajo}/salida")
+    assert estado == 200
+    assert f"2024-10-10/{NOMBRE_LIBRO}" in archivos
+    assert sum(archivo.endswith('.html') for archivo in archivos) == 40
+
+    estado, libro = _pedir(puerto, 'GET', f"/trabajos/{id_trabajo}/salida/2024-10-10/{NOMBRE_LIBRO}", crudo=True)
+    assert estado == 200 and libro[:2] == b'PK'
+
+    estado, descarga = _pedir(puerto, 'GET', f"/trabajos/{id_trabajo}/descarga", crudo=True)
+    assert estado == 200
+    with zipfile.ZipFile(io.BytesIO(descarga)) as contenido:
+        assert sorted(contenido.namelist()) == archivos
+        assert contenido.read(f"2024-10-10/{NOMBRE_LIBRO}") == libro
+
+    # Un trabajo iniciado ya no recibe archivos ni se vuelve a iniciar
+    assert _pedir(puerto, 'PUT', f"/trabajos/{id_trabajo}/archivos/otro.zip", b'PK')[0] == 409
+    assert _pedir(puerto, 'POST', f"/trabajos/{id_trabajo}/iniciar")[0] == 409
+
+
+# La salida solo sirve archivos dentro de la carpeta de salida del trabajo
+@pytest.mark.parametrize('ruta', [
+    '../trabajo.json',
+    '..%2F..%2F' + modulo_servicio.NOMBRE_ESTADO,
+    '../entrada/registro.xlsx',
+    '%2Fetc%2Fpasswd',
+])
+def test_salida_no_sale_de_la_carpeta(servidor, conjunto, ruta):
+    puerto = servidor()
+    id_trabajo = _crear(puerto, [conjunto[1]])
+    _pedir(puerto, 'POST', f"/trabajos/{id_trabajo}/iniciar")
+    assert _esperar(puerto, id_trabajo)['estado'] == 'terminado'
+
+    assert _pedir(puerto, 'GET', f"/trabajos/{id_trabajo}/salida/{ruta}")[0] == 404
+
+
+def test_peticiones_no_validas(servidor, conjunto):
+    puerto = servidor()
+    assert _pedir(puerto, 'POST', '/trabajos', json.dumps({'desconocida': 1}))[0] == 400
+    assert _pedir(puerto, 'POST', '/trabajos', json.dumps({'trabajadores': '3'}))[0] == 400
+    assert _pedir(puerto, 'POST', '/trabajos', '{no es json')[0] == 400
+    assert _pedir(puerto, 'GET', '/trabajos/no-existe')[0] == 404
+
+    id_trabajo = _crear(puerto, [])
+    # Las subidas rechazadas no leen el cuerpo: se envía uno chico para que entre entero
+    assert _pedir(puerto, 'PUT', f"/trabajos/{id_trabajo}/archivos/entrega.txt", b'PK')[0] == 400
+    assert _pedir(puerto, 'PUT', f"/trabajos/{id_trabajo}/archivos/..%2Fentrega.zip", b'PK')[0] == 400
+    assert _pedir(puerto, 'PUT', f"/trabajos/{id_trabajo}/archivos/vacio.zip", b'')[0] == 400
+
+    # Sin Content-Length (http.client lo agrega solo, así que la petición se arma a mano)
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=ESPERA_SEGUNDOS)
+    conexion.putrequest('PUT', f"/trabajos/{id_trabajo}/archivos/entrega.zip")
+    conexion.endheaders()
+    assert conexion.getresponse().status == 400
+    conexion.close()
+
+    # Sin ZIP no se puede iniciar, y no hay descarga de un trabajo sin terminar
+    assert _pedir(puerto, 'POST', f"/trabajos/{id_trabajo}/iniciar")[0] == 409
+    assert _pedir(puerto, 'GET', f"/trabajos/{id_trabajo}/descarga")[0] == 409
+    assert _pedir(puerto, 'POST', f"/trabajos/{id_trabajo}/cancelar")[0] == 409
+
+
+# Con la cola llena se responde 503; un trabajo se cancela tanto en cola como en proceso
+def test_cola_llena_y_cancelar(servidor, conjunto, monkeypatch):
+    # El primer trabajo espera a la prueba antes de procesar, para tener la cola ocupada
+    liberar = threading.Event()
+    procesar_lote = modulo_servicio.procesar_lote
+
+    def procesar_retenido(*args, **kwargs):
+        liberar.wait(ESPERA_SEGUNDOS)
+        return procesar_lote(*args, **kwargs)
+
+    monkeypatch.setattr(modulo_servicio, 'procesar_lote', procesar_retenido)
+    puerto = servidor(simultaneos=1, max_pendientes=2)
+    en_proceso, en_cola, sin_lugar = (_crear(puerto, [conjunto[1]]) for _ in range(3))
+
+    assert _pedir(puerto, 'POST', f"/trabajos/{en_proceso}/iniciar")[0] == 202
+    assert _pedir(puerto, 'POST', f"/trabajos/{en_cola}/iniciar")[0] == 202
+    assert _pedir(puerto, 'POST', f"/trabajos/{sin_lugar}/iniciar")[0] == 503
+    # Mientras hay trabajos pendientes no se pueden eliminar
+    assert _pedir(puerto, 'DELETE', f"/trabajos/{en_cola}")[0] == 409
+
+    estado, trabajo = _pedir(puerto, 'POST', f"/trabajos/{en_cola}/cancelar")
+    assert estado == 202 and trabajo['estado'] == 'cancelado'
+
+    limite = time.monotonic() + ESPERA_SEGUNDOS
+    while _pedir(puerto, 'GET', f"/trabajos/{en_proceso}")[1]['estado'] != 'procesando':
+        assert time.monotonic() < limite
+        time.sleep(0.01)
+    assert _pedir(puerto, 'POST', f"/trabajos/{en_proceso}/cancelar")[0] == 202
+    liberar.set()
+    assert _esperar(puerto, en_proceso)['estado'] == 'cancelado'
+    assert _esperar(puerto, en_cola)['estado'] == 'cancelado'
+
+    # Liberada la cola, el trabajo rechazado entra y termina
+    assert _pedir(puerto, 'POST', f"/trabajos/{sin_lugar}/iniciar")[0] == 202
+    assert _esperar(puerto, sin_lugar)['estado'] == 'terminado'
+    estado, eliminado = _pedir(puerto, 'DELETE', f"/trabajos/{en_cola}")
+    assert estado == 200 and eliminado['eliminado']
+
+
+# Los hilos de un trabajo se limitan a los núcleos: cada uno abre sus propios archivos
+def test_trabajadores_limitados(servidor):
+    puerto = servidor()
+    estado, trabajo = _pedir(puerto, 'POST', '/trabajos', json.dumps({'trabajadores': 100000}))
+    assert estado == 201
+    assert trabajo['opciones']['trabajadores'] == trabajadores_por_defecto()
+
+
+# Si falla algo después de procesar (aquí, el informe) el trabajo termina como fallido
+def test_error_al_cerrar_el_trabajo(servidor, conjunto, monkeypatch):
+    class MedicionSinInforme(Medicion):
+        def guardar_informe(self, *args, **kwargs):
+            raise OSError('disco lleno')
+
+    monkeypatch.setattr(modulo_servicio, 'Medicion', MedicionSinInforme)
+    puerto = servidor()
+    id_trabajo = _crear(puerto, [conjunto[1]])
+    _pedir(puerto, 'POST', f"/trabajos/{id_trabajo}/iniciar")
+    trabajo = _esperar(puerto, id_trabajo)
+    assert trabajo['estado'] == 'fallido'
+    assert 'disco lleno' in trabajo['error']
+
+
+# Un trabajo que quedó pendiente cuando se detuvo el servicio se puede volver a iniciar
+def test_reiniciar_trabajo_interrumpido(servidor, conjunto, tmp_path):
+    anterior = ServicioTrabajos(str(tmp_path))
+    trabajo = anterior.crear()
+    with open(conjunto[1], 'rb') as f:
+        anterior.recibir_archivo(trabajo, 'entrega.zip', f, os.path.getsize(conjunto[1]))
+    trabajo.estado = 'procesando'
+    trabajo.guardar()
+    anterior.cerrar()
+
+    puerto = servidor()
+    assert _pedir(puerto, 'GET', f"/trabajos/{trabajo.id}")[1]['estado'] == INTERRUMPIDO
+    assert _pedir(puerto, 'POST', f"/trabajos/{trabajo.id}/iniciar")[0] == 202
+    assert _esperar(puerto, trabajo.id)['estado'] == 'terminado'
+
+
+# Fuera de loopback el servicio exige un token; con token, cada petición lo debe enviar
+def test_token(servidor, tmp_path):
+    servicio = ServicioTrabajos(str(tmp_path / 'otro'))
+    with pytest.raises(ValueError):
+        crear_servidor(servicio, '0.0.0.0', 0)
+    servicio.cerrar()
+
+    puerto = servidor(token='secreto')
+    assert _pedir(puerto, 'GET', '/trabajos')[0] == 401
+    assert _pedir(puerto, 'GET', '/trabajos', cabeceras={'Authorization': 'Bearer otro'})[0] == 401
+    assert _pedir(puerto, 'GET', '/trabajos', cabeceras={'Authorization': 'Bearer secreto'})[0] == 200
@@ -0,0 +1,53 @@
+import shutil
+
+from procesador import vigilancia
+from procesador.vigilancia import INTENTOS_POR_ZIP, RegistroBandeja, VigilanteBandeja
+
+
+def _bandeja(conjunto, tmp_path):
+    bandeja = tmp_path / 'bandeja'
+    salida = tmp_path / 'salida'
+    bandeja.mkdir()
+    salida.mkdir()
+    shutil.copy(conjunto[1], bandeja / 'entrega.zip')
+    return str(bandeja), str(salida)
+
+
+# Un ZIP que falla no queda registrado como procesado: se reintenta en la revisión siguiente
+def test_zip_fallido_se_reintenta(conjunto, tmp_path, monkeypatch):
+    bandeja, salida = _bandeja(conjunto, tmp_path)
+    eventos = []
+    vigilante = VigilanteBandeja(bandeja, [], salida, al_evento=eventos.append)
+    procesar_zip = vigilancia.procesar_zip
+
+    def falla(*args, **kwargs):
+        raise OSError('recurso de red no disponible')
+
+    monkeypatch.setattr(vigilancia, 'procesar_zip', falla)
+    vigilante.revisar()
+    vigilante.revisar()
+    assert [evento['tipo'] for evento in eventos] == ['error_zip']
+    assert not RegistroBandeja(salida).claves
+
+    monkeypatch.setattr(vigilancia, 'procesar_zip', procesar_zip)
+    vigilante.revisar()
+    assert eventos[-1]['tipo'] == 'zip_procesado'
+    assert eventos[-1]['htmls'] == 40
+    assert len(RegistroBandeja(salida).claves) == 1
+
+
+# Después de INTENTOS_POR_ZIP fallos el ZIP se deja de lado sin registrarlo
+def test_intentos_acotados(conjunto, tmp_path, monkeypatch):
+    bandeja, salida = _bandeja(conjunto, tmp_path)
+    eventos = []
+    vigilante = VigilanteBandeja(bandeja, [], salida, al_evento=eventos.append)
+
+    def falla(*args, **kwargs):
+        raise ValueError('ZIP dañado')
+
+    monkeypatch.setattr(vigilancia, 'procesar_zip', falla)
+    for _ in range(INTENTOS_POR_ZIP + 3):
+        vigilante.revisar()
+    assert [evento['intento'] for evento in eventos] == list(range(1, INTENTOS_POR_ZIP + 1))
+    assert eventos[-1]['reintentos'] == 0
+    assert not RegistroBandeja(salida).claves
@@ -0,0 +1,63 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# Presupuesto de arranque: desde que se lanza el programa hasta que la ventana queda lista
+PRESUPUESTO_SEGUNDOS = 2.0
+MEDIR_ARRANQUE = 'PROCESADOR_MEDIR_ARRANQUE'
+
+
+# Lanza la interfaz (main.py o el dist/main/main.exe empaquetado) y mide cuánto tarda en avisar que está lista.
+# Devuelve (segundos, pandas_cargado)
+def medir_arranque(comando, limite):
+    entorno = dict(os.environ, **{MEDIR_ARRANQUE: '1'})
+    inicio = time.perf_counter()
+    salida = subprocess.run(comando, env=entorno, capture_output=True, text=True, timeout=limite)
+    segundos = time.perf_counter() - inicio
+    for linea in salida.stdout.splitlines():
+        if linea.startswith('ventana_lista'):
+            return segundos, linea.endswith('pandas=True')
+    raise RuntimeError(f"La interfaz no llegó a abrir la ventana:\n{salida.stderr.strip()}")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Comprueba que la interfaz arranca dentro del presupuesto de tiempo.")
+    parser.add_argument('--ejecutable', help="Ejecutable empaquetado a medir (por defecto, main.py con este Python)")
+    parser.add_argument('--presupuesto', type=float, default=PRESUPUESTO_SEGUNDOS,
+                        help=f"Segundos permitidos hasta la primera ventana (por defecto {PRESUPUESTO_SEGUNDOS})")
+    parser.add_argument('--repeticiones', type=int, default=3,
+                        help="Arranques a medir; se toma el mejor para no penalizar la caché fría del disco")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.ejecutable:
+        comando = [args.ejecutable]
+    else:
+        comando = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')]
+
+    tiempos = []
+    pandas_cargado = False
+    for _ in range(max(args.repeticiones, 1)):
+        segundos, con_pandas = medir_arranque(comando, limite=args.presupuesto * 10)
+        tiempos.append(segundos)
+        pandas_cargado = pandas_cargado or con_pandas
+
+    mejor = min(tiempos)
+    print(f"Arranque: {mejor:.2f} s (presupuesto {args.presupuesto:.2f} s; "
+          f"mediciones: {', '.join(f'{t:.2f}' for t in tiempos)})")
+    fallos = []
+    if mejor > args.presupuesto:
+        fallos.append("el arranque supera el presupuesto")
+    if pandas_cargado:
+        fallos.append("pandas se carga antes de abrir la ventana")
+    for fallo in fallos:
+        print(f"Error: {fallo}", file=sys.stderr)
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())